@@ -1,49 +1,173 @@
 from __future__ import annotations
 
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, Any, Optional, List
 
 from fastapi import APIRouter
 from dotenv import load_dotenv
-from openai import OpenAI
+from openai import AsyncOpenAI
 
 from app.api.schemas import AskRequest, AskResponse, Citation
+from app.core.circuit_breaker import CircuitBreaker
 from app.core.config import settings
 
 from app.indexing.pgvector_store import PGVectorStore
-from app.retrieval.semantic_pgvector import PGVectorSemanticRetriever
-from app.indexing.bm25_index import BM25Index
+from app.indexing.pgvector_store_async import AsyncPGVectorStore
+from app.retrieval.semantic_pgvector import AsyncPGVectorSemanticRetriever
+from app.indexing.vector_replica import VectorReplica
+from app.retrieval.semantic_replica import AsyncReplicaSemanticRetriever
+from app.retrieval.caching_embedder import AsyncCachingEmbedder
+from app.indexing.bm25_cache import BM25IndexCache
+from app.indexing.chunk_cache import AsyncChunkCache
 from app.retrieval.bm25_retriever import BM25Retriever
-from app.retrieval.hybrid import HybridRetriever
+from app.retrieval.pg_keyword_retriever import AsyncPGKeywordRetriever
+from app.retrieval.hybrid import AsyncHybridRetriever
 from app.retrieval.fusion import RRFWeights
 
-from app.rerank.cohere_reranker import CohereReranker
-from app.retrieval.rerank_pipeline import rerank_fused
+from app.rerank.factory import create_reranker
+from app.rerank.caching_reranker import AsyncCachingReranker
+from app.rerank.batching_reranker import BatchingReranker
+from app.retrieval.rerank_pipeline import arerank_fused
 
-from app.generation.openai_client import OpenAILLM
-from app.generation.answerer import Answerer
+from app.generation.openai_client import AsyncOpenAILLM
+from app.generation.completion_cache import CompletionCache
+from app.generation.answerer import AsyncAnswerer
+from app.generation.answer_cache import SemanticAnswerCache
 from app.generation.citation_guard import citations_with_pages
 
 load_dotenv()
 router = APIRouter()
 
-# Shared clients
+# Shared clients. The request path is async end to end; the sync store only
+# feeds the in-process BM25 cache, which runs in worker threads.
 _store = PGVectorStore(settings.pg_dsn)
-_oai = OpenAI(api_key=settings.openai_api_key)
+_astore = AsyncPGVectorStore(
+    settings.pg_dsn,
+    pool_size=settings.pg_async_pool_size,
+    ef_search=settings.hnsw_ef_search,
+    probes=settings.ivfflat_probes,
+    filter_exact_max=settings.semantic_filter_exact_max,
+    iterative_scan=settings.ann_iterative_scan,
+    reduced_dims=settings.embedding_reduced_dims,
+    search_mode=settings.semantic_search_mode,
+    rescore_factor=settings.rescore_factor,
+    embedding_dims=settings.embedding_dims,
+    binary_candidates=settings.binary_candidates,
+)
+_oai = AsyncOpenAI(api_key=settings.openai_api_key)
 
-def _embed(text: str) -> list[float]:
-    r = _oai.embeddings.create(model=settings.embedding_model, input=text)
+async def _embed_uncached(text: str) -> list[float]:
+    r = await _oai.embeddings.create(model=settings.embedding_model, input=text)
     return r.data[0].embedding
 
-_semantic = PGVectorSemanticRetriever(_store, embed_fn=_embed)
+# Repeated questions skip the embeddings API
+_embed = AsyncCachingEmbedder(
+    _embed_uncached,
+    model=settings.embedding_model,
+    max_entries=settings.embed_cache_max_entries,
+    ttl_s=settings.embed_cache_ttl_s,
+    disk_path=settings.embed_cache_path,
+    disk_ttl_s=settings.embed_cache_ttl_s,
+    disk_max_entries=settings.embed_cache_disk_max_entries,
+)
+
+# Hot chunks are served from memory when fused candidates are hydrated
+_chunk_cache: Optional[AsyncChunkCache] = None
+if settings.chunk_cache_max_bytes > 0:
+    _chunk_cache = AsyncChunkCache(
+        _astore,
+        max_bytes=settings.chunk_cache_max_bytes,
+        version_check_interval=settings.chunk_cache_version_check_s,
+    )
+_chunk_source = _chunk_cache or _astore
+
+_with_text = not settings.late_hydration
+_semantic = AsyncPGVectorSemanticRetriever(_astore, embed_fn=_embed, with_text=_with_text)
+
+# Optional in-process replica of the embeddings: loads and syncs in the background,
+# Postgres serves semantic queries until the first load is done
+_replica: Optional[VectorReplica] = None
+if settings.semantic_backend == "replica":
+    _replica = VectorReplica(
+        _store,
+        version_check_interval=settings.vector_replica_sync_s,
+        hnsw_min_rows=settings.vector_replica_hnsw_min,
+        exact_filter_max=settings.semantic_filter_exact_max,
+    )
+    _replica.start()
+    _semantic = AsyncReplicaSemanticRetriever(
+        _replica, embed_fn=_embed, store=_chunk_source, fallback=_semantic, with_text=_with_text,
+    )
+
+# Keyword leg: Postgres full-text (stateless workers) or in-process BM25.
+# BM25 indexes are built once per doc_id scope; ingested chunks are applied as delta segments
+_pg_keyword: Optional[AsyncPGKeywordRetriever] = None
+_bm25_cache: Optional[BM25IndexCache] = None
+if settings.keyword_backend == "postgres":
+    _pg_keyword = AsyncPGKeywordRetriever(_astore, with_text=_with_text)
+else:
+    _bm25_cache = BM25IndexCache(
+        _store,
+        max_bytes=settings.bm25_cache_max_bytes,
+        version_check_interval=settings.bm25_cache_version_check_s,
+        snapshot_dir=settings.bm25_snapshot_dir,
+        max_incremental_changes=settings.bm25_incremental_max_changes,
+        keep_text=_with_text,
+    )
 
-# Reranker (Cohere)
-_reranker = CohereReranker(
-    api_key=settings.cohere_api_key or "",
-    model=settings.cohere_rerank_model or "rerank-english-v3.0",
+# Threads for the sync parts of retrieval (in-process BM25 build/search)
+_retrieval_pool = ThreadPoolExecutor(max_workers=settings.retrieval_workers, thread_name_prefix="retrieval")
+
+# Reranker (RERANK_PROVIDER: Cohere or local); concurrent calls are coalesced into
+# shared, size- and concurrency-bounded provider calls; repeated (query, chunk) pairs reuse cached scores
+_reranker = create_reranker(settings)
+_rerank_batcher: Optional[BatchingReranker] = None
+if settings.rerank_batch_window_ms > 0:
+    _rerank_batcher = _reranker = BatchingReranker(
+        _reranker,
+        window_ms=settings.rerank_batch_window_ms,
+        max_docs_per_call=settings.rerank_max_docs_per_call,
+        max_concurrency=settings.rerank_max_concurrency,
+    )
+_rerank_breaker = CircuitBreaker(
+    failure_threshold=settings.rerank_breaker_failures,
+    reset_timeout_s=settings.rerank_breaker_reset_s,
 )
+_rerank_cache: Optional[AsyncCachingReranker] = None
+if settings.rerank_cache_max_entries > 0:
+    _rerank_cache = _reranker = AsyncCachingReranker(
+        _reranker,
+        max_entries=settings.rerank_cache_max_entries,
+        ttl_s=settings.rerank_cache_ttl_s,
+        disk_path=settings.rerank_cache_path,
+        disk_ttl_s=settings.rerank_cache_ttl_s,
+        disk_max_entries=settings.rerank_cache_disk_max_entries,
+    )
 
-_llm = OpenAILLM(api_key=settings.openai_api_key, model=settings.llm_model)
-_answerer = Answerer(_llm)
+# Identical prompts (same question and context) reuse the temperature-0 completion
+_llm_cache: Optional[CompletionCache] = None
+if settings.llm_cache_max_entries > 0:
+    _llm_cache = CompletionCache(
+        max_entries=settings.llm_cache_max_entries,
+        ttl_s=settings.llm_cache_ttl_s,
+        disk_path=settings.llm_cache_path,
+        disk_ttl_s=settings.llm_cache_ttl_s,
+        disk_max_entries=settings.llm_cache_disk_max_entries,
+    )
+_llm = AsyncOpenAILLM(api_key=settings.openai_api_key, model=settings.llm_model, cache=_llm_cache)
+_answerer = AsyncAnswerer(_llm)
+
+# Near-duplicate questions (same doc_id scope, unchanged corpus) reuse a cached answer
+_answer_cache: Optional[SemanticAnswerCache] = None
+if settings.answer_cache_max_entries > 0:
+    _answer_cache = SemanticAnswerCache(
+        _astore,
+        threshold=settings.answer_cache_threshold,
+        max_entries=settings.answer_cache_max_entries,
+        ttl_s=settings.answer_cache_ttl_s,
+        version_check_interval=settings.answer_cache_version_check_s,
+    )
 
 
 def _debug_items_from_fused(fused, limit=10) -> List[Dict[str, Any]]:
@@ -70,16 +194,38 @@ def _debug_items_from_fused(fused, limit=10) -> List[Dict[str, Any]]:
 
 
 @router.post("/ask", response_model=AskResponse)
-def ask(req: AskRequest) -> AskResponse:
+async def ask(req: AskRequest) -> AskResponse:
     doc_id_filter = req.doc_id
 
-    # BM25 index per request if doc_id provided (simple + correct)
-    # (Later we can cache BM25Index per doc_id)
-    bm25_index = BM25Index.build_from_pg(_store, doc_id_filter=doc_id_filter)
-    bm25 = BM25Retriever(bm25_index)
+    # Debug and tuning requests always run the full pipeline (eval needs their contexts).
+    use_answer_cache = _answer_cache is not None and not req.debug and (
+        req.ef_search is None and req.probes is None and req.search_mode is None and req.rerank_timeout_s is None
+    )
+    if use_answer_cache:
+        # Also warms the embedding cache for the semantic leg below
+        query_embedding = await _embed(req.query)
+        cached, _, corpus_version = await _answer_cache.get(req.query, query_embedding, doc_id_filter)
+        if cached is not None:
+            return cached
+
+    if _pg_keyword is not None:
+        bm25 = _pg_keyword
+    else:
+        # A cache miss builds the index from Postgres; keep that off the event loop.
+        loop = asyncio.get_running_loop()
+        bm25 = BM25Retriever(
+            await loop.run_in_executor(_retrieval_pool, _bm25_cache.get, doc_id_filter), with_text=_with_text,
+        )
+
+    semantic = _semantic
+    if req.ef_search is not None or req.probes is not None or req.search_mode is not None:
+        semantic = AsyncPGVectorSemanticRetriever(
+            _astore, embed_fn=_embed, ef_search=req.ef_search, probes=req.probes, mode=req.search_mode,
+            with_text=_with_text,
+        )
 
-    hybrid = HybridRetriever(
-        semantic=_semantic,
+    hybrid = AsyncHybridRetriever(
+        semantic=semantic,
         bm25=bm25,
         weights=RRFWeights(
             k=settings.rrf_k,
@@ -87,24 +233,35 @@ def ask(req: AskRequest) -> AskResponse:
             w_bm25=settings.w_bm25,
         ),
         fused_top_n=settings.fused_top_n,
+        concurrent=settings.hybrid_concurrent,
+        executor=_retrieval_pool,
+        semantic_timeout_s=settings.semantic_timeout_s,
+        bm25_timeout_s=settings.bm25_timeout_s,
+        chunk_store=_chunk_source if settings.late_hydration else None,
     )
 
-    fused = hybrid.retrieve(
+    retrieval_report: Dict[str, Any] = {}
+    fused = await hybrid.retrieve(
         req.query,
         settings.semantic_top_k,
         settings.bm25_top_k,
         doc_id_filter=doc_id_filter,
+        report=retrieval_report,
     )
 
-    context_chunks = rerank_fused(
+    rerank_report: Dict[str, Any] = {}
+    context_chunks = await arerank_fused(
         query=req.query,
         fused=fused,
         reranker=_reranker,
         rerank_top_n=20,
         final_top_k=settings.final_top_k,
+        timeout_s=req.rerank_timeout_s if req.rerank_timeout_s is not None else settings.rerank_timeout_s,
+        breaker=_rerank_breaker,
+        report=rerank_report,
     )
 
-    answer = _answerer.answer(req.query, context_chunks)
+    answer = await _answerer.answer(req.query, context_chunks)
     clean_answer = answer
     clean_answer = clean_answer.replace("ANSWER:", "").strip()
     if "CITATIONS:" in clean_answer:
@@ -124,10 +281,27 @@ def ask(req: AskRequest) -> AskResponse:
                 {"chunk_id": c.chunk_id, "page": c.metadata.get("page") if isinstance(c.metadata, dict) else None}
                 for c in context_chunks
             ],
+            "keyword_backend": settings.keyword_backend,
+            "retrieval": retrieval_report,
+            "embed_cache": _embed.stats(),
+            "bm25_cache": _bm25_cache.stats() if _bm25_cache is not None else None,
+            "vector_replica": _replica.stats() if _replica is not None else None,
+            "chunk_cache": _chunk_cache.stats() if _chunk_cache is not None else None,
+            "rerank_cache": _rerank_cache.stats() if _rerank_cache is not None else None,
+            "answer_cache": _answer_cache.stats() if _answer_cache is not None else None,
+            "llm_cache": _llm_cache.stats() if _llm_cache is not None else None,
+            "rerank": {
+                **rerank_report,
+                "breaker": _rerank_breaker.stats(),
+                "batching": _rerank_batcher.stats() if _rerank_batcher is not None else None,
+            },
         }
 
-    return AskResponse(
+    response = AskResponse(
         answer=clean_answer,
         citations=[Citation(**c) for c in cits],
         debug=debug,
     )
+    if use_answer_cache:
+        _answer_cache.put(req.query, query_embedding, doc_id_filter, corpus_version, response)
+    return response
@@ -7,6 +7,11 @@ class AskRequest(BaseModel):
     query: str
     doc_id: Optional[str] = None
     debug: bool = False
+    # Per-request ANN recall knobs; default to HNSW_EF_SEARCH / IVFFLAT_PROBES
+    ef_search: Optional[int] = None
+    probes: Optional[int] = None
+    search_mode: Optional[str] = None  # full | reduced | binary (default SEMANTIC_SEARCH_MODE)
+    rerank_timeout_s: Optional[float] = None  # rerank latency budget (default RERANK_TIMEOUT_S)
 
 
 class Citation(BaseModel):
@@ -0,0 +1,235 @@
+from __future__ import annotations
+
+import asyncio
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Generic, Hashable, Optional, Sequence, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class LRUCache(Generic[K, V]):
+    """
+    Thread-safe LRU map bounded by entry count and/or an approximate byte budget,
+    with optional per-entry time-to-live (seconds since put; expired = miss).
+
+    sizeof(value) -> int is only needed when max_bytes is set.
+    """
+
+    def __init__(
+        self,
+        max_entries: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+        sizeof: Optional[Callable[[V], int]] = None,
+        ttl_s: Optional[float] = None,
+    ):
+        if max_bytes is not None and sizeof is None:
+            raise ValueError("max_bytes requires a sizeof function")
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._sizeof = sizeof
+        self.ttl_s = ttl_s
+        self._data: "OrderedDict[K, V]" = OrderedDict()
+        self._sizes: Dict[K, int] = {}
+        self._expires: Dict[K, float] = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expired = 0
+
+    def get(self, key: K, default: Optional[V] = None) -> Optional[V]:
+        with self._lock:
+            if key in self._data and self._is_expired(key):
+                self._remove(key)
+                self.expired += 1
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            self.misses += 1
+            return default
+
+    def peek(self, key: K, default: Optional[V] = None) -> Optional[V]:
+        # Lookup without touching recency or counters.
+        with self._lock:
+            if key in self._data and self._is_expired(key):
+                return default
+            return self._data.get(key, default)
+
+    def put(self, key: K, value: V) -> bool:
+        """Insert/replace; returns False if the value alone exceeds max_bytes."""
+        size = self._sizeof(value) if self._sizeof is not None else 0
+        with self._lock:
+            self._remove(key)
+            if self.max_bytes is not None and size > self.max_bytes:
+                return False
+            self._data[key] = value
+            self._sizes[key] = size
+            self._bytes += size
+            if self.ttl_s is not None:
+                self._expires[key] = time.monotonic() + self.ttl_s
+            self._evict()
+            return True
+
+    def pop(self, key: K) -> Optional[V]:
+        with self._lock:
+            return self._remove(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._sizes.clear()
+            self._expires.clear()
+            self._bytes = 0
+
+    def keys(self) -> list:
+        with self._lock:
+            return list(self._data.keys())
+
+    @property
+    def nbytes(self) -> int:
+        return self._bytes
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._data
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._data),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": (self.hits / lookups) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expired": self.expired,
+            }
+
+    # --- internals (caller holds the lock) ---
+
+    def _remove(self, key: K) -> Optional[V]:
+        if key not in self._data:
+            return None
+        value = self._data.pop(key)
+        self._bytes -= self._sizes.pop(key, 0)
+        self._expires.pop(key, None)
+        return value
+
+    def _is_expired(self, key: K) -> bool:
+        expires = self._expires.get(key)
+        return expires is not None and time.monotonic() >= expires
+
+    def _evict(self) -> None:
+        while self._data and (
+            (self.max_entries is not None and len(self._data) > self.max_entries)
+            or (self.max_bytes is not None and self._bytes > self.max_bytes)
+        ):
+            key, _ = self._data.popitem(last=False)
+            self._bytes -= self._sizes.pop(key, 0)
+            self._expires.pop(key, None)
+            self.evictions += 1
+
+
+class SQLiteCache:
+    """
+    String key -> value rows in one SQLite table, shared across restarts and
+    worker processes (WAL). Values are stored as given (TEXT, BLOB or REAL);
+    callers encode and decode. Rows older than ttl_s read as misses; beyond
+    max_entries the oldest rows are dropped (checked every _PRUNE_EVERY puts).
+
+    The a* methods run the blocking call on the loop's default executor.
+    """
+
+    _PRUNE_EVERY = 256  # puts between limit checks
+    _MAX_PARAMS = 500  # keys per SELECT, under SQLite's bound-parameter limit
+
+    def __init__(self, path: str, table: str, ttl_s: Optional[float] = None, max_entries: Optional[int] = None):
+        if not table.isidentifier():
+            raise ValueError(f"invalid table name: {table!r}")
+        self.table = table
+        self.ttl_s = ttl_s
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._puts = 0
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=5.0)
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            columns = {row[1] for row in self._conn.execute(f"PRAGMA table_info({table})")}
+            if columns and "value" not in columns:
+                self._conn.execute(f"DROP TABLE {table}")  # older per-cache layout; only cached data is lost
+            self._conn.execute(f"""
+            CREATE TABLE IF NOT EXISTS {table} (
+              key TEXT PRIMARY KEY,
+              model TEXT NOT NULL,
+              value BLOB NOT NULL,
+              created_at REAL NOT NULL
+            )""")
+            self._conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_created ON {table}(created_at)")
+            self._conn.commit()
+
+    def get(self, key: str) -> Optional[Any]:
+        return self.get_many([key]).get(key)
+
+    def get_many(self, keys: Sequence[str]) -> Dict[str, Any]:
+        min_created = time.time() - self.ttl_s if self.ttl_s is not None else float("-inf")
+        found: Dict[str, Any] = {}
+        for start in range(0, len(keys), self._MAX_PARAMS):
+            batch = list(keys[start : start + self._MAX_PARAMS])
+            placeholders = ",".join("?" * len(batch))
+            with self._lock:
+                rows = self._conn.execute(
+                    f"SELECT key, value FROM {self.table} WHERE key IN ({placeholders}) AND created_at >= ?",
+                    (*batch, min_created),
+                ).fetchall()
+            found.update(rows)
+        return found
+
+    def put(self, key: str, model: str, value: Any) -> None:
+        self.put_many(model, {key: value})
+
+    def put_many(self, model: str, values: Dict[str, Any]) -> None:
+        if not values:
+            return
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                f"INSERT OR REPLACE INTO {self.table} (key, model, value, created_at) VALUES (?, ?, ?, ?)",
+                [(k, model, v, now) for k, v in values.items()],
+            )
+            before = self._puts
+            self._puts += len(values)
+            if self.max_entries is not None and before // self._PRUNE_EVERY != self._puts // self._PRUNE_EVERY:
+                self._conn.execute(
+                    f"""
+                    DELETE FROM {self.table} WHERE key IN (
+                      SELECT key FROM {self.table} ORDER BY created_at DESC LIMIT -1 OFFSET ?
+                    )""",
+                    (self.max_entries,),
+                )
+            self._conn.commit()
+
+    async def aget_many(self, keys: Sequence[str]) -> Dict[str, Any]:
+        return await asyncio.get_running_loop().run_in_executor(None, self.get_many, keys)
+
+    async def aput_many(self, model: str, values: Dict[str, Any]) -> None:
+        await asyncio.get_running_loop().run_in_executor(None, self.put_many, model, values)
+
+    def count(self) -> int:
+        with self._lock:
+            return int(self._conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0])
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute(f"DELETE FROM {self.table}")
+            self._conn.commit()
@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+import threading
+import time
+from typing import Any, Dict
+
+
+class CircuitBreaker:
+    """
+    Thread-safe circuit breaker for a flaky dependency.
+
+    - closed: calls go through; `failure_threshold` consecutive failures open it.
+    - open: allow() is False (callers use their fallback) for `reset_timeout_s`.
+    - half_open: after the timeout one trial call is let through; success closes
+      the breaker, failure opens it again for another `reset_timeout_s`.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout_s: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout_s = reset_timeout_s
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at: float = 0.0
+        self._state = "closed"
+        self._trial_in_flight = False
+        self._trial_started = 0.0
+
+        self.opens = 0
+        self.rejected = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state()
+
+    def allow(self) -> bool:
+        with self._lock:
+            state = self._current_state()
+            if state == "closed":
+                return True
+            now = time.monotonic()
+            # A trial whose outcome was never recorded (e.g. cancelled) expires.
+            if state == "half_open" and (not self._trial_in_flight or now - self._trial_started >= self.reset_timeout_s):
+                self._trial_in_flight = True
+                self._trial_started = now
+                return True
+            self.rejected += 1
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._state = "closed"
+            self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._current_state() == "half_open" or self._failures >= self.failure_threshold:
+                if self._state != "open" or self._trial_in_flight:
+                    self.opens += 1
+                self._state = "open"
+                self._opened_at = time.monotonic()
+            self._trial_in_flight = False
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "state": self._current_state(),
+                "consecutive_failures": self._failures,
+                "opens": self.opens,
+                "rejected": self.rejected,
+            }
+
+    def _current_state(self) -> str:
+        # Caller holds the lock.
+        if self._state == "open" and time.monotonic() - self._opened_at >= self.reset_timeout_s:
+            return "half_open"
+        return self._state
@@ -1,5 +1,5 @@
 from dataclasses import dataclass, field
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Optional, Union
 
 
 @dataclass(frozen=True)
@@ -10,9 +10,17 @@ class Chunk:
     metadata: Dict[str, Any] = field(default_factory=dict)
 
 
+@dataclass(frozen=True)
+class ChunkRef:
+    # Id-only stand-in for a Chunk during retrieval/fusion; text is fetched later
+    # (app.retrieval.hydration) for the candidates that survive fusion.
+    chunk_id: str
+    doc_id: Optional[str] = None   # None when the source only knows ids (BM25 snapshots)
+
+
 @dataclass(frozen=True)
 class RetrievedItem:
-    chunk: Chunk
+    chunk: Union[Chunk, ChunkRef]
     source: str                 # "semantic" | "bm25" | "fused"
     rank: int                   # 1-based rank in that list
     score: Optional[float] = None
@@ -20,7 +28,7 @@ class RetrievedItem:
 
 @dataclass(frozen=True)
 class FusedItem:
-    chunk: Chunk
+    chunk: Union[Chunk, ChunkRef]
     fused_score: float
     semantic_rank: Optional[int] = None
     bm25_rank: Optional[int] = None
@@ -0,0 +1,241 @@
+from __future__ import annotations
+
+import itertools
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, FrozenSet, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.indexing.pgvector_store_async import AsyncPGVectorStore
+
+
+class _Scope:
+    # Entries of one doc_id scope at one corpus version: unit query vectors as
+    # rows of a matrix (grown by doubling, rows removed by swap with the last).
+
+    def __init__(self, version: int, dims: int):
+        self.version = version
+        self.vectors = np.zeros((8, dims), dtype=np.float32)
+        self.ids: List[int] = []
+        self.rows: Dict[int, int] = {}
+
+    def add(self, entry_id: int, vec: np.ndarray) -> None:
+        n = len(self.ids)
+        if n == self.vectors.shape[0]:
+            self.vectors = np.concatenate([self.vectors, np.zeros_like(self.vectors)])
+        self.vectors[n] = vec
+        self.ids.append(entry_id)
+        self.rows[entry_id] = n
+
+    def remove(self, entry_id: int) -> None:
+        row = self.rows.pop(entry_id)
+        last = len(self.ids) - 1
+        if row != last:
+            moved = self.ids[last]
+            self.vectors[row] = self.vectors[last]
+            self.ids[row] = moved
+            self.rows[moved] = row
+        self.ids.pop()
+
+    def similar(self, vec: np.ndarray, threshold: float) -> Tuple[List[Tuple[int, float]], float]:
+        # (entry_id, similarity) at or above threshold, most similar first; and the best similarity.
+        if not self.ids:
+            return [], 0.0
+        sims = self.vectors[: len(self.ids)] @ vec
+        above = np.flatnonzero(sims >= threshold)
+        above = above[np.argsort(-sims[above], kind="stable")]
+        return [(self.ids[i], float(sims[i])) for i in above], float(sims.max())
+
+
+class SemanticAnswerCache:
+    """
+    /ask responses cached by query embedding, per (doc_id scope, corpus version).
+
+    A query whose embedding has cosine similarity >= `threshold` with a cached
+    query of the same scope gets that query's response, provided both have the
+    same exact terms (numbers, quoted phrases, capitalized names; see
+    exact_terms): "Article 12" and "Article 21" embed almost identically but
+    must not share an answer. Lookups are one matrix-vector product over the
+    scope's cached embeddings.
+
+    - Bounded by `max_entries` across scopes (LRU), optional `ttl_s`.
+    - A scope's entries are dropped when its corpus version (see
+      PGVectorStore.corpus_version) moves, i.e. when a document in scope is
+      re-ingested or deleted, or, for the unscoped corpus, when any document
+      changes. The version is checked at most every `version_check_interval`
+      seconds per scope.
+    - put() takes the version returned by the lookup, so an answer computed
+      against a corpus that changed meanwhile is not cached.
+    """
+
+    def __init__(
+        self,
+        store: AsyncPGVectorStore,
+        threshold: float = 0.97,
+        max_entries: int = 2000,
+        ttl_s: Optional[float] = None,
+        version_check_interval: float = 1.0,
+    ):
+        self.store = store
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self.version_check_interval = version_check_interval
+        self._lock = threading.Lock()
+        self._scopes: Dict[Optional[str], _Scope] = {}
+        self._checked: Dict[Optional[str], Tuple[int, float]] = {}  # scope -> (version, checked_at)
+        # entry_id -> (scope, exact terms, response, created_at), in LRU order
+        self._entries: "OrderedDict[int, Tuple[Optional[str], FrozenSet[str], Any, float]]" = OrderedDict()
+        self._ids = itertools.count()
+
+        self.lookups = 0
+        self.hits = 0
+        self.term_mismatches = 0
+        self.evictions = 0
+        self.expired = 0
+        self.invalidations = 0
+
+    async def get(
+        self, query: str, query_embedding: Sequence[float], doc_id_filter: Optional[str] = None,
+    ) -> Tuple[Optional[Any], float, int]:
+        """
+        Returns (cached response or None, best similarity, corpus version); pass
+        the version on to put() when the response is computed after a miss.
+        """
+        version = await self._version(doc_id_filter)
+        vec = _unit(query_embedding)
+        terms = exact_terms(query)
+        with self._lock:
+            self.lookups += 1
+            scope = self._current_scope(doc_id_filter, version)
+            if scope is None or vec is None or scope.vectors.shape[1] != vec.shape[0]:
+                return None, 0.0, version
+            candidates, best = scope.similar(vec, self.threshold)
+            now = time.time()
+            for entry_id, sim in candidates:
+                _, entry_terms, value, created_at = self._entries[entry_id]
+                if self.ttl_s is not None and now - created_at > self.ttl_s:
+                    self._remove(entry_id)
+                    self.expired += 1
+                    continue
+                if entry_terms != terms:
+                    continue
+                self._entries.move_to_end(entry_id)
+                self.hits += 1
+                return value, sim, version
+            if candidates:
+                self.term_mismatches += 1
+            return None, best, version
+
+    def put(
+        self,
+        query: str,
+        query_embedding: Sequence[float],
+        doc_id_filter: Optional[str],
+        version: int,
+        value: Any,
+    ) -> None:
+        vec = _unit(query_embedding)
+        if vec is None or self.max_entries <= 0:
+            return
+        with self._lock:
+            scope = self._scopes.get(doc_id_filter)
+            checked = self._checked.get(doc_id_filter)
+            if (scope is not None and scope.version > version) or (checked is not None and checked[0] > version):
+                return  # computed against an older corpus
+            if scope is None or scope.version < version or scope.vectors.shape[1] != vec.shape[0]:
+                if scope is not None:
+                    self._drop_scope(doc_id_filter)
+                scope = self._scopes[doc_id_filter] = _Scope(version, vec.shape[0])
+            entry_id = next(self._ids)
+            scope.add(entry_id, vec)
+            self._entries[entry_id] = (doc_id_filter, exact_terms(query), value, time.time())
+            while len(self._entries) > self.max_entries:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._scopes.clear()
+            self._checked.clear()
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "scopes": len(self._scopes),
+                "threshold": self.threshold,
+                "lookups": self.lookups,
+                "hits": self.hits,
+                "term_mismatches": self.term_mismatches,
+                "hit_ratio": (self.hits / self.lookups) if self.lookups else 0.0,
+                "evictions": self.evictions,
+                "expired": self.expired,
+                "invalidations": self.invalidations,
+            }
+
+    # --- internals ---
+
+    async def _version(self, doc_id_filter: Optional[str]) -> int:
+        with self._lock:
+            checked = self._checked.get(doc_id_filter)
+        if checked is not None and time.monotonic() - checked[1] < self.version_check_interval:
+            return checked[0]
+        version = await self.store.corpus_version(doc_id_filter)
+        with self._lock:
+            self._checked[doc_id_filter] = (version, time.monotonic())
+        return version
+
+    def _current_scope(self, doc_id_filter: Optional[str], version: int) -> Optional[_Scope]:
+        # Caller holds the lock.
+        scope = self._scopes.get(doc_id_filter)
+        if scope is not None and scope.version < version:
+            self._drop_scope(doc_id_filter)
+            return None
+        return scope
+
+    def _drop_scope(self, doc_id_filter: Optional[str]) -> None:
+        # Caller holds the lock.
+        scope = self._scopes.pop(doc_id_filter)
+        for entry_id in scope.ids:
+            del self._entries[entry_id]
+        self.invalidations += len(scope.ids)
+
+    def _remove(self, entry_id: int) -> None:
+        # Caller holds the lock.
+        doc_id_filter = self._entries.pop(entry_id)[0]
+        scope = self._scopes[doc_id_filter]
+        scope.remove(entry_id)
+        if not scope.ids:
+            del self._scopes[doc_id_filter]
+
+
+_NUMBER_RE = re.compile(r"\d+(?:[.,/:-]\d+)*")
+_QUOTED_RE = re.compile(r"\"([^\"]+)\"|“([^”]+)”|(?<!\w)'([^']+)'(?!\w)")
+_NAME_RE = re.compile(r"\b[A-Z][\w&.-]*")
+
+
+def exact_terms(query: str) -> FrozenSet[str]:
+    """
+    Terms two questions must share to be answered alike, whatever their
+    embeddings say: numbers (article, clause, dates, amounts), quoted phrases
+    and capitalized words after the first (parties, defined terms).
+    """
+    terms = set(_NUMBER_RE.findall(query))
+    terms.update(next(g for g in m.groups() if g).strip().lower() for m in _QUOTED_RE.finditer(query))
+    names = _NAME_RE.findall(query)
+    if names and query.lstrip().startswith(names[0]):
+        names = names[1:]  # sentence-initial capital
+    terms.update(n.lower() for n in names)
+    return frozenset(terms)
+
+
+def _unit(embedding: Sequence[float]) -> Optional[np.ndarray]:
+    vec = np.asarray(embedding, dtype=np.float32)
+    norm = float(np.linalg.norm(vec))
+    return vec / norm if norm > 0 else None
@@ -24,8 +24,40 @@ class Answerer:
             return txt1
 
         # Pass 2 (repair): force citations using only allowed IDs
-        allowed = _allowed_citations(context_chunks)
-        repair_prompt = user_prompt + f"""
+        resp2 = self.llm.generate(SYSTEM_PROMPT, _repair_prompt(user_prompt, context_chunks))
+        txt2 = (resp2.text or "").strip()
+
+        if validate_citations(txt2, context_chunks):
+            return txt2
+
+        return safe_fallback()
+
+
+class AsyncAnswerer:
+    # Same two-pass flow as Answerer, with an async llm (e.g. AsyncOpenAILLM).
+    def __init__(self, llm):
+        self.llm = llm
+
+    async def answer(self, query: str, context_chunks: List[Chunk]) -> str:
+        user_prompt = build_user_prompt(query, context_chunks)
+        resp1 = await self.llm.generate(SYSTEM_PROMPT, user_prompt)
+        txt1 = (resp1.text or "").strip()
+
+        if validate_citations(txt1, context_chunks):
+            return txt1
+
+        resp2 = await self.llm.generate(SYSTEM_PROMPT, _repair_prompt(user_prompt, context_chunks))
+        txt2 = (resp2.text or "").strip()
+
+        if validate_citations(txt2, context_chunks):
+            return txt2
+
+        return safe_fallback()
+
+
+def _repair_prompt(user_prompt: str, context_chunks: List[Chunk]) -> str:
+    allowed = _allowed_citations(context_chunks)
+    return user_prompt + f"""
 
 REPAIR INSTRUCTIONS:
 - Your previous answer missed citations or used invalid ones.
@@ -37,10 +69,3 @@ REPAIR INSTRUCTIONS:
 - If the answer is not in CONTEXT, respond exactly:
   I don't know based on the provided documents.
 """
-        resp2 = self.llm.generate(SYSTEM_PROMPT, repair_prompt)
-        txt2 = (resp2.text or "").strip()
-
-        if validate_citations(txt2, context_chunks):
-            return txt2
-
-        return safe_fallback()
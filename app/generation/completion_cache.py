@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+import hashlib
+import threading
+from typing import Any, Dict, Optional
+
+from app.core.cache import LRUCache, SQLiteCache
+
+
+class CompletionCache:
+    """
+    Exact-match cache for deterministic (temperature 0) chat completions, keyed by
+    sha256 of (model, temperature, system prompt, user prompt):
+    - in-memory LRU (max_entries, optional ttl_s)
+    - optional SQLite file (disk_path) shared across restarts/workers, with its own
+      TTL and entry limit (oldest rows are dropped first); aget/aput reach it from
+      the loop's default executor
+
+    Prompts are hashed verbatim: any change to the instructions or the context
+    chunks is a different key.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 10_000,
+        ttl_s: Optional[float] = None,
+        disk_path: Optional[str] = None,
+        disk_ttl_s: Optional[float] = None,
+        disk_max_entries: Optional[int] = 100_000,
+    ):
+        self._memory: LRUCache[str, str] = LRUCache(max_entries=max_entries, ttl_s=ttl_s)
+        self._disk = (
+            SQLiteCache(disk_path, "llm_completions", ttl_s=disk_ttl_s, max_entries=disk_max_entries)
+            if disk_path
+            else None
+        )
+        self._lock = threading.Lock()
+        self.lookups = 0
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.api_calls = 0
+        self.bypassed = 0
+
+    @staticmethod
+    def key(model: str, temperature: float, system_prompt: str, user_prompt: str) -> str:
+        h = hashlib.sha256()
+        for part in (model, repr(float(temperature)), system_prompt, user_prompt):
+            h.update(part.encode("utf-8"))
+            h.update(b"\0")
+        return h.hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        text = self._from_memory(key)
+        if text is None and self._disk is not None:
+            text = self._from_disk(key, self._disk.get(key))
+        return text
+
+    async def aget(self, key: str) -> Optional[str]:
+        text = self._from_memory(key)
+        if text is None and self._disk is not None:
+            text = self._from_disk(key, (await self._disk.aget_many([key])).get(key))
+        return text
+
+    def put(self, key: str, model: str, text: str) -> None:
+        self._remember(key, text)
+        if self._disk is not None:
+            self._disk.put(key, model, text)
+
+    async def aput(self, key: str, model: str, text: str) -> None:
+        self._remember(key, text)
+        if self._disk is not None:
+            await self._disk.aput_many(model, {key: text})
+
+    def record_bypass(self) -> None:
+        with self._lock:
+            self.bypassed += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            hits = self.memory_hits + self.disk_hits
+            out: Dict[str, Any] = {
+                "lookups": self.lookups,
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.lookups - hits,
+                "api_calls": self.api_calls,
+                "bypassed": self.bypassed,
+                "hit_ratio": (hits / self.lookups) if self.lookups else 0.0,
+            }
+        out["memory"] = self._memory.stats()
+        if self._disk is not None:
+            out["disk_entries"] = self._disk.count()
+        return out
+
+    def clear(self) -> None:
+        self._memory.clear()
+        if self._disk is not None:
+            self._disk.clear()
+
+    # --- internals ---
+
+    def _from_memory(self, key: str) -> Optional[str]:
+        with self._lock:
+            self.lookups += 1
+        text = self._memory.get(key)
+        if text is not None:
+            with self._lock:
+                self.memory_hits += 1
+        return text
+
+    def _from_disk(self, key: str, text: Optional[str]) -> Optional[str]:
+        if text is not None:
+            self._memory.put(key, text)
+            with self._lock:
+                self.disk_hits += 1
+        return text
+
+    def _remember(self, key: str, text: str) -> None:
+        with self._lock:
+            self.api_calls += 1
+        self._memory.put(key, text)
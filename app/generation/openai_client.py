@@ -2,7 +2,11 @@ from __future__ import annotations
 from dataclasses import dataclass
 from typing import Optional
 
-from openai import OpenAI
+from openai import AsyncOpenAI, OpenAI
+
+from app.generation.completion_cache import CompletionCache
+
+TEMPERATURE = 0.0
 
 
 @dataclass
@@ -11,17 +15,85 @@ class LLMResponse:
 
 
 class OpenAILLM:
-    def __init__(self, api_key: str, model: str):
+    """
+    Chat completions at temperature 0. With a CompletionCache, an identical
+    (model, system prompt, user prompt) is answered from the cache;
+    generate(..., use_cache=False) bypasses it (the fresh answer is still stored).
+    """
+
+    def __init__(self, api_key: str, model: str, cache: Optional[CompletionCache] = None):
         self.client = OpenAI(api_key=api_key)
         self.model = model
+        self.cache = cache
 
-    def generate(self, system_prompt: str, user_prompt: str) -> LLMResponse:
+    def generate(self, system_prompt: str, user_prompt: str, use_cache: bool = True) -> LLMResponse:
+        key = _cache_key(self, system_prompt, user_prompt)
+        if _reads_cache(self, key, use_cache):
+            text = self.cache.get(key)
+            if text is not None:
+                return LLMResponse(text=text)
         resp = self.client.chat.completions.create(
             model=self.model,
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt},
-            ],
-            temperature=0.0,
+            messages=_messages(system_prompt, user_prompt),
+            temperature=TEMPERATURE,
+        )
+        text = _text(resp)
+        if _cacheable(resp, key):
+            self.cache.put(key, self.model, text)
+        return LLMResponse(text=text)
+
+
+class AsyncOpenAILLM:
+    # Same as OpenAILLM (including the cache) with the async client; cache disk reads
+    # and writes run on the loop's default executor.
+    def __init__(self, api_key: str, model: str, cache: Optional[CompletionCache] = None):
+        self.client = AsyncOpenAI(api_key=api_key)
+        self.model = model
+        self.cache = cache
+
+    async def generate(self, system_prompt: str, user_prompt: str, use_cache: bool = True) -> LLMResponse:
+        key = _cache_key(self, system_prompt, user_prompt)
+        if _reads_cache(self, key, use_cache):
+            text = await self.cache.aget(key)
+            if text is not None:
+                return LLMResponse(text=text)
+        resp = await self.client.chat.completions.create(
+            model=self.model,
+            messages=_messages(system_prompt, user_prompt),
+            temperature=TEMPERATURE,
         )
-        return LLMResponse(text=resp.choices[0].message.content or "")
+        text = _text(resp)
+        if _cacheable(resp, key):
+            await self.cache.aput(key, self.model, text)
+        return LLMResponse(text=text)
+
+
+def _cache_key(llm, system_prompt: str, user_prompt: str) -> Optional[str]:
+    if llm.cache is None:
+        return None
+    return CompletionCache.key(llm.model, TEMPERATURE, system_prompt, user_prompt)
+
+
+def _reads_cache(llm, key: Optional[str], use_cache: bool) -> bool:
+    if key is None:
+        return False
+    if not use_cache:
+        llm.cache.record_bypass()
+        return False
+    return True
+
+
+def _text(resp) -> str:
+    return resp.choices[0].message.content or ""
+
+
+def _cacheable(resp, key: Optional[str]) -> bool:
+    # Empty or truncated completions are not worth replaying.
+    return key is not None and bool(_text(resp)) and resp.choices[0].finish_reason == "stop"
+
+
+def _messages(system_prompt: str, user_prompt: str):
+    return [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": user_prompt},
+    ]
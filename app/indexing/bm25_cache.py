@@ -0,0 +1,208 @@
+from __future__ import annotations
+
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Tuple
+
+from app.core.cache import LRUCache
+from app.indexing.bm25_index import BM25Index
+from app.indexing.bm25_snapshot import prune_snapshots, snapshot_path
+from app.indexing.pgvector_store import PGVectorStore
+
+
+@dataclass
+class _CachedIndex:
+    index: BM25Index
+    version: int
+    checked_at: float
+
+
+class BM25IndexCache:
+    """
+    Process-wide cache of built BM25 indexes keyed by doc_id filter (None = whole corpus).
+
+    - An entry is valid while its corpus version (see PGVectorStore.corpus_version)
+      is unchanged. When ingestion bumps the version, up to
+      `max_incremental_changes` logged chunk changes are applied in place as
+      delta segments (BM25Index.add_chunks / remove_chunks); larger change sets
+      (or rows without a chunk_id) rebuild the index.
+    - The version is re-checked at most every `version_check_interval` seconds.
+    - Entries are evicted LRU once their approximate size exceeds `max_bytes`.
+    - keep_text=False drops chunk text after tokenizing (for late hydration:
+      hits are ChunkRefs and only fused survivors are read from Postgres).
+    - With `snapshot_dir`, indexes are persisted per (scope, version) and opened
+      via mmap, so other workers (and restarts) skip the table scan and share
+      the postings through the page cache.
+    """
+
+    def __init__(
+        self,
+        store: PGVectorStore,
+        max_bytes: int = 512 * 1024 * 1024,
+        version_check_interval: float = 1.0,
+        snapshot_dir: Optional[str] = None,
+        max_incremental_changes: int = 5000,
+        keep_text: bool = True,
+    ):
+        self.store = store
+        self.keep_text = keep_text
+        self.max_incremental_changes = max_incremental_changes
+        self.version_check_interval = version_check_interval
+        self.snapshot_dir = snapshot_dir
+        if snapshot_dir:
+            os.makedirs(snapshot_dir, exist_ok=True)
+        self._entries: LRUCache[Optional[str], _CachedIndex] = LRUCache(
+            max_bytes=max_bytes,
+            sizeof=lambda e: e.index.approx_nbytes(),
+        )
+        self._lock = threading.Lock()
+        self._build_locks: Dict[Optional[str], threading.Lock] = {}
+
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.builds = 0
+        self.refreshes = 0
+        self.refresh_seconds_total = 0.0
+        self.snapshot_loads = 0
+        self.build_seconds_total = 0.0
+        self.last_build_seconds = 0.0
+
+    def get(self, doc_id_filter: Optional[str] = None) -> BM25Index:
+        key = doc_id_filter or None
+
+        entry = self._entries.get(key)
+        if entry is not None and self._is_current(key, entry):
+            with self._lock:
+                self.hits += 1
+            return entry.index
+        with self._lock:
+            self.misses += 1
+            if entry is not None:
+                self.stale += 1
+
+        # One builder per key; concurrent requests for the same scope wait for it.
+        with self._build_lock(key):
+            entry = self._entries.peek(key)
+            if entry is not None and self._is_current(key, entry):
+                return entry.index
+
+            # Read the version *before* building: a concurrent ingest then
+            # shows up as a newer version on the next check.
+            version = self.store.corpus_version(key)
+            if entry is not None and self._refresh(key, entry, version):
+                return entry.index
+
+            self._entries.pop(key)
+            t0 = time.perf_counter()
+            index, loaded = self._load_or_build(key, version)
+            elapsed = time.perf_counter() - t0
+
+            self._entries.put(key, _CachedIndex(index=index, version=version, checked_at=time.monotonic()))
+            with self._lock:
+                if loaded:
+                    self.snapshot_loads += 1
+                else:
+                    self.builds += 1
+                self.build_seconds_total += elapsed
+                self.last_build_seconds = elapsed
+            return index
+
+    def invalidate(self, doc_id_filter: Optional[str] = None) -> None:
+        self._entries.pop(doc_id_filter or None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        entries = self._entries.stats()
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": entries["entries"],
+                "bytes": entries["bytes"],
+                "max_bytes": self._entries.max_bytes,
+                "evictions": entries["evictions"],
+                "hits": self.hits,
+                "misses": self.misses,
+                "stale": self.stale,
+                "hit_ratio": (self.hits / lookups) if lookups else 0.0,
+                "builds": self.builds,
+                "refreshes": self.refreshes,
+                "refresh_seconds_total": self.refresh_seconds_total,
+                "snapshot_loads": self.snapshot_loads,
+                "build_seconds_total": self.build_seconds_total,
+                "last_build_seconds": self.last_build_seconds,
+            }
+
+    # --- internals ---
+
+    def _is_current(self, key: Optional[str], entry: _CachedIndex) -> bool:
+        now = time.monotonic()
+        if now - entry.checked_at < self.version_check_interval:
+            return True
+        if self.store.corpus_version(key) == entry.version:
+            entry.checked_at = now
+            return True
+        return False
+
+    def _refresh(self, key: Optional[str], entry: _CachedIndex, version: int) -> bool:
+        """Applies logged chunk changes up to `version` in place; False means rebuild instead."""
+        if self.max_incremental_changes <= 0:
+            return False
+        changes = self.store.changes_since(entry.version, version, key, limit=self.max_incremental_changes + 1)
+        if len(changes) > self.max_incremental_changes or any(c["chunk_id"] is None for c in changes):
+            return False
+
+        t0 = time.perf_counter()
+        last_op: Dict[str, str] = {}
+        for c in changes:
+            last_op.pop(c["chunk_id"], None)  # keep change order for the latest op
+            last_op[c["chunk_id"]] = c["op"]
+        upserted = [cid for cid, op in last_op.items() if op == "upsert"]
+        fetched = self.store.get_chunks_by_ids(upserted)
+
+        index = entry.index
+        index.remove_chunks(cid for cid in last_op if cid not in fetched)  # deleted, or gone since
+        index.add_chunks([fetched[cid] for cid in upserted if cid in fetched])
+        elapsed = time.perf_counter() - t0
+
+        # Re-put so the LRU re-accounts the entry's size.
+        self._entries.put(key, _CachedIndex(index=index, version=version, checked_at=time.monotonic()))
+        with self._lock:
+            self.refreshes += 1
+            self.refresh_seconds_total += elapsed
+        return True
+
+    def _load_or_build(self, key: Optional[str], version: int) -> Tuple[BM25Index, bool]:
+        """Returns (index, loaded_from_existing_snapshot)."""
+        if not self.snapshot_dir:
+            return BM25Index.build_from_pg(self.store, doc_id_filter=key, keep_text=self.keep_text), False
+
+        # Another worker that built a newer version may prune this one at any
+        # point (prune_snapshots); a vanished file means building in memory.
+        path = snapshot_path(self.snapshot_dir, key, version)
+        if path.exists():
+            try:
+                return BM25Index.open_snapshot(str(path), self.store), True
+            except FileNotFoundError:
+                return BM25Index.build_from_pg(self.store, doc_id_filter=key, keep_text=self.keep_text), False
+
+        built = BM25Index.build_from_pg(self.store, doc_id_filter=key, keep_text=self.keep_text)
+        if built.engine is None:
+            return built, False  # empty scope, nothing to persist
+        built.save_snapshot(str(path), meta={"doc_id_filter": key, "corpus_version": version})
+        prune_snapshots(self.snapshot_dir, key, version)
+        try:
+            return BM25Index.open_snapshot(str(path), self.store), False
+        except FileNotFoundError:
+            return built, False
+
+    def _build_lock(self, key: Optional[str]) -> threading.Lock:
+        with self._lock:
+            lock = self._build_locks.get(key)
+            if lock is None:
+                lock = self._build_locks[key] = threading.Lock()
+            return lock
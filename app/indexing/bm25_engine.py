@@ -0,0 +1,439 @@
+from __future__ import annotations
+
+import heapq
+import math
+import sys
+import threading
+from array import array
+from bisect import bisect_left
+from collections import Counter
+from typing import AbstractSet, Dict, Iterable, List, Mapping, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+from scipy import sparse
+
+# term -> (doc ids ascending, term frequencies)
+Postings = Tuple[array, array]
+
+# One postings list of a term: (doc ids, tfs, max tf saturation over the list)
+TermList = Tuple[Sequence[int], Sequence[int], float]
+
+
+class BM25Searcher:
+    """
+    Query side of the BM25 engine, shared by the in-memory BM25Engine, the
+    mmap-backed BM25Snapshot and the multi-segment SegmentedBM25.
+
+    Subclasses provide n_docs, k1, the per-doc norm sequence, _lookup() and
+    _build_weight_matrix(); _deleted holds doc ids that must never be returned.
+    """
+
+    k1: float
+    _norm: Sequence[float]
+    _deleted: AbstractSet[int] = frozenset()
+
+    def __init__(self) -> None:
+        self._matrix: Optional[sparse.csr_matrix] = None
+        self._term_ids: Optional[Mapping[str, int]] = None
+        self._matrix_lock = threading.Lock()
+
+    @property
+    def n_docs(self) -> int:
+        raise NotImplementedError
+
+    def _lookup(self, term: str) -> Optional[Tuple[float, List[TermList]]]:
+        """
+        Returns (idf, postings lists) for a term, or None if unknown. A doc id
+        appears in at most one of the lists.
+        """
+        raise NotImplementedError
+
+    def _build_weight_matrix(self) -> Tuple[sparse.csr_matrix, Mapping[str, int]]:
+        raise NotImplementedError
+
+    def search(self, q_tokens: Sequence[str], top_k: int) -> List[Tuple[int, float]]:
+        """
+        Returns up to top_k (doc_index, score) sorted by score desc, ties by doc_index asc
+        (the same order as a stable sort over BM25Okapi.get_scores).
+        """
+        if top_k <= 0 or self.n_docs == 0:
+            return []
+
+        # BM25Okapi adds idf * tf-part once per query-token occurrence, in query order;
+        # positions let the scorer replay that order so scores match bit for bit.
+        positions: Dict[str, List[int]] = {}
+        for p, term in enumerate(q_tokens):
+            positions.setdefault(term, []).append(p)
+
+        terms: List[_QueryTerm] = []
+        for term, occ in positions.items():
+            found = self._lookup(term)
+            if found is None:
+                continue
+            idf, lists = found
+            for docs, tfs, max_tf_part in lists:
+                terms.append(_QueryTerm(len(occ) * idf * max_tf_part, idf, occ, docs, tfs))
+
+        # MaxScore is only sound when no term can lower a score.
+        prune = all(t.idf >= 0 for t in terms)
+        results = _maxscore_top_k(terms, self._norm, self.k1 + 1, top_k, prune, self._deleted)
+
+        if len(results) < top_k or results[-1][1] <= 0.0:
+            results = _fill_with_unmatched(results, [t.docs for t in terms], self.n_docs, top_k, self._deleted)
+        return results
+
+    def search_batch(
+        self,
+        queries: Sequence[Sequence[str]],
+        top_k: int,
+        max_block_cells: int = 8_000_000,
+    ) -> List[List[Tuple[int, float]]]:
+        """
+        Batched equivalent of [search(q, top_k) for q in queries], computed as one sparse
+        (queries x terms) @ (terms x docs) product per block of queries followed by a
+        vectorized argpartition top-k per row. max_block_cells caps the dense score
+        block (rows x n_docs) held in memory at once.
+
+        The product sums term contributions in vocabulary order rather than query
+        order, so scores can differ from search() in the last bit; docs whose scores
+        are mathematically tied may then come back in a different order.
+        """
+        if top_k <= 0 or self.n_docs == 0:
+            return [[] for _ in queries]
+
+        matrix, term_ids = self._weight_matrix()
+
+        rows: List[int] = []
+        cols: List[int] = []
+        vals: List[float] = []
+        for qi, q_tokens in enumerate(queries):
+            for term, qtf in Counter(q_tokens).items():
+                t = term_ids.get(term)
+                if t is not None:
+                    rows.append(qi)
+                    cols.append(t)
+                    vals.append(float(qtf))
+        q_matrix = sparse.csr_matrix((vals, (rows, cols)), shape=(len(queries), matrix.shape[0]))
+
+        block = max(1, max_block_cells // self.n_docs)
+        out: List[List[Tuple[int, float]]] = []
+        for start in range(0, len(queries), block):
+            scores = (q_matrix[start:start + block] @ matrix).toarray()
+            out.extend(_top_k_rows(scores, top_k, self._deleted))
+        return out
+
+    def _weight_matrix(self) -> Tuple[sparse.csr_matrix, Mapping[str, int]]:
+        with self._matrix_lock:
+            if self._matrix is None:
+                self._matrix, self._term_ids = self._build_weight_matrix()
+            return self._matrix, self._term_ids  # type: ignore[return-value]
+
+
+class BM25Engine(BM25Searcher):
+    """
+    Inverted-index BM25 (Okapi) scorer.
+
+    Scores are identical to rank_bm25.BM25Okapi (same k1/b/epsilon and idf floor),
+    but a query only touches the postings of its own terms, and top-k uses
+    MaxScore dynamic pruning with a bounded heap instead of scoring and sorting
+    the whole corpus.
+
+    search_batch() scores many queries at once against a CSR term x doc weight
+    matrix that is built lazily on first use.
+    """
+
+    def __init__(
+        self,
+        postings: Dict[str, Postings],
+        doc_len: Sequence[int],
+        k1: float = 1.5,
+        b: float = 0.75,
+        epsilon: float = 0.25,
+    ):
+        super().__init__()
+        self.postings = postings
+        self.doc_len = array("i", doc_len)
+        self.k1 = k1
+        self.b = b
+        self.epsilon = epsilon
+
+        n_docs = len(self.doc_len)
+        self.avgdl = (sum(self.doc_len) / n_docs) if n_docs else 0.0
+        avgdl = self.avgdl or 1.0  # all-empty corpus: no postings, any value works
+
+        # k1 * (1 - b + b * dl / avgdl), the per-doc part of the BM25 denominator
+        self._norm = [k1 * (1 - b + b * dl / avgdl) for dl in self.doc_len]
+
+        self.idf = _okapi_idf({t: len(p[0]) for t, p in postings.items()}, n_docs, epsilon)
+
+        # Max tf saturation per term; idf * this bounds any single doc's contribution.
+        k1p1 = k1 + 1
+        norm = self._norm
+        self._max_tf_part: Dict[str, float] = {}
+        for term, (docs, tfs) in postings.items():
+            self._max_tf_part[term] = max(tf * k1p1 / (tf + norm[d]) for d, tf in zip(docs, tfs))
+
+    @classmethod
+    def from_tokenized(
+        cls,
+        tokenized: Iterable[Sequence[str]],
+        k1: float = 1.5,
+        b: float = 0.75,
+        epsilon: float = 0.25,
+    ) -> "BM25Engine":
+        postings: Dict[str, Postings] = {}
+        doc_len: List[int] = []
+        for d, tokens in enumerate(tokenized):
+            doc_len.append(len(tokens))
+            for term, tf in Counter(tokens).items():
+                p = postings.get(term)
+                if p is None:
+                    p = postings[term] = (array("i"), array("i"))
+                p[0].append(d)
+                p[1].append(tf)
+        return cls(postings, doc_len, k1=k1, b=b, epsilon=epsilon)
+
+    @property
+    def n_docs(self) -> int:
+        return len(self.doc_len)
+
+    def _lookup(self, term: str) -> Optional[Tuple[float, List[TermList]]]:
+        p = self.postings.get(term)
+        if p is None:
+            return None
+        return self.idf[term], [(p[0], p[1], self._max_tf_part[term])]
+
+    def vocabulary(self) -> Sequence[str]:
+        """Terms in to_arrays() default row order."""
+        return list(self.postings.keys())
+
+    def to_arrays(self, terms: Optional[List[str]] = None) -> Dict[str, np.ndarray]:
+        """
+        Flattens the postings into CSR-style arrays (row t = terms[t]), in the given
+        term order (default: dict order). Used by the weight matrix and snapshots.
+        """
+        terms = list(self.postings.keys()) if terms is None else terms
+        lengths = np.fromiter((len(self.postings[t][0]) for t in terms), dtype=np.int64, count=len(terms))
+        indptr = np.zeros(len(terms) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=indptr[1:])
+        empty = np.zeros(0, dtype=np.int32)
+        return {
+            "indptr": indptr,
+            "docs": np.concatenate([np.frombuffer(self.postings[t][0], dtype=np.int32) for t in terms] or [empty]),
+            "tfs": np.concatenate([np.frombuffer(self.postings[t][1], dtype=np.int32) for t in terms] or [empty]),
+            "idf": np.array([self.idf[t] for t in terms], dtype=np.float64),
+            "max_tf_part": np.array([self._max_tf_part[t] for t in terms], dtype=np.float64),
+            "doc_len": np.frombuffer(self.doc_len, dtype=np.int32),
+        }
+
+    def _build_weight_matrix(self) -> Tuple[sparse.csr_matrix, Mapping[str, int]]:
+        terms = list(self.postings.keys())
+        arrs = self.to_arrays(terms)
+        matrix = _weight_matrix_from_arrays(
+            arrs["indptr"], arrs["docs"], arrs["tfs"], arrs["idf"],
+            np.asarray(self._norm, dtype=np.float64), self.k1, self.n_docs,
+        )
+        return matrix, {t: i for i, t in enumerate(terms)}
+
+    def approx_nbytes(self) -> int:
+        n = sys.getsizeof(self.postings) + self.doc_len.itemsize * len(self.doc_len) + 8 * len(self._norm)
+        for term, (docs, tfs) in self.postings.items():
+            n += sys.getsizeof(term) + 200 + docs.itemsize * (len(docs) + len(tfs))
+        return n
+
+
+def _weight_matrix_from_arrays(
+    indptr: np.ndarray,
+    docs: np.ndarray,
+    tfs: np.ndarray,
+    idf: np.ndarray,
+    norm: np.ndarray,
+    k1: float,
+    n_docs: int,
+) -> sparse.csr_matrix:
+    # Row t holds idf(t) * tf * (k1 + 1) / (tf + norm(d)) for every doc d in its postings.
+    tf = tfs.astype(np.float64)
+    row_idf = np.repeat(idf, np.diff(indptr))
+    data = row_idf * (tf * (k1 + 1) / (tf + norm[docs]))
+    return sparse.csr_matrix((data, docs, indptr), shape=(len(idf), n_docs))
+
+
+def _okapi_idf(df: Dict[str, int], n_docs: int, epsilon: float) -> Dict[str, float]:
+    # Same as BM25Okapi._calc_idf: negative idfs are floored to epsilon * average idf.
+    idf: Dict[str, float] = {}
+    idf_sum = 0.0
+    negative: List[str] = []
+    for term, freq in df.items():
+        v = math.log(n_docs - freq + 0.5) - math.log(freq + 0.5)
+        idf[term] = v
+        idf_sum += v
+        if v < 0:
+            negative.append(term)
+    if idf:
+        eps = epsilon * (idf_sum / len(idf))
+        for term in negative:
+            idf[term] = eps
+    return idf
+
+
+class _QueryTerm(NamedTuple):
+    bound: float                # upper bound of this term's total contribution to any doc
+    idf: float
+    positions: List[int]        # occurrences in the query
+    docs: Sequence[int]
+    tfs: Sequence[int]
+
+
+def _maxscore_top_k(
+    terms: List[_QueryTerm],
+    norm: Sequence[float],
+    k1p1: float,
+    top_k: int,
+    prune: bool,
+    deleted: AbstractSet[int] = frozenset(),
+) -> List[Tuple[int, float]]:
+    """
+    Document-at-a-time MaxScore over per-term cursors.
+
+    Terms are ordered by upper bound; once the heap holds top_k docs, the low-bound
+    prefix whose summed bounds cannot beat the k-th score becomes "non-essential":
+    candidates are only drawn from the essential lists, and non-essential lists are
+    probed (by binary search) only while the candidate can still enter the heap.
+    """
+    terms = sorted(terms, key=lambda t: t.bound)
+    n = len(terms)
+    idfs = [t.idf for t in terms]
+    qtfs = [len(t.positions) for t in terms]
+    docs = [t.docs for t in terms]
+    tfs = [t.tfs for t in terms]
+    lens = [len(d) for d in docs]
+    prefix: List[float] = []
+    acc = 0.0
+    for t in terms:
+        acc += t.bound
+        prefix.append(acc)
+
+    pos = [0] * n
+    heap: List[Tuple[float, int]] = []  # (score, -doc): min-heap, later doc loses ties
+    threshold = -math.inf
+    first = 0  # terms[first:] are essential
+
+    while first < n:
+        cand = -1
+        for i in range(first, n):
+            if pos[i] < lens[i]:
+                d = docs[i][pos[i]]
+                if cand < 0 or d < cand:
+                    cand = d
+        if cand < 0:
+            break
+        if cand in deleted:
+            for i in range(first, n):
+                if pos[i] < lens[i] and docs[i][pos[i]] == cand:
+                    pos[i] += 1
+            continue
+
+        matched: List[Tuple[int, float]] = []  # (term, idf * tf-part)
+        partial = 0.0
+        nd = norm[cand]
+        for i in range(first, n):
+            j = pos[i]
+            if j < lens[i] and docs[i][j] == cand:
+                tf = tfs[i][j]
+                c = idfs[i] * (tf * k1p1 / (tf + nd))
+                matched.append((i, c))
+                partial += qtfs[i] * c
+                pos[i] = j + 1
+
+        pruned = False
+        for i in range(first - 1, -1, -1):
+            if partial + prefix[i] <= threshold:
+                pruned = True
+                break
+            j = bisect_left(docs[i], cand, pos[i])
+            pos[i] = j
+            if j < lens[i] and docs[i][j] == cand:
+                tf = tfs[i][j]
+                c = idfs[i] * (tf * k1p1 / (tf + nd))
+                matched.append((i, c))
+                partial += qtfs[i] * c
+                pos[i] = j + 1
+        if pruned:
+            continue
+
+        # Which lists are essential changes as the threshold rises, so re-add the
+        # contributions in query order: exactly tied docs then compare equal.
+        if len(matched) == 1 and qtfs[matched[0][0]] == 1:
+            score = matched[0][1]
+        else:
+            seq = sorted((p, c) for i, c in matched for p in terms[i].positions)
+            score = 0.0
+            for _, c in seq:
+                score += c
+
+        entry = (score, -cand)
+        if len(heap) < top_k:
+            heapq.heappush(heap, entry)
+        elif entry > heap[0]:
+            heapq.heapreplace(heap, entry)
+
+        if prune and len(heap) == top_k:
+            threshold = heap[0][0]
+            while first < n and prefix[first] <= threshold:
+                first += 1
+
+    return [(int(-neg_d), float(s)) for s, neg_d in sorted(heap, reverse=True)]
+
+
+def _fill_with_unmatched(
+    results: List[Tuple[int, float]],
+    term_docs: List[Sequence[int]],
+    n_docs: int,
+    top_k: int,
+    deleted: AbstractSet[int] = frozenset(),
+) -> List[Tuple[int, float]]:
+    # BM25Okapi ranks every document; docs sharing no query term score 0.0 and
+    # follow index order. Pull in the first top_k of them and re-merge.
+    taken = {d for d, _ in results} | set(deleted)
+    fill: List[Tuple[int, float]] = []
+    d = 0
+    while len(fill) < top_k and d < n_docs:
+        if d not in taken and not any(_contains(docs, d) for docs in term_docs):
+            fill.append((d, 0.0))
+        d += 1
+    merged = results + fill
+    merged.sort(key=lambda x: (-x[1], x[0]))
+    return merged[:top_k]
+
+
+def _contains(docs: Sequence[int], d: int) -> bool:
+    j = bisect_left(docs, d)
+    return j < len(docs) and docs[j] == d
+
+
+def _top_k_rows(
+    scores: np.ndarray,
+    top_k: int,
+    exclude: AbstractSet[int] = frozenset(),
+) -> List[List[Tuple[int, float]]]:
+    if exclude:
+        scores[:, list(exclude)] = -np.inf
+    n_rows, n_docs = scores.shape
+    k = min(top_k, n_docs)
+    if k < n_docs:
+        part = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    else:
+        part = np.broadcast_to(np.arange(n_docs), (n_rows, n_docs))
+
+    out: List[List[Tuple[int, float]]] = []
+    for r in range(n_rows):
+        row = scores[r]
+        # argpartition picks arbitrarily among equal scores at the cut; keep the
+        # lowest doc indices there so ties break exactly like search().
+        kth = row[part[r]].min()
+        above = np.flatnonzero(row > kth)
+        ties = np.flatnonzero(row == kth)[: k - len(above)]
+        idx = np.concatenate([above, ties])
+        idx = idx[np.lexsort((idx, -row[idx]))]
+        out.append([(int(i), float(row[i])) for i in idx if row[i] != -np.inf])
+    return out
@@ -1,13 +1,17 @@
 from __future__ import annotations
 
 import re
-from dataclasses import dataclass
-from typing import List, Dict, Any, Optional, Tuple
+import sys
+import threading
+from dataclasses import dataclass, field
+from typing import List, Dict, Any, Iterable, Optional, Sequence, Tuple
 
-from rank_bm25 import BM25Okapi
 from sqlalchemy import text
 
-from app.core.types import Chunk
+from app.core.types import Chunk, ChunkRef
+from app.indexing.bm25_engine import BM25Engine, BM25Searcher
+from app.indexing.bm25_segments import SegmentedBM25
+from app.indexing.bm25_snapshot import BM25Snapshot, write_snapshot
 from app.indexing.pgvector_store import PGVectorStore
 
 
@@ -19,14 +23,39 @@ def simple_tokenize(s: str) -> List[str]:
     return [t.lower() for t in _WORD_RE.findall(s)]
 
 
+# Background merge kicks in at this many delta segments, or once delta docs plus
+# tombstones exceed this fraction of the base segment (but at least _MERGE_MIN_DOCS).
+_MAX_DELTA_SEGMENTS = 8
+_MERGE_RATIO = 0.10
+_MERGE_MIN_DOCS = 1000
+
+
 @dataclass
 class BM25Index:
     chunks: List[Chunk]
-    tokenized: List[List[str]]
-    bm25: Optional[BM25Okapi]
+    engine: Optional[BM25Searcher]
+    # Snapshot-backed and keep_text=False indexes keep only chunk ids; hit text is
+    # fetched from Postgres.
+    chunk_ids: Optional[Sequence[str]] = None
+    store: Optional[PGVectorStore] = None
+    keep_text: bool = True
+    background_merge: bool = True
+
+    # Readers take (engine, chunks, chunk_ids) under _lock; updates build new
+    # objects under _write_lock and swap them in, so searches never block on them.
+    _lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False, compare=False)
+    _write_lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False, compare=False)
+    _positions: Optional[Dict[str, int]] = field(default=None, init=False, repr=False, compare=False)
+    _merging: bool = field(default=False, init=False, repr=False, compare=False)
 
     @classmethod
-    def build_from_pg(cls, store: PGVectorStore, doc_id_filter: Optional[str] = None) -> "BM25Index":
+    def build_from_pg(
+        cls,
+        store: PGVectorStore,
+        doc_id_filter: Optional[str] = None,
+        keep_text: bool = True,
+    ) -> "BM25Index":
+        """keep_text=False keeps only chunk ids after tokenizing (hit text comes from `store`)."""
         where_clause = ""
         params: Dict[str, Any] = {}
         if doc_id_filter:
@@ -53,23 +82,204 @@ class BM25Index:
                     )
                 )
 
-        tokenized = [simple_tokenize(c.text) for c in chunks]
+        index = cls.from_chunks(chunks)
+        if keep_text:
+            return index
+        return cls(chunks=[], engine=index.engine, chunk_ids=[c.chunk_id for c in chunks], store=store, keep_text=False)
 
+    @classmethod
+    def from_chunks(cls, chunks: List[Chunk]) -> "BM25Index":
         # Safety: if no chunks, return empty BM25 (prevents crash from empty corpus)
         if len(chunks) == 0:
-            return cls(chunks=[], tokenized=[], bm25=None)  # type: ignore
+            return cls(chunks=[], engine=None)
+
+        engine = BM25Engine.from_tokenized(simple_tokenize(c.text) for c in chunks)
+        return cls(chunks=chunks, engine=engine)
+
+    @classmethod
+    def open_snapshot(cls, path: str, store: PGVectorStore) -> "BM25Index":
+        """Opens a snapshot written by save_snapshot(); O(1), postings stay on disk (mmap)."""
+        snap = BM25Snapshot(path)
+        return cls(chunks=[], engine=snap, chunk_ids=snap.chunk_ids, store=store, keep_text=False)
 
-        bm25 = BM25Okapi(tokenized)
-        return cls(chunks=chunks, tokenized=tokenized, bm25=bm25)
+    def save_snapshot(self, path: str, meta: Optional[Dict[str, Any]] = None) -> None:
+        if not isinstance(self.engine, BM25Engine):
+            raise ValueError("only an in-memory BM25Index can be snapshotted")
+        ids = [c.chunk_id for c in self.chunks] if self.chunks else list(self.chunk_ids or [])
+        write_snapshot(path, self.engine, ids, meta=meta)
 
-    def search(self, query: str, top_k: int = 20) -> List[Tuple[Chunk, float]]:
+    def search(self, query: str, top_k: int = 20, with_text: bool = True) -> List[Tuple[Chunk, float]]:
+        """with_text=False returns ChunkRef hits and never touches Postgres."""
+        engine, chunks, chunk_ids = self._state()
         # Safety: if no chunks or BM25 not initialized, return empty results
-        if self.bm25 is None or not self.chunks:
+        if engine is None or engine.n_docs == 0:
             return []
 
-        q_tokens = simple_tokenize(query)
-        scores = self.bm25.get_scores(q_tokens)
+        hits = engine.search(simple_tokenize(query), top_k)
+        if not with_text:
+            return _with_refs([hits], chunks, chunk_ids)[0]
+        return self._with_chunks([hits], chunks, chunk_ids)[0]
+
+    def search_batch(self, queries: List[str], top_k: int = 20) -> List[List[Tuple[Chunk, float]]]:
+        # Many queries in one sparse matrix product; same results as calling search() per query.
+        engine, chunks, chunk_ids = self._state()
+        if engine is None or engine.n_docs == 0:
+            return [[] for _ in queries]
+
+        batch = engine.search_batch([simple_tokenize(q) for q in queries], top_k)
+        return self._with_chunks(batch, chunks, chunk_ids)
+
+    def add_chunks(self, chunks: Sequence[Chunk]) -> None:
+        """
+        Makes chunks searchable without a rebuild: they go into a new in-memory
+        delta segment, and chunks already in the index (same chunk_id) are replaced.
+        Corpus statistics are kept consistent across segments (see SegmentedBM25).
+        """
+        new = list({c.chunk_id: c for c in chunks}.values())
+        if not new:
+            return
+
+        with self._write_lock:
+            engine, all_chunks, chunk_ids = self._state()
+            if engine is None or engine.n_docs == 0:
+                fresh = BM25Index.from_chunks(new)
+                self._positions = {c.chunk_id: i for i, c in enumerate(new)}
+                if self.keep_text:
+                    self._swap(fresh.engine, fresh.chunks, None)
+                else:
+                    self._swap(fresh.engine, [], [c.chunk_id for c in new])
+                return
+
+            positions = self._position_map(all_chunks, chunk_ids)
+            view = engine if isinstance(engine, SegmentedBM25) else SegmentedBM25(engine)
+            replaced = [positions.pop(c.chunk_id) for c in new if c.chunk_id in positions]
+            if replaced:
+                view = view.with_removed(replaced)
+            offset = view.n_docs
+            view = view.with_added(simple_tokenize(c.text) for c in new)
+            for i, c in enumerate(new, start=offset):
+                positions[c.chunk_id] = i
+
+            if all_chunks:
+                self._swap(view, all_chunks + new, None)
+            else:
+                assert chunk_ids is not None
+                self._swap(view, [], list(chunk_ids) + [c.chunk_id for c in new])
+        self._maybe_merge()
+
+    def remove_chunks(self, chunk_ids: Iterable[str]) -> None:
+        """Tombstones chunks; they stop matching immediately and are dropped at the next merge."""
+        with self._write_lock:
+            engine, all_chunks, ids = self._state()
+            if engine is None:
+                return
+            positions = self._position_map(all_chunks, ids)
+            doomed = [positions.pop(cid) for cid in set(chunk_ids) if cid in positions]
+            if not doomed:
+                return
+            view = engine if isinstance(engine, SegmentedBM25) else SegmentedBM25(engine)
+            self._swap(view.with_removed(doomed), all_chunks, ids)
+        self._maybe_merge()
+
+    def needs_compaction(self) -> bool:
+        engine = self.engine
+        if not isinstance(engine, SegmentedBM25):
+            return False
+        budget = _MERGE_RATIO * max(engine.base.n_docs, _MERGE_MIN_DOCS)
+        return len(engine.deltas) >= _MAX_DELTA_SEGMENTS or engine.n_delta_docs + engine.n_deleted > budget
+
+    def compact(self) -> bool:
+        """
+        Merges all segments into one BM25Engine. The merge runs without holding
+        any lock; if an update lands meanwhile the result is discarded and False
+        is returned (as it is when there is nothing to merge).
+        """
+        engine, chunks, chunk_ids = self._state()
+        if not isinstance(engine, SegmentedBM25):
+            return False
+
+        merged, kept = engine.compact()
+        new_chunks = [chunks[i] for i in kept] if chunks else []
+        new_ids = None if chunks else [chunk_ids[i] for i in kept]  # type: ignore[index]
+
+        with self._write_lock:
+            if self.engine is not engine:
+                return False
+            self._positions = None  # ids were renumbered; rebuilt on next update
+            self._swap(merged, new_chunks, new_ids)
+        return True
+
+    def approx_nbytes(self) -> int:
+        # Rough resident size (chunk text + postings); used for cache budgeting.
+        n = self.engine.approx_nbytes() if self.engine is not None else 0
+        for c in self.chunks:
+            n += sys.getsizeof(c.text) + sys.getsizeof(c.chunk_id) + 200
+        if isinstance(self.chunk_ids, list):  # text-less in-memory index (snapshot ids live on disk)
+            n += sum(sys.getsizeof(cid) + 8 for cid in self.chunk_ids)
+        return n
+
+    def _state(self) -> Tuple[Optional[BM25Searcher], List[Chunk], Optional[Sequence[str]]]:
+        with self._lock:
+            return self.engine, self.chunks, self.chunk_ids
+
+    def _swap(self, engine: Optional[BM25Searcher], chunks: List[Chunk], chunk_ids: Optional[Sequence[str]]) -> None:
+        with self._lock:
+            self.engine, self.chunks, self.chunk_ids = engine, chunks, chunk_ids
+
+    def _position_map(self, chunks: List[Chunk], chunk_ids: Optional[Sequence[str]]) -> Dict[str, int]:
+        # chunk_id -> live doc id; writer-only state, guarded by _write_lock.
+        if self._positions is None:
+            ids = [c.chunk_id for c in chunks] if chunks else list(chunk_ids or [])
+            self._positions = {cid: i for i, cid in enumerate(ids)}
+        return self._positions
+
+    def _maybe_merge(self) -> None:
+        if not self.background_merge or not self.needs_compaction():
+            return
+        with self._lock:
+            if self._merging:
+                return
+            self._merging = True
+        threading.Thread(target=self._merge_worker, name="bm25-merge", daemon=True).start()
+
+    def _merge_worker(self) -> None:
+        try:
+            for _ in range(3):  # retry when an update raced the merge
+                if self.compact() or not self.needs_compaction():
+                    break
+        finally:
+            with self._lock:
+                self._merging = False
+
+    def _with_chunks(
+        self,
+        batch: List[List[Tuple[int, float]]],
+        chunks: List[Chunk],
+        chunk_ids: Optional[Sequence[str]],
+    ) -> List[List[Tuple[Chunk, float]]]:
+        if chunks:
+            return [[(chunks[i], score) for i, score in hits] for hits in batch]
+
+        # Lazy path: one round trip for every hit in the batch.
+        assert chunk_ids is not None and self.store is not None
+        by_id = self.store.get_chunks_by_ids(list({chunk_ids[i] for hits in batch for i, _ in hits}))
+        out: List[List[Tuple[Chunk, float]]] = []
+        for hits in batch:
+            row = []
+            for i, score in hits:
+                chunk = by_id.get(chunk_ids[i])
+                if chunk is not None:  # deleted since the snapshot was taken
+                    row.append((chunk, score))
+            out.append(row)
+        return out
+
 
-        # Get top_k indices by score desc
-        ranked = sorted(range(len(scores)), key=lambda i: scores[i], reverse=True)[:top_k]
-        return [(self.chunks[i], float(scores[i])) for i in ranked]
+def _with_refs(
+    batch: List[List[Tuple[int, float]]],
+    chunks: List[Chunk],
+    chunk_ids: Optional[Sequence[str]],
+) -> List[List[Tuple[ChunkRef, float]]]:
+    if chunks:
+        return [[(ChunkRef(chunks[i].chunk_id, chunks[i].doc_id), score) for i, score in hits] for hits in batch]
+    assert chunk_ids is not None
+    return [[(ChunkRef(chunk_ids[i]), score) for i, score in hits] for hits in batch]
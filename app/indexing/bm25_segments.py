@@ -0,0 +1,293 @@
+from __future__ import annotations
+
+import math
+import sys
+from array import array
+from collections import Counter
+from typing import AbstractSet, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple, Union
+
+import numpy as np
+from scipy import sparse
+
+from app.indexing.bm25_engine import BM25Engine, BM25Searcher, Postings, TermList, _weight_matrix_from_arrays
+from app.indexing.bm25_snapshot import BM25Snapshot
+
+BaseSegment = Union[BM25Engine, BM25Snapshot]
+
+
+class SegmentedBM25(BM25Searcher):
+    """
+    Immutable BM25 view over one large base segment (BM25Engine or BM25Snapshot),
+    small in-memory delta segments appended after it, and tombstoned doc ids.
+
+    Doc ids are global: base docs keep their ids, each delta continues the id
+    space. Corpus statistics (live N, avgdl, df and the idf floor) are computed
+    across all segments minus tombstones, so scores equal a rebuild over the live
+    docs (up to float rounding of the idf floor average).
+
+    with_added() / with_removed() return a new view and never touch the old one,
+    so readers holding a view are unaffected by updates. compact() merges
+    everything into a single BM25Engine.
+    """
+
+    def __init__(
+        self,
+        base: BaseSegment,
+        deltas: Sequence["_Delta"] = (),
+        deleted: AbstractSet[int] = frozenset(),
+        df_adjust: Optional[Mapping[str, int]] = None,
+        _stats: Optional["_BaseStats"] = None,
+    ):
+        super().__init__()
+        self.base = base
+        self.deltas: Tuple[_Delta, ...] = tuple(deltas)
+        self._deleted = frozenset(deleted)
+        # df change relative to the base segment (deltas added, tombstones removed)
+        self._df_adjust: Dict[str, int] = dict(df_adjust or {})
+        self._stats = _stats or _BaseStats(base)
+        self.k1 = base.k1
+        self.b = base.b
+        self.epsilon = base.epsilon
+
+        doc_len = np.concatenate([self._stats.doc_len] + [np.asarray(d.doc_len, dtype=np.int64) for d in self.deltas])
+        self._n_docs = len(doc_len)
+        self.n_live = self._n_docs - len(self._deleted)
+        total_len = int(doc_len.sum())
+        if self._deleted:
+            total_len -= int(doc_len[sorted(self._deleted)].sum())
+        self.avgdl = (total_len / self.n_live) if self.n_live else 0.0
+        avgdl = self.avgdl or 1.0
+        self._norm_arr = self.k1 * (1 - self.b + self.b * doc_len / avgdl)
+        self._norm = self._norm_arr.tolist()
+
+        # Okapi floors negative idfs at epsilon * mean idf over the live vocabulary.
+        df = self._live_df()
+        idf = np.log(self.n_live - df + 0.5) - np.log(df + 0.5)
+        self._eps = self.epsilon * float(idf.mean()) if len(idf) else 0.0
+        self._max_tf_cache: Dict[Tuple[int, str], float] = {}
+
+    @property
+    def n_docs(self) -> int:
+        return self._n_docs
+
+    @property
+    def n_delta_docs(self) -> int:
+        return sum(d.n_docs for d in self.deltas)
+
+    @property
+    def n_deleted(self) -> int:
+        return len(self._deleted)
+
+    def with_added(self, tokenized: Iterable[Sequence[str]]) -> "SegmentedBM25":
+        """New view with the given docs appended as one delta segment (ids n_docs, n_docs+1, ...)."""
+        delta = _Delta(tokenized, self._n_docs)
+        if delta.n_docs == 0:
+            return self
+        adjust = dict(self._df_adjust)
+        for term, (docs, _) in delta.postings.items():
+            adjust[term] = adjust.get(term, 0) + len(docs)
+        return SegmentedBM25(self.base, self.deltas + (delta,), self._deleted, adjust, self._stats)
+
+    def with_removed(self, doc_ids: Iterable[int]) -> "SegmentedBM25":
+        """New view with the given doc ids tombstoned; unknown or already removed ids are ignored."""
+        ids = {int(d) for d in doc_ids if 0 <= d < self._n_docs} - self._deleted
+        if not ids:
+            return self
+        adjust = dict(self._df_adjust)
+        for term, c in self._term_doc_counts(ids).items():
+            adjust[term] = adjust.get(term, 0) - c
+        return SegmentedBM25(self.base, self.deltas, self._deleted | ids, adjust, self._stats)
+
+    def compact(self) -> Tuple[BM25Engine, List[int]]:
+        """
+        Merges base + deltas into one BM25Engine without the tombstoned docs.
+        Returns (engine, kept) where kept[new_id] is the doc's id in this view.
+        """
+        keep = np.ones(self._n_docs, dtype=bool)
+        if self._deleted:
+            keep[sorted(self._deleted)] = False
+        remap = np.cumsum(keep) - 1
+        kept = np.flatnonzero(keep)
+
+        postings: Dict[str, Postings] = {}
+        arrs = self._stats.arrays()
+        indptr, docs, tfs = arrs["indptr"], arrs["docs"], arrs["tfs"]
+        live = keep[docs]
+        new_docs = remap[docs].astype(np.int32)
+        for row, term in enumerate(self._stats.terms):
+            lo, hi = int(indptr[row]), int(indptr[row + 1])
+            m = live[lo:hi]
+            if m.any():
+                postings[term] = (_int_array(new_docs[lo:hi][m]), _int_array(tfs[lo:hi][m]))
+
+        # Delta ids are above every base id, so appending keeps postings sorted.
+        for delta in self.deltas:
+            for term, (d_docs, d_tfs) in delta.postings.items():
+                for d, tf in zip(d_docs, d_tfs):
+                    if keep[d]:
+                        p = postings.get(term)
+                        if p is None:
+                            p = postings[term] = (array("i"), array("i"))
+                        p[0].append(int(remap[d]))
+                        p[1].append(tf)
+
+        doc_len = np.concatenate([self._stats.doc_len] + [np.asarray(d.doc_len, dtype=np.int64) for d in self.deltas])
+        engine = BM25Engine(postings, doc_len[kept].tolist(), k1=self.k1, b=self.b, epsilon=self.epsilon)
+        return engine, kept.tolist()
+
+    def _lookup(self, term: str) -> Optional[Tuple[float, List[TermList]]]:
+        df = self._df(term)
+        if df <= 0:
+            return None
+        idf = math.log(self.n_live - df + 0.5) - math.log(df + 0.5)
+        if idf < 0:
+            idf = self._eps
+
+        lists: List[TermList] = []
+        if term in self._stats.rows:
+            found = self.base._lookup(term)
+            if found is not None:
+                docs, tfs, _ = found[1][0]
+                lists.append((docs, tfs, self._max_tf_part(0, term, docs, tfs)))
+        for seg, delta in enumerate(self.deltas, start=1):
+            p = delta.postings.get(term)
+            if p is not None:
+                lists.append((p[0], p[1], self._max_tf_part(seg, term, p[0], p[1])))
+        return idf, lists
+
+    def _build_weight_matrix(self) -> Tuple[sparse.csr_matrix, Mapping[str, int]]:
+        arrs = self._stats.arrays()
+        term_ids: Dict[str, int] = dict(self._stats.rows)
+        rows = [np.repeat(np.arange(len(arrs["indptr"]) - 1), np.diff(arrs["indptr"]))]
+        cols = [np.asarray(arrs["docs"], dtype=np.int64)]
+        vals = [np.asarray(arrs["tfs"], dtype=np.int64)]
+        for delta in self.deltas:
+            for term, (docs, tfs) in delta.postings.items():
+                t = term_ids.setdefault(term, len(term_ids))
+                rows.append(np.full(len(docs), t))
+                cols.append(np.asarray(docs, dtype=np.int64))
+                vals.append(np.asarray(tfs, dtype=np.int64))
+        tf = sparse.csr_matrix(
+            (np.concatenate(vals), (np.concatenate(rows), np.concatenate(cols))),
+            shape=(len(term_ids), self._n_docs),
+        )
+
+        idf = np.zeros(len(term_ids), dtype=np.float64)
+        for term, t in term_ids.items():
+            found = self._df(term)
+            if found > 0:
+                v = math.log(self.n_live - found + 0.5) - math.log(found + 0.5)
+                idf[t] = self._eps if v < 0 else v
+        matrix = _weight_matrix_from_arrays(tf.indptr, tf.indices, tf.data, idf, self._norm_arr, self.k1, self._n_docs)
+        return matrix, term_ids
+
+    def approx_nbytes(self) -> int:
+        n = self.base.approx_nbytes() + 16 * self._n_docs + 64 * len(self._deleted)
+        for delta in self.deltas:
+            n += delta.approx_nbytes()
+        if self._matrix is not None:
+            n += self._matrix.data.nbytes + self._matrix.indices.nbytes
+        return n
+
+    # --- internals ---
+
+    def _df(self, term: str) -> int:
+        row = self._stats.rows.get(term)
+        base = int(self._stats.df[row]) if row is not None else 0
+        return base + self._df_adjust.get(term, 0)
+
+    def _live_df(self) -> np.ndarray:
+        df = self._stats.df.astype(np.int64)
+        extra: List[int] = []
+        for term, c in self._df_adjust.items():
+            row = self._stats.rows.get(term)
+            if row is None:
+                extra.append(c)
+            else:
+                df[row] += c
+        if extra:
+            df = np.concatenate([df, np.asarray(extra, dtype=np.int64)])
+        return df[df > 0]
+
+    def _max_tf_part(self, seg: int, term: str, docs: Sequence[int], tfs: Sequence[int]) -> float:
+        # Upper bound of the tf saturation under this view's norms (tombstoned docs included).
+        key = (seg, term)
+        v = self._max_tf_cache.get(key)
+        if v is None:
+            tf = np.asarray(tfs, dtype=np.float64)
+            nd = self._norm_arr[np.asarray(docs, dtype=np.int64)]
+            v = self._max_tf_cache[key] = float(np.max(tf * (self.k1 + 1) / (tf + nd)))
+        return v
+
+    def _term_doc_counts(self, ids: AbstractSet[int]) -> Dict[str, int]:
+        """For each term, how many of `ids` contain it (the df to subtract)."""
+        counts: Counter = Counter()
+        base_ids = sorted(i for i in ids if i < self.base.n_docs)
+        if base_ids:
+            arrs = self._stats.arrays()
+            if len(arrs["docs"]):
+                hit = np.isin(arrs["docs"], base_ids).astype(np.int64)
+                per_term = np.add.reduceat(hit, arrs["indptr"][:-1])  # no term has empty postings
+                for row in np.flatnonzero(per_term):
+                    counts[self._stats.terms[row]] += int(per_term[row])
+        for delta in self.deltas:
+            if any(delta.offset <= i < delta.offset + delta.n_docs for i in ids):
+                for term, (docs, _) in delta.postings.items():
+                    c = sum(1 for d in docs if d in ids)
+                    if c:
+                        counts[term] += c
+        return dict(counts)
+
+
+class _Delta:
+    """Small in-memory segment whose postings already use global doc ids."""
+
+    def __init__(self, tokenized: Iterable[Sequence[str]], offset: int):
+        self.offset = offset
+        self.postings: Dict[str, Postings] = {}
+        self.doc_len = array("i")
+        for d, tokens in enumerate(tokenized, start=offset):
+            self.doc_len.append(len(tokens))
+            for term, tf in Counter(tokens).items():
+                p = self.postings.get(term)
+                if p is None:
+                    p = self.postings[term] = (array("i"), array("i"))
+                p[0].append(d)
+                p[1].append(tf)
+
+    @property
+    def n_docs(self) -> int:
+        return len(self.doc_len)
+
+    def approx_nbytes(self) -> int:
+        n = sys.getsizeof(self.postings) + 4 * len(self.doc_len)
+        for term, (docs, tfs) in self.postings.items():
+            n += sys.getsizeof(term) + 200 + 4 * (len(docs) + len(tfs))
+        return n
+
+
+class _BaseStats:
+    # Per-base-segment data shared by every view over that base (computed once).
+
+    def __init__(self, base: BaseSegment):
+        self.base = base
+        self.terms: Sequence[str] = base.vocabulary()
+        self.rows: Dict[str, int] = {t: i for i, t in enumerate(self.terms)}
+        self.doc_len = np.asarray(base.doc_len, dtype=np.int64)
+        if isinstance(base, BM25Snapshot):
+            self.df = np.diff(base.to_arrays()["indptr"])
+        else:
+            self.df = np.fromiter((len(base.postings[t][0]) for t in self.terms), dtype=np.int64, count=len(self.terms))
+        self._arrays: Optional[Dict[str, np.ndarray]] = None
+
+    def arrays(self) -> Dict[str, np.ndarray]:
+        # Flattened postings; only needed for removals, batch search and compaction.
+        if self._arrays is None:
+            self._arrays = self.base.to_arrays(list(self.terms)) if isinstance(self.base, BM25Engine) else self.base.to_arrays()
+        return self._arrays
+
+
+def _int_array(values: np.ndarray) -> array:
+    out = array("i")
+    out.frombytes(np.ascontiguousarray(values, dtype=np.int32).tobytes())
+    return out
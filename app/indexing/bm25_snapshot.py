@@ -0,0 +1,283 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import mmap
+import os
+import re
+import struct
+from pathlib import Path
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+from scipy import sparse
+
+from app.indexing.bm25_engine import BM25Engine, BM25Searcher, TermList, _weight_matrix_from_arrays
+
+# On-disk BM25 snapshot format (little-endian, one file):
+#
+#   8 bytes   magic b"BM25SNP1"
+#   8 bytes   uint64 header length H
+#   H bytes   JSON header: params, corpus stats, caller meta and a section table
+#             {name: [offset, count, dtype]}
+#   ...       sections, each 8-byte aligned:
+#             vocab_offsets int64[V+1], vocab_blob uint8[]   (terms, sorted, utf-8)
+#             indptr int64[V+1], docs int32[P], tfs int32[P] (postings, CSR layout)
+#             idf float64[V], max_tf_part float64[V]
+#             doc_len int32[N]
+#             chunk_id_offsets int64[N+1], chunk_id_blob uint8[]
+#
+# Everything is read through np.frombuffer over a read-only mmap, so opening is
+# cheap and several processes share the same pages via the OS page cache.
+
+MAGIC = b"BM25SNP1"
+_ALIGN = 8
+
+
+def write_snapshot(path: str, engine: BM25Engine, chunk_ids: Sequence[str], meta: Optional[Dict[str, Any]] = None) -> None:
+    """Writes atomically (temp file + rename), so readers never see a partial snapshot."""
+    if len(chunk_ids) != engine.n_docs:
+        raise ValueError("chunk_ids must have one entry per indexed document")
+
+    terms = sorted(engine.postings.keys())
+    arrs = engine.to_arrays(terms)
+    vocab_offsets, vocab_blob = _pack_strings(terms)
+    chunk_id_offsets, chunk_id_blob = _pack_strings(chunk_ids)
+
+    sections: List[Tuple[str, np.ndarray]] = [
+        ("vocab_offsets", vocab_offsets),
+        ("vocab_blob", vocab_blob),
+        ("indptr", arrs["indptr"]),
+        ("docs", arrs["docs"]),
+        ("tfs", arrs["tfs"]),
+        ("idf", arrs["idf"]),
+        ("max_tf_part", arrs["max_tf_part"]),
+        ("doc_len", arrs["doc_len"]),
+        ("chunk_id_offsets", chunk_id_offsets),
+        ("chunk_id_blob", chunk_id_blob),
+    ]
+
+    header: Dict[str, Any] = {
+        "k1": engine.k1,
+        "b": engine.b,
+        "epsilon": engine.epsilon,
+        "n_docs": engine.n_docs,
+        "avgdl": engine.avgdl,
+        "n_terms": len(terms),
+        "meta": meta or {},
+        "sections": {},
+    }
+
+    # Offsets depend on the header length, which depends on the offsets: lay out
+    # with a provisional header, then pad the real one to the same size.
+    def layout(header_len: int) -> int:
+        offset = _aligned(len(MAGIC) + 8 + header_len)
+        for name, arr in sections:
+            header["sections"][name] = [offset, int(arr.size), arr.dtype.str]
+            offset = _aligned(offset + arr.nbytes)
+        return offset
+
+    header_len = len(json.dumps(header).encode("utf-8")) + 512
+    end = layout(header_len)
+    header_bytes = json.dumps(header).encode("utf-8")
+    if len(header_bytes) > header_len:
+        raise RuntimeError("snapshot header grew past its reserved size")
+    header_bytes = header_bytes.ljust(header_len, b" ")
+
+    tmp = f"{path}.tmp.{os.getpid()}"
+    with open(tmp, "wb") as f:
+        f.write(MAGIC)
+        f.write(struct.pack("<Q", header_len))
+        f.write(header_bytes)
+        for name, arr in sections:
+            offset = header["sections"][name][0]
+            f.write(b"\0" * (offset - f.tell()))
+            f.write(np.ascontiguousarray(arr).tobytes())
+        f.write(b"\0" * (end - f.tell()))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+class BM25Snapshot(BM25Searcher):
+    """
+    Read-only, mmap-backed BM25 engine opened from write_snapshot() output.
+
+    Postings are searched in place (zero-copy numpy views); only the per-doc
+    norm vector is materialized at open time.
+    """
+
+    def __init__(self, path: str):
+        super().__init__()
+        self.path = str(path)
+        self._file = open(self.path, "rb")
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if self._mm[: len(MAGIC)] != MAGIC:
+            self.close()
+            raise ValueError(f"{path} is not a BM25 snapshot")
+        (header_len,) = struct.unpack_from("<Q", self._mm, len(MAGIC))
+        header = json.loads(self._mm[len(MAGIC) + 8: len(MAGIC) + 8 + header_len])
+
+        self.k1 = float(header["k1"])
+        self.b = float(header["b"])
+        self.epsilon = float(header["epsilon"])
+        self.avgdl = float(header["avgdl"])
+        self.meta: Dict[str, Any] = header.get("meta") or {}
+        self._n_docs = int(header["n_docs"])
+
+        a = {name: self._section(*spec) for name, spec in header["sections"].items()}
+        self._vocab = _PackedStrings(a["vocab_offsets"], a["vocab_blob"])
+        self._indptr = a["indptr"]
+        self._docs = a["docs"]
+        self._tfs = a["tfs"]
+        self._idf = a["idf"]
+        self._max_tf_part = a["max_tf_part"]
+        self.doc_len = a["doc_len"]
+        self.chunk_ids = _PackedStrings(a["chunk_id_offsets"], a["chunk_id_blob"])
+
+        avgdl = self.avgdl or 1.0
+        self._norm = self.k1 * (1 - self.b + self.b * self.doc_len / avgdl)
+
+    @property
+    def n_docs(self) -> int:
+        return self._n_docs
+
+    def _lookup(self, term: str) -> Optional[Tuple[float, List[TermList]]]:
+        t = self._vocab.index_of(term)
+        if t is None:
+            return None
+        lo, hi = int(self._indptr[t]), int(self._indptr[t + 1])
+        return float(self._idf[t]), [(self._docs[lo:hi], self._tfs[lo:hi], float(self._max_tf_part[t]))]
+
+    def vocabulary(self) -> Sequence[str]:
+        return self._vocab
+
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        """Same keys as BM25Engine.to_arrays(), as zero-copy views (rows in vocabulary order)."""
+        return {
+            "indptr": self._indptr,
+            "docs": self._docs,
+            "tfs": self._tfs,
+            "idf": self._idf,
+            "max_tf_part": self._max_tf_part,
+            "doc_len": self.doc_len,
+        }
+
+    def _build_weight_matrix(self) -> Tuple[sparse.csr_matrix, Mapping[str, int]]:
+        matrix = _weight_matrix_from_arrays(
+            self._indptr, self._docs, self._tfs, self._idf, self._norm, self.k1, self.n_docs,
+        )
+        return matrix, _VocabIds(self._vocab)
+
+    def approx_nbytes(self) -> int:
+        # Private memory only; the mapped file lives in the shared page cache.
+        n = self._norm.nbytes + 4096
+        if self._matrix is not None:
+            n += self._matrix.data.nbytes
+        return n
+
+    def close(self) -> None:
+        for attr in ("_vocab", "_indptr", "_docs", "_tfs", "_idf", "_max_tf_part", "doc_len", "chunk_ids", "_matrix"):
+            self.__dict__.pop(attr, None)
+        self._mm.close()
+        self._file.close()
+
+    def _section(self, offset: int, count: int, dtype: str) -> np.ndarray:
+        return np.frombuffer(self._mm, dtype=np.dtype(dtype), count=count, offset=offset)
+
+
+class _PackedStrings(Sequence[str]):
+    """Read-only list of utf-8 strings stored as an offsets array + one byte blob."""
+
+    def __init__(self, offsets: np.ndarray, blob: np.ndarray):
+        self._offsets = offsets
+        self._blob = blob
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, i):  # type: ignore[override]
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        return self._raw(i).decode("utf-8")
+
+    def index_of(self, s: str) -> Optional[int]:
+        # Binary search; only valid for sorted string tables (the vocabulary).
+        key = s.encode("utf-8")
+        lo, hi = 0, len(self)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._raw(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < len(self) and self._raw(lo) == key:
+            return lo
+        return None
+
+    def _raw(self, i: int) -> bytes:
+        return self._blob[int(self._offsets[i]): int(self._offsets[i + 1])].tobytes()
+
+
+class _VocabIds(Mapping[str, int]):
+    # term -> row id view over the sorted vocabulary, without building a dict.
+    def __init__(self, vocab: _PackedStrings):
+        self._vocab = vocab
+
+    def __getitem__(self, term: str) -> int:
+        t = self._vocab.index_of(term)
+        if t is None:
+            raise KeyError(term)
+        return t
+
+    def get(self, term, default=None):  # type: ignore[override]
+        t = self._vocab.index_of(term)
+        return default if t is None else t
+
+    def __len__(self) -> int:
+        return len(self._vocab)
+
+    def __iter__(self):
+        return iter(self._vocab)
+
+
+def _pack_strings(items: Sequence[str]) -> Tuple[np.ndarray, np.ndarray]:
+    encoded = [s.encode("utf-8") for s in items]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(e) for e in encoded], out=offsets[1:])
+    blob = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+    return offsets, blob
+
+
+def _aligned(n: int) -> int:
+    return (n + _ALIGN - 1) // _ALIGN * _ALIGN
+
+
+def snapshot_path(snapshot_dir: str, scope: Optional[str], version: int) -> Path:
+    # One file per (doc_id scope, corpus version); scope None is the whole corpus.
+    if scope is None:
+        name = "all"
+    else:
+        safe = re.sub(r"[^A-Za-z0-9_.-]", "_", scope)[:64]
+        name = f"doc-{safe}-{hashlib.sha1(scope.encode('utf-8')).hexdigest()[:8]}"
+    return Path(snapshot_dir) / f"bm25_{name}_v{version}.snap"
+
+
+def prune_snapshots(snapshot_dir: str, scope: Optional[str], keep_version: int) -> None:
+    # Drop older versions for this scope. Processes that still map them keep a
+    # valid mapping until they close it (POSIX unlink semantics).
+    current = snapshot_path(snapshot_dir, scope, keep_version)
+    prefix = current.name[: current.name.rindex("_v") + 2]
+    for p in Path(snapshot_dir).glob(f"{prefix}*.snap"):
+        try:
+            version = int(p.name[len(prefix): -len(".snap")])
+        except ValueError:
+            continue
+        if version < keep_version:
+            try:
+                p.unlink()
+            except FileNotFoundError:
+                pass
@@ -0,0 +1,172 @@
+from __future__ import annotations
+
+import sys
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from app.core.cache import LRUCache
+from app.core.types import Chunk
+from app.indexing.pgvector_store import PGVectorStore
+from app.indexing.pgvector_store_async import AsyncPGVectorStore
+
+
+class _ChunkCacheBase:
+    """
+    Process-wide chunk_id -> Chunk cache in front of get_chunks_by_ids, so hot
+    chunks are not re-read and re-allocated on every request.
+
+    - Bounded by `max_bytes` (approximate text + metadata size), LRU eviction.
+    - Invalidated through the corpus change log, like BM25IndexCache: the
+      version is checked at most every `version_check_interval` seconds and up
+      to `max_incremental_changes` changed chunk_ids are dropped; more, or a
+      row without a chunk_id, clears the cache.
+    - A fetch that raced an invalidation is returned but not cached.
+
+    ChunkCache and AsyncChunkCache are drop-ins for PGVectorStore and
+    AsyncPGVectorStore wherever only get_chunks_by_ids is used (late hydration,
+    the vector replica retriever).
+    """
+
+    def __init__(
+        self,
+        store: Any,
+        max_bytes: int = 64 * 1024 * 1024,
+        version_check_interval: float = 1.0,
+        max_incremental_changes: int = 5000,
+    ):
+        self.store = store
+        self.version_check_interval = version_check_interval
+        self.max_incremental_changes = max_incremental_changes
+        self._entries: LRUCache[str, Chunk] = LRUCache(max_bytes=max_bytes, sizeof=_chunk_nbytes)
+        self._lock = threading.Lock()
+        self._version: Optional[int] = None
+        self._checked_at = 0.0
+        self._generation = 0  # bumped by every invalidation
+
+        self.invalidated = 0
+        self.clears = 0
+
+    def invalidate(self, chunk_ids: Sequence[str]) -> None:
+        with self._lock:
+            self._generation += 1
+            for cid in chunk_ids:
+                if self._entries.pop(cid) is not None:
+                    self.invalidated += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+            self.clears += 1
+
+    def stats(self) -> Dict[str, Any]:
+        entries = self._entries.stats()
+        return {
+            "entries": entries["entries"],
+            "bytes": entries["bytes"],
+            "max_bytes": self._entries.max_bytes,
+            "hits": entries["hits"],
+            "misses": entries["misses"],
+            "hit_ratio": entries["hit_ratio"],
+            "evictions": entries["evictions"],
+            "invalidated": self.invalidated,
+            "clears": self.clears,
+            "version": self._version,
+        }
+
+    # --- internals (shared by the sync and async caches) ---
+
+    def _check_due(self) -> bool:
+        return time.monotonic() - self._checked_at >= self.version_check_interval
+
+    def _version_changed(self, version: int) -> bool:
+        self._checked_at = time.monotonic()
+        if self._version is None:
+            self._version = version  # first check: nothing cached can predate it
+            return False
+        return version != self._version
+
+    def _apply(self, version: int, changes: Optional[List[Dict[str, Any]]]) -> None:
+        # changes=None (incremental disabled), too many, or a doc-level row: clear.
+        if (
+            changes is None
+            or len(changes) > self.max_incremental_changes
+            or any(c["chunk_id"] is None for c in changes)
+        ):
+            self.clear()
+        else:
+            self.invalidate({c["chunk_id"] for c in changes})
+        self._version = version
+
+    def _lookup(self, chunk_ids: Sequence[str]) -> Tuple[Dict[str, Chunk], List[str], int]:
+        with self._lock:
+            generation = self._generation
+        found: Dict[str, Chunk] = {}
+        missing: List[str] = []
+        for cid in dict.fromkeys(chunk_ids):
+            chunk = self._entries.get(cid)
+            if chunk is None:
+                missing.append(cid)
+            else:
+                found[cid] = chunk
+        return found, missing, generation
+
+    def _fill(self, fetched: Dict[str, Chunk], generation: int) -> None:
+        with self._lock:
+            if generation != self._generation:
+                return  # rows may predate an invalidation that ran meanwhile
+            for cid, chunk in fetched.items():
+                self._entries.put(cid, chunk)
+
+
+class ChunkCache(_ChunkCacheBase):
+    """Chunk cache over a PGVectorStore."""
+
+    def __init__(self, store: PGVectorStore, **kwargs: Any):
+        super().__init__(store, **kwargs)
+
+    def get_chunks_by_ids(self, chunk_ids: Sequence[str]) -> Dict[str, Chunk]:
+        if self._check_due():
+            version = self.store.corpus_version()
+            if self._version_changed(version):
+                changes = None
+                if self.max_incremental_changes > 0:
+                    changes = self.store.changes_since(self._version, version, limit=self.max_incremental_changes + 1)
+                self._apply(version, changes)
+        found, missing, generation = self._lookup(chunk_ids)
+        if missing:
+            fetched = self.store.get_chunks_by_ids(missing)
+            self._fill(fetched, generation)
+            found.update(fetched)
+        return found
+
+
+class AsyncChunkCache(_ChunkCacheBase):
+    """Same as ChunkCache over an AsyncPGVectorStore (async /ask path)."""
+
+    def __init__(self, store: AsyncPGVectorStore, **kwargs: Any):
+        super().__init__(store, **kwargs)
+
+    async def get_chunks_by_ids(self, chunk_ids: Sequence[str]) -> Dict[str, Chunk]:
+        if self._check_due():
+            version = await self.store.corpus_version()
+            if self._version_changed(version):
+                changes = None
+                if self.max_incremental_changes > 0:
+                    changes = await self.store.changes_since(
+                        self._version, version, limit=self.max_incremental_changes + 1,
+                    )
+                self._apply(version, changes)
+        found, missing, generation = self._lookup(chunk_ids)
+        if missing:
+            fetched = await self.store.get_chunks_by_ids(missing)
+            self._fill(fetched, generation)
+            found.update(fetched)
+        return found
+
+
+def _chunk_nbytes(c: Chunk) -> int:
+    # Rough resident size: strings plus a flat allowance per metadata entry and object overhead.
+    n = sys.getsizeof(c.text) + sys.getsizeof(c.chunk_id) + sys.getsizeof(c.doc_id) + 200
+    return n + 100 * len(c.metadata or {})
@@ -1,15 +1,128 @@
 from __future__ import annotations
 
-from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
-from sqlalchemy import create_engine, text
+import logging
+import math
+import re
+import time
+from dataclasses import dataclass, replace
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import create_engine, event, exc as sa_exc, text
 from sqlalchemy.engine import Engine
+from sqlalchemy.sql.elements import TextClause
+
+from app.core.cache import LRUCache
+from app.core.types import Chunk, ChunkRef
+
+try:  # binary vector transport; without it vectors go over the wire as '[...]' text
+    from pgvector.psycopg import register_vector
+except ImportError:
+    register_vector = None
+
+try:  # COPY runs on the raw psycopg connection, so its errors are not wrapped by SQLAlchemy
+    import psycopg
+    _PSYCOPG_FALLBACK_ERRORS: Tuple[type, ...] = (psycopg.NotSupportedError, psycopg.OperationalError, psycopg.InterfaceError)
+    _PSYCOPG_DATA_ERRORS: Tuple[type, ...] = (psycopg.DataError, psycopg.IntegrityError)
+except ImportError:
+    _PSYCOPG_FALLBACK_ERRORS = _PSYCOPG_DATA_ERRORS = ()
+
+logger = logging.getLogger(__name__)
+
+# Advisory lock key serializing corpus_changes appends (see bump_corpus_version).
+_CORPUS_CHANGES_LOCK = 0x636F7270  # "corp"
+
+# Column types of _stage_chunks, for binary COPY.
+_STAGE_COPY_TYPES = ["int4", "text", "text", "int4", "text", "jsonb", "vector"]
+
+
+@dataclass(frozen=True)
+class UpsertReport:
+    mode: str           # "bulk" | "row"
+    rows: int
+    seconds: float
+    rows_per_s: float
+
+    @classmethod
+    def of(cls, mode: str, rows: int, seconds: float) -> "UpsertReport":
+        return cls(mode=mode, rows=rows, seconds=seconds, rows_per_s=(rows / seconds) if seconds > 0 else 0.0)
+
 
-from app.core.types import Chunk
+@dataclass(frozen=True)
+class AnnIndexInfo:
+    name: str
+    method: str                     # "hnsw" | "ivfflat"
+    size_bytes: int
+    valid: bool                     # False after a failed CREATE INDEX CONCURRENTLY
+    definition: str
+    build_seconds: Optional[float] = None  # set when this call built the index
+
+
+# One managed ANN index per method on embeddings.embedding (cosine distance),
+# plus one per method on the reduced copy (target="reduced") and on the
+# binary-quantized embedding (target="binary", Hamming distance).
+ANN_INDEX_NAMES = {"hnsw": "idx_embeddings_hnsw", "ivfflat": "idx_embeddings_ivfflat"}
+REDUCED_ANN_INDEX_NAMES = {"hnsw": "idx_embeddings_reduced_hnsw", "ivfflat": "idx_embeddings_reduced_ivfflat"}
+BINARY_ANN_INDEX_NAMES = {"hnsw": "idx_embeddings_binary_hnsw", "ivfflat": "idx_embeddings_binary_ivfflat"}
 
 
 class PGVectorStore:
-    def __init__(self, dsn: str):
+    """
+    With pgvector's Python package installed (and binary_vectors=True), every pooled
+    connection gets the pgvector psycopg adapter, and vectors are sent as float32
+    NumPy arrays in pgvector's binary format instead of formatted '[...]' strings.
+
+    ef_search / probes are the default ANN recall knobs (hnsw.ef_search,
+    ivfflat.probes) applied with SET LOCAL to every semantic_search; None keeps
+    the server setting.
+
+    doc_id-filtered searches pick a strategy from the document's chunk count
+    (cached for count_ttl_s): exact search for documents up to filter_exact_max
+    chunks, otherwise a pgvector iterative index scan (iterative_scan mode,
+    pgvector >= 0.8; None = always exact). Either way the filter is applied to
+    embeddings.doc_id inside the scan, so k rows come back whenever the
+    document has them.
+
+    reduced_dims keeps a second, smaller copy of every embedding in
+    embeddings.embedding_reduced: the first reduced_dims dimensions (Matryoshka
+    truncation; the full size = plain halfvec), L2-renormalized, as halfvec.
+    search_mode="reduced" searches that copy (and its ANN index) for
+    top_k * rescore_factor candidates and reorders them by full-vector distance.
+
+    search_mode="binary" takes binary_candidates candidates by Hamming distance
+    over binary_quantize(embedding) (1 bit per dimension; embedding_dims must
+    match the column) and reorders them by exact cosine distance.
+    """
+
+    def __init__(
+        self,
+        dsn: str,
+        binary_vectors: bool = True,
+        ef_search: Optional[int] = None,
+        probes: Optional[int] = None,
+        filter_exact_max: int = 5000,
+        iterative_scan: Optional[str] = "relaxed_order",
+        count_ttl_s: float = 60.0,
+        reduced_dims: Optional[int] = None,
+        search_mode: str = "full",
+        rescore_factor: int = 4,
+        embedding_dims: int = 1536,
+        binary_candidates: int = 400,
+    ):
         self.engine: Engine = create_engine(dsn, pool_pre_ping=True, future=True)
+        self.ef_search = ef_search
+        self.probes = probes
+        self.filter_exact_max = filter_exact_max
+        self.iterative_scan = _iterative_scan_mode(iterative_scan)
+        self.reduced_dims = reduced_dims
+        self.search_mode = _search_mode(search_mode, reduced_dims)
+        self.rescore_factor = rescore_factor
+        self.embedding_dims = embedding_dims
+        self.binary_candidates = binary_candidates
+        self._doc_counts: LRUCache[str, int] = LRUCache(max_entries=10_000, ttl_s=count_ttl_s)
+        self.binary_vectors = binary_vectors and register_vector is not None
+        if self.binary_vectors:
+            event.listen(self.engine, "connect", lambda dbapi_conn, _record: register_vector(dbapi_conn))
 
     def upsert_document(self, doc_id: str, title: Optional[str] = None, source: Optional[str] = None) -> None:
         q = text("""
@@ -27,102 +140,834 @@ class PGVectorStore:
         chunks: Sequence[Chunk],
         chunk_indices: Sequence[int],
         embeddings: Sequence[List[float]],
-    ) -> None:
+        mode: str = "bulk",
+    ) -> UpsertReport:
         """
         Inserts/updates chunks and embeddings.
         - chunks[i].chunk_id is the PK
         - embeddings are stored in pgvector column
+        - mode="bulk": COPY into a temp staging table, then two set-based
+          INSERT ... ON CONFLICT statements (falls back to per-row when COPY is
+          unsupported or the connection fails; data and constraint errors raise)
+        - mode="row": one INSERT per chunk and per embedding
         """
         if not (len(chunks) == len(chunk_indices) == len(embeddings)):
             raise ValueError("chunks, chunk_indices, embeddings must have same length")
+        if mode not in ("bulk", "row"):
+            raise ValueError(f"unknown upsert mode: {mode}")
+
+        t0 = time.perf_counter()
+        if mode == "bulk" and chunks:
+            try:
+                with self.engine.begin() as conn:
+                    self._bulk_upsert(conn, chunks, chunk_indices, embeddings)
+                    self._log_chunk_changes(conn, chunks)
+                self._forget_doc_counts(chunks)
+                return UpsertReport.of("bulk", len(chunks), time.perf_counter() - t0)
+            except Exception as e:
+                if not _bulk_fallback_ok(e):
+                    raise
+                logger.exception("bulk upsert failed; retrying row by row")
+                t0 = time.perf_counter()
 
         with self.engine.begin() as conn:
-            for chunk, idx, emb in zip(chunks, chunk_indices, embeddings):
-                # 1) Insert chunk first
+            self._row_upsert(conn, chunks, chunk_indices, embeddings)
+            self._log_chunk_changes(conn, chunks)
+        self._forget_doc_counts(chunks)
+        return UpsertReport.of("row", len(chunks), time.perf_counter() - t0)
+
+    def _bulk_upsert(self, conn, chunks, chunk_indices, embeddings) -> None:
+        conn.execute(_stage_table_query())
+
+        raw = conn.connection.dbapi_connection
+        if self.binary_vectors:
+            # Binary COPY: metadata through psycopg's jsonb dumper, vectors as float32 arrays.
+            rows = [
+                (i, c.chunk_id, c.doc_id, idx, c.text, c.metadata or {}, _vector_param(emb, True))
+                for i, (c, idx, emb) in enumerate(zip(chunks, chunk_indices, embeddings))
+            ]
+            with raw.cursor() as cursor, cursor.copy(_stage_copy_sql(binary=True)) as copy:
+                copy.set_types(_STAGE_COPY_TYPES)
+                for row in rows:
+                    copy.write_row(row)
+        else:
+            rows = [
+                (i, c.chunk_id, c.doc_id, idx, c.text, _to_json(c.metadata), _to_pgvector_literal(emb))
+                for i, (c, idx, emb) in enumerate(zip(chunks, chunk_indices, embeddings))
+            ]
+            if type(raw).__module__.split(".")[0] == "psycopg":  # psycopg 3: COPY ... FROM STDIN
+                with raw.cursor() as cursor, cursor.copy(_stage_copy_sql(binary=False)) as copy:
+                    for row in rows:
+                        copy.write_row(row)
+            else:
                 conn.execute(
-                    text("""
-                    INSERT INTO chunks (chunk_id, doc_id, chunk_index, text, metadata)
-                    VALUES (:chunk_id, :doc_id, :chunk_index, :text, CAST(:metadata AS jsonb))
-                    ON CONFLICT (chunk_id) DO UPDATE SET
-                      text = EXCLUDED.text,
-                      metadata = EXCLUDED.metadata,
-                      chunk_index = EXCLUDED.chunk_index,
-                      doc_id = EXCLUDED.doc_id;
+                    text(f"""
+                    INSERT INTO _stage_chunks {_STAGE_COLUMNS}
+                    VALUES (:ord, :chunk_id, :doc_id, :chunk_index, :text, CAST(:metadata AS jsonb), CAST(:embedding AS vector));
                     """),
-                    {
-                        "chunk_id": chunk.chunk_id,
-                        "doc_id": chunk.doc_id,
-                        "chunk_index": idx,
-                        "text": chunk.text,
-                        "metadata": _to_json(chunk.metadata),
-                    },
+                    [dict(zip(("ord", "chunk_id", "doc_id", "chunk_index", "text", "metadata", "embedding"), r)) for r in rows],
                 )
+        self._merge_staged(conn)
 
-                # 2) Assert chunk exists
-                exists = conn.execute(
-                    text("SELECT 1 FROM chunks WHERE chunk_id = :chunk_id"),
-                    {"chunk_id": chunk.chunk_id},
-                ).scalar()
+    def _merge_staged(self, conn) -> None:
+        for sql in _merge_staged_queries(self.reduced_dims):
+            conn.execute(sql)
 
-                if exists is None:
-                    raise RuntimeError(f"Chunk insert failed for chunk_id={chunk.chunk_id}")
+    def _row_upsert(self, conn, chunks, chunk_indices, embeddings) -> None:
+        for chunk, idx, emb in zip(chunks, chunk_indices, embeddings):
+            # 1) Insert chunk first
+            conn.execute(
+                text("""
+                INSERT INTO chunks (chunk_id, doc_id, chunk_index, text, metadata)
+                VALUES (:chunk_id, :doc_id, :chunk_index, :text, CAST(:metadata AS jsonb))
+                ON CONFLICT (chunk_id) DO UPDATE SET
+                  text = EXCLUDED.text,
+                  metadata = EXCLUDED.metadata,
+                  chunk_index = EXCLUDED.chunk_index,
+                  doc_id = EXCLUDED.doc_id;
+                """),
+                {
+                    "chunk_id": chunk.chunk_id,
+                    "doc_id": chunk.doc_id,
+                    "chunk_index": idx,
+                    "text": chunk.text,
+                    "metadata": _to_json(chunk.metadata),
+                },
+            )
 
-                # 3) Insert embedding after chunk exists
-                conn.execute(
-                    text("""
-                    INSERT INTO embeddings (chunk_id, embedding)
-                    VALUES (:chunk_id, CAST(:embedding AS vector))
-                    ON CONFLICT (chunk_id) DO UPDATE SET
-                      embedding = EXCLUDED.embedding;
-                    """),
-                    {
-                        "chunk_id": chunk.chunk_id,
-                        "embedding": _to_pgvector_literal(emb),
-                    },
-                )
+            # 2) Assert chunk exists
+            exists = conn.execute(
+                text("SELECT 1 FROM chunks WHERE chunk_id = :chunk_id"),
+                {"chunk_id": chunk.chunk_id},
+            ).scalar()
+
+            if exists is None:
+                raise RuntimeError(f"Chunk insert failed for chunk_id={chunk.chunk_id}")
+
+            # 3) Insert embedding after chunk exists
+            conn.execute(
+                text(f"""
+                INSERT INTO embeddings (chunk_id, doc_id, embedding, embedding_reduced)
+                VALUES (:chunk_id, :doc_id, CAST(:embedding AS vector),
+                        {_reduced_value_sql("CAST(:embedding AS vector)", self.reduced_dims)})
+                ON CONFLICT (chunk_id) DO UPDATE SET
+                  doc_id = EXCLUDED.doc_id,
+                  embedding = EXCLUDED.embedding,
+                  embedding_reduced = EXCLUDED.embedding_reduced;
+                """),
+                {
+                    "chunk_id": chunk.chunk_id,
+                    "doc_id": chunk.doc_id,
+                    "embedding": _vector_param(emb, self.binary_vectors),
+                },
+            )
+
+    def _log_chunk_changes(self, conn, chunks: Sequence[Chunk]) -> None:
+        # Log the changed chunks (bumps the corpus version) so cached BM25
+        # indexes can apply them incrementally
+        by_doc: Dict[str, List[str]] = {}
+        for c in chunks:
+            by_doc.setdefault(c.doc_id, []).append(c.chunk_id)
+        for doc_id in sorted(by_doc):
+            self.bump_corpus_version(conn, doc_id, chunk_ids=by_doc[doc_id])
+
+    def backfill_reduced_embeddings(self, batch_size: int = 10_000) -> int:
+        """
+        Fills embedding_reduced where it is missing or has another size than
+        reduced_dims (rows written before it was configured or changed). Returns
+        the number of rows updated; batches keep each transaction short.
+        """
+        if self.reduced_dims is None:
+            raise ValueError("reduced_dims is not configured")
+        n = int(self.reduced_dims)
+        sql = text(f"""
+        UPDATE embeddings SET embedding_reduced = {_reduced_value_sql("embedding", n)}
+        WHERE chunk_id IN (
+          SELECT chunk_id FROM embeddings
+          WHERE embedding_reduced IS NULL OR vector_dims(embedding_reduced) <> {n}
+          LIMIT :batch
+        );
+        """)
+        total = 0
+        while True:
+            with self.engine.begin() as conn:
+                updated = conn.execute(sql, {"batch": batch_size}).rowcount
+            total += updated
+            if updated < batch_size:
+                return total
+
+    def _forget_doc_counts(self, chunks: Sequence[Chunk]) -> None:
+        for doc_id in {c.doc_id for c in chunks}:
+            self._doc_counts.pop(doc_id)
+
+    def bump_corpus_version(
+        self,
+        conn,
+        doc_id: str,
+        chunk_ids: Optional[Sequence[str]] = None,
+        op: str = "upsert",
+    ) -> None:
+        """
+        Appends to the corpus change log. The latest seq (globally or per doc)
+        is the corpus version used to invalidate in-process caches.
+        - one row per chunk when chunk_ids is given (op: 'upsert' | 'delete')
+        - a single row with NULL chunk_id otherwise, which forces a full rebuild
+        Runs on the caller's connection so it commits with the data change.
+
+        seq values are drawn at insert time, not at commit, so concurrent writers
+        could commit out of seq order and a reader that already saw the higher
+        seq would skip the lower one forever. A transaction-scoped advisory lock
+        taken before the insert serializes appends: seqs become visible in order.
+        """
+        conn.execute(*_corpus_changes_lock_query())
+        q = text("INSERT INTO corpus_changes (doc_id, chunk_id, op) VALUES (:doc_id, :chunk_id, :op);")
+        if not chunk_ids:
+            conn.execute(q, {"doc_id": doc_id, "chunk_id": None, "op": op})
+            return
+        conn.execute(q, [{"doc_id": doc_id, "chunk_id": cid, "op": op} for cid in chunk_ids])
+
+    def changes_since(
+        self,
+        after_seq: int,
+        upto_seq: int,
+        doc_id_filter: Optional[str] = None,
+        limit: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """Change log rows with after_seq < seq <= upto_seq, oldest first: {seq, doc_id, chunk_id, op}."""
+        with self.engine.connect() as conn:
+            query = _changes_since_query(after_seq, upto_seq, doc_id_filter, limit)
+            return [dict(r) for r in conn.execute(*query).mappings().all()]
+
+    def iter_embeddings(self, batch_size: int = 5000) -> Iterator[List[Tuple[str, str, np.ndarray]]]:
+        """Keyset-paged scan of (chunk_id, doc_id, embedding) in chunk_id order, for in-process replicas."""
+        sql = text("""
+        SELECT e.chunk_id, c.doc_id, e.embedding
+        FROM embeddings e
+        JOIN chunks c ON c.chunk_id = e.chunk_id
+        WHERE e.chunk_id > :after
+        ORDER BY e.chunk_id
+        LIMIT :n;
+        """)
+        after = ""
+        while True:
+            with self.engine.connect() as conn:
+                rows = conn.execute(sql, {"after": after, "n": batch_size}).all()
+            if not rows:
+                return
+            yield [(r[0], r[1], _vector_to_array(r[2])) for r in rows]
+            if len(rows) < batch_size:
+                return
+            after = rows[-1][0]
+
+    def get_embeddings_by_ids(self, chunk_ids: Sequence[str]) -> Dict[str, Tuple[str, np.ndarray]]:
+        """{chunk_id: (doc_id, embedding)}; ids without an embedding are omitted."""
+        if not chunk_ids:
+            return {}
+        sql = text("""
+        SELECT e.chunk_id, c.doc_id, e.embedding
+        FROM embeddings e
+        JOIN chunks c ON c.chunk_id = e.chunk_id
+        WHERE e.chunk_id = ANY(:ids);
+        """)
+        with self.engine.connect() as conn:
+            rows = conn.execute(sql, {"ids": list(chunk_ids)}).all()
+        return {r[0]: (r[1], _vector_to_array(r[2])) for r in rows}
+
+    def get_cached_embeddings(self, model: str, text_hashes: Sequence[str]) -> Dict[str, List[float]]:
+        """Looks up the ingestion embedding cache; returns {text_sha256: embedding} for the hits."""
+        if not text_hashes:
+            return {}
 
+        sql = text("""
+        SELECT text_sha256, embedding
+        FROM embedding_cache
+        WHERE model = :model AND text_sha256 = ANY(:hashes);
+        """)
+        with self.engine.connect() as conn:
+            rows = conn.execute(sql, {"model": model, "hashes": list(text_hashes)}).mappings().all()
+        return {r["text_sha256"]: _vector_to_list(r["embedding"]) for r in rows}
+
+    def put_cached_embeddings(self, model: str, embeddings: Dict[str, List[float]]) -> None:
+        if not embeddings:
+            return
+
+        sql = text("""
+        INSERT INTO embedding_cache (model, text_sha256, embedding)
+        VALUES (:model, :sha, CAST(:embedding AS vector))
+        ON CONFLICT (model, text_sha256) DO NOTHING;
+        """)
+        with self.engine.begin() as conn:
+            conn.execute(sql, [
+                {"model": model, "sha": sha, "embedding": _vector_param(emb, self.binary_vectors)}
+                for sha, emb in embeddings.items()
+            ])
+
+    def corpus_version(self, doc_id_filter: Optional[str] = None) -> int:
+        sql, params = _corpus_version_query(doc_id_filter)
+        with self.engine.connect() as conn:
+            return int(conn.execute(sql, params).scalar() or 0)
 
     def semantic_search(
         self,
         query_embedding: List[float],
         top_k: int = 20,
         doc_id_filter: Optional[str] = None,
+        ef_search: Optional[int] = None,
+        probes: Optional[int] = None,
+        exact: bool = False,
+        mode: Optional[str] = None,
+        with_text: bool = True,
     ) -> List[Tuple[Chunk, float]]:
         """
         Returns (Chunk, distance) sorted by cosine distance ascending.
+        ef_search / probes / mode override the store defaults for this query;
+        exact=True disables index scans (ground truth for recall checks).
+        Distances are always full-vector distances, in either mode.
+        with_text=False returns ChunkRef (id + doc_id) instead, for late hydration.
         """
-        where_clause = ""
-        params: Dict[str, Any] = {"k": top_k}
+        first_stage, pool = _first_stage(self, mode or ("full" if exact else self.search_mode), top_k)
+        sql, params = _semantic_search_query(
+            query_embedding, top_k, doc_id_filter, self.binary_vectors, first_stage=first_stage, pool=pool,
+            with_text=with_text,
+        )
+        n_doc = self.doc_chunk_count(doc_id_filter) if doc_id_filter and not exact else None
+        strategy = _filter_strategy(n_doc, exact, self.filter_exact_max, self.iterative_scan)
+        ef_search = self.ef_search if ef_search is None else ef_search
+        probes = self.probes if probes is None else probes
+
+        with self.engine.connect() as conn:
+            iterative = self.iterative_scan if strategy == "iterative" else None
+            knobs = _search_settings_query(ef_search, probes, strategy == "exact", iterative)
+            if knobs is not None:
+                conn.execute(*knobs)  # SET LOCAL: same transaction as the search
+            rows = conn.execute(sql, params).mappings().all()
+            if strategy == "iterative" and len(rows) < min(top_k, n_doc):
+                # Iterative scan hit its tuple limit; exact search is still bounded by the doc filter.
+                conn.execute(*_search_settings_query(None, None, True))
+                rows = conn.execute(sql, params).mappings().all()
+        to_hit = _row_to_chunk if with_text else _row_to_ref
+        return [(to_hit(r), float(r["distance"])) for r in rows]
+
+    def doc_chunk_count(self, doc_id: str) -> int:
+        """Embedded chunks in a document (cached; drives the filtered-search strategy)."""
+        n = self._doc_counts.get(doc_id)
+        if n is None:
+            with self.engine.connect() as conn:
+                n = int(conn.execute(*_doc_chunk_count_query(doc_id)).scalar() or 0)
+            self._doc_counts.put(doc_id, n)
+        return n
+
+    def keyword_search(
+        self,
+        terms: Sequence[str],
+        top_k: int = 20,
+        doc_id_filter: Optional[str] = None,
+        with_text: bool = True,
+    ) -> List[Tuple[Chunk, float]]:
+        """
+        Full-text search over the generated chunks.tsv column (GIN index).
+        Matches chunks containing any of `terms`; returns (Chunk, ts_rank_cd) sorted
+        by rank descending (normalization 1 dampens long chunks, as BM25 does).
+        with_text=False returns ChunkRef instead of Chunk.
+        """
+        query = _keyword_search_query(terms, top_k, doc_id_filter, with_text=with_text)
+        if query is None:
+            return []
+        with self.engine.connect() as conn:
+            rows = conn.execute(*query).mappings().all()
+        to_hit = _row_to_chunk if with_text else _row_to_ref
+        return [(to_hit(r), float(r["score"])) for r in rows]
+
+    def get_chunks_by_ids(self, chunk_ids: Sequence[str]) -> Dict[str, Chunk]:
+        """Batched fetch of chunk text/metadata; ids that no longer exist are omitted."""
+        if not chunk_ids:
+            return {}
+        with self.engine.connect() as conn:
+            rows = conn.execute(*_chunks_by_ids_query(chunk_ids)).mappings().all()
+        return {r["chunk_id"]: _row_to_chunk(r) for r in rows}
+
+    # --- ANN index lifecycle (admin; run from scripts, not the request path) ---
+
+    def ann_indexes(self) -> List[AnnIndexInfo]:
+        """HNSW / IVFFlat indexes on embeddings, with on-disk size and validity."""
+        sql = text("""
+        SELECT i.relname AS name, am.amname AS method, pg_relation_size(i.oid) AS size_bytes,
+               ix.indisvalid AS valid, pg_get_indexdef(i.oid) AS definition
+        FROM pg_index ix
+        JOIN pg_class i ON i.oid = ix.indexrelid
+        JOIN pg_am am ON am.oid = i.relam
+        WHERE ix.indrelid = 'embeddings'::regclass AND am.amname IN ('hnsw', 'ivfflat')
+        ORDER BY i.relname;
+        """)
+        with self.engine.connect() as conn:
+            rows = conn.execute(sql).mappings().all()
+        return [
+            AnnIndexInfo(
+                name=r["name"], method=r["method"], size_bytes=int(r["size_bytes"]),
+                valid=bool(r["valid"]), definition=r["definition"],
+            )
+            for r in rows
+        ]
 
+    def create_ann_index(
+        self,
+        method: str = "hnsw",
+        target: str = "full",
+        m: int = 16,
+        ef_construction: int = 64,
+        lists: Optional[int] = None,
+        concurrently: bool = True,
+        maintenance_work_mem: Optional[str] = None,
+    ) -> AnnIndexInfo:
+        """
+        Creates the managed index for `method` unless a valid one exists (an invalid
+        leftover from a failed concurrent build is dropped first). CONCURRENTLY keeps
+        the table writable during the build. lists defaults to rows/1000 (sqrt(rows)
+        above 1M rows), the pgvector guideline. maintenance_work_mem (e.g. "2GB")
+        speeds up builds that would otherwise spill to disk. target="reduced"
+        indexes embedding_reduced (halfvec, needs reduced_dims) instead of embedding,
+        target="binary" the bit(embedding_dims) quantization (Hamming distance).
+        """
+        name = _ann_index_name(method, target)
+        existing = self._ann_index(name)
+        if existing is not None and existing.valid:
+            return existing
+        if existing is not None:
+            self.drop_ann_index(method, target, concurrently=concurrently)
+        return self._build_ann_index(name, method, target, m, ef_construction, lists, concurrently, maintenance_work_mem)
+
+    def rebuild_ann_index(
+        self,
+        method: str = "hnsw",
+        target: str = "full",
+        m: int = 16,
+        ef_construction: int = 64,
+        lists: Optional[int] = None,
+        maintenance_work_mem: Optional[str] = None,
+    ) -> AnnIndexInfo:
+        """
+        Builds a replacement index concurrently, then swaps it in (drop old, rename
+        new), so searches keep an ANN index throughout. Use after bulk loads (IVFFlat
+        centroids go stale as data changes) or to change build parameters.
+        """
+        name = _ann_index_name(method, target)
+        tmp = f"{name}_new"
+        with self._autocommit() as conn:
+            conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {tmp};"))
+        built = self._build_ann_index(tmp, method, target, m, ef_construction, lists, True, maintenance_work_mem)
+        with self._autocommit() as conn:
+            conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {name};"))
+            conn.execute(text(f"ALTER INDEX {tmp} RENAME TO {name};"))
+        info = self._ann_index(name)
+        return replace(info, build_seconds=built.build_seconds)
+
+    def drop_ann_index(self, method: str = "hnsw", target: str = "full", concurrently: bool = True) -> None:
+        name = _ann_index_name(method, target)
+        with self._autocommit() as conn:
+            conn.execute(text(f"DROP INDEX {'CONCURRENTLY ' if concurrently else ''}IF EXISTS {name};"))
+
+    def _ann_index(self, name: str) -> Optional[AnnIndexInfo]:
+        return next((i for i in self.ann_indexes() if i.name == name), None)
+
+    def _build_ann_index(
+        self,
+        name: str,
+        method: str,
+        target: str,
+        m: int,
+        ef_construction: int,
+        lists: Optional[int],
+        concurrently: bool,
+        maintenance_work_mem: Optional[str],
+    ) -> AnnIndexInfo:
+        if target == "reduced":
+            if self.reduced_dims is None:
+                raise ValueError("target='reduced' needs reduced_dims")
+            key = f"({_reduced_column_sql('embedding_reduced', self.reduced_dims)}) halfvec_cosine_ops"
+        elif target == "binary":
+            key = f"({_binary_value_sql('embedding', self.embedding_dims)}) bit_hamming_ops"
+        else:
+            key = "embedding vector_cosine_ops"
+
+        if method == "hnsw":
+            with_clause = f"m = {int(m)}, ef_construction = {int(ef_construction)}"
+        else:
+            if lists is None:
+                with self.engine.connect() as conn:
+                    n_rows = int(conn.execute(text("SELECT COUNT(*) FROM embeddings;")).scalar() or 0)
+                lists = _default_ivfflat_lists(n_rows)
+            with_clause = f"lists = {int(lists)}"
+
+        sql = text(f"""
+        CREATE INDEX {'CONCURRENTLY ' if concurrently else ''}{name}
+          ON embeddings USING {method} ({key})
+          WITH ({with_clause});
+        """)
+        with self._autocommit() as conn:
+            if maintenance_work_mem:
+                conn.execute(text("SELECT set_config('maintenance_work_mem', :v, false);"), {"v": maintenance_work_mem})
+            t0 = time.perf_counter()
+            try:
+                conn.execute(sql)
+            finally:
+                if maintenance_work_mem:
+                    conn.execute(text("RESET maintenance_work_mem;"))
+            seconds = time.perf_counter() - t0
+
+        info = self._ann_index(name)
+        return replace(info, build_seconds=seconds)
+
+    def _autocommit(self):
+        # CREATE/DROP INDEX CONCURRENTLY cannot run inside a transaction block.
+        return self.engine.execution_options(isolation_level="AUTOCOMMIT").connect()
+
+
+# --- SQL shared by the sync and async stores ---
+
+_STAGE_COLUMNS = "(ord, chunk_id, doc_id, chunk_index, text, metadata, embedding)"
+
+
+def _stage_table_query() -> TextClause:
+    return text("""
+    CREATE TEMP TABLE _stage_chunks (
+      ord INT NOT NULL,
+      chunk_id TEXT NOT NULL,
+      doc_id TEXT NOT NULL,
+      chunk_index INT NOT NULL,
+      text TEXT NOT NULL,
+      metadata JSONB,
+      embedding vector NOT NULL
+    ) ON COMMIT DROP;
+    """)
+
+
+def _stage_copy_sql(binary: bool) -> str:
+    options = " WITH (FORMAT BINARY)" if binary else ""
+    return f"COPY _stage_chunks {_STAGE_COLUMNS} FROM STDIN{options}"
+
+
+def _merge_staged_queries(reduced_dims: Optional[int]) -> List[TextClause]:
+    # DISTINCT ON keeps the last occurrence of a repeated chunk_id (ON CONFLICT
+    # cannot touch the same row twice in one statement).
+    return [
+        text("""
+        INSERT INTO chunks (chunk_id, doc_id, chunk_index, text, metadata)
+        SELECT DISTINCT ON (chunk_id) chunk_id, doc_id, chunk_index, text, metadata
+        FROM _stage_chunks
+        ORDER BY chunk_id, ord DESC
+        ON CONFLICT (chunk_id) DO UPDATE SET
+          text = EXCLUDED.text,
+          metadata = EXCLUDED.metadata,
+          chunk_index = EXCLUDED.chunk_index,
+          doc_id = EXCLUDED.doc_id;
+        """),
+        text(f"""
+        INSERT INTO embeddings (chunk_id, doc_id, embedding, embedding_reduced)
+        SELECT DISTINCT ON (chunk_id) chunk_id, doc_id, embedding, {_reduced_value_sql("embedding", reduced_dims)}
+        FROM _stage_chunks
+        ORDER BY chunk_id, ord DESC
+        ON CONFLICT (chunk_id) DO UPDATE SET
+          doc_id = EXCLUDED.doc_id,
+          embedding = EXCLUDED.embedding,
+          embedding_reduced = EXCLUDED.embedding_reduced;
+        """),
+    ]
+
+
+def _bulk_fallback_ok(e: BaseException) -> bool:
+    # Whether a failed bulk upsert may be retried row by row: COPY unsupported by
+    # the driver/server or a failed connection. Bad data or a violated constraint
+    # would fail the same way per row, so those raise.
+    orig = getattr(e, "orig", None) or e
+    if isinstance(e, (sa_exc.DataError, sa_exc.IntegrityError)) or isinstance(orig, _PSYCOPG_DATA_ERRORS):
+        return False
+    if isinstance(e, (AttributeError, NotImplementedError)):  # driver without cursor.copy
+        return True
+    return isinstance(e, (sa_exc.NotSupportedError, sa_exc.OperationalError)) or isinstance(orig, _PSYCOPG_FALLBACK_ERRORS)
+
+
+def _corpus_changes_lock_query() -> Tuple[TextClause, Dict[str, Any]]:
+    # Held until the writing transaction commits or rolls back.
+    return text("SELECT pg_advisory_xact_lock(:key);"), {"key": _CORPUS_CHANGES_LOCK}
+
+
+def _corpus_version_query(doc_id_filter: Optional[str]) -> Tuple[TextClause, Dict[str, Any]]:
+    where_clause = ""
+    params: Dict[str, Any] = {}
+    if doc_id_filter:
+        where_clause = "WHERE doc_id = :doc_id"
+        params["doc_id"] = doc_id_filter
+
+    return text(f"SELECT COALESCE(MAX(seq), 0) FROM corpus_changes {where_clause};"), params
+
+
+def _changes_since_query(
+    after_seq: int,
+    upto_seq: int,
+    doc_id_filter: Optional[str],
+    limit: Optional[int],
+) -> Tuple[TextClause, Dict[str, Any]]:
+    where_doc = ""
+    params: Dict[str, Any] = {"after": after_seq, "upto": upto_seq}
+    if doc_id_filter:
+        where_doc = "AND doc_id = :doc_id"
+        params["doc_id"] = doc_id_filter
+    limit_clause = ""
+    if limit is not None:
+        limit_clause = "LIMIT :limit"
+        params["limit"] = limit
+
+    sql = text(f"""
+    SELECT seq, doc_id, chunk_id, op
+    FROM corpus_changes
+    WHERE seq > :after AND seq <= :upto {where_doc}
+    ORDER BY seq
+    {limit_clause};
+    """)
+    return sql, params
+
+
+def _semantic_search_query(
+    query_embedding: List[float],
+    top_k: int,
+    doc_id_filter: Optional[str],
+    binary: bool = False,
+    first_stage: Optional[str] = None,
+    pool: Optional[int] = None,
+    with_text: bool = True,
+) -> Tuple[TextClause, Dict[str, Any]]:
+    params: Dict[str, Any] = {"k": top_k}
+    cols = _chunk_columns(with_text)
+
+    # Use a casted parameter for the query vector to avoid inlining large literals.
+    params["q"] = _vector_param(query_embedding, binary)
+
+    if first_stage is not None:
+        # Two-stage: `pool` candidates ordered by the cheap first-stage distance
+        # (reduced copy / binary quantization, via its index if any), rescored with
+        # exact full-vector distance.
+        where_clause = ""
         if doc_id_filter:
-            where_clause = "WHERE c.doc_id = :doc_id"
+            where_clause = "WHERE e.doc_id = :doc_id"
             params["doc_id"] = doc_id_filter
+        params["pool"] = max(top_k, pool or top_k)
+        sql = text(f"""
+        WITH candidates AS MATERIALIZED (
+          SELECT e.chunk_id, e.embedding
+          FROM embeddings e
+          {where_clause}
+          ORDER BY {first_stage}
+          LIMIT :pool
+        )
+        SELECT {cols},
+               (cand.embedding <=> CAST(:q AS vector)) AS distance
+        FROM candidates cand
+        JOIN chunks c ON c.chunk_id = cand.chunk_id
+        ORDER BY distance, c.chunk_id
+        LIMIT :k;
+        """)
+        return sql, params
 
-        # Use a casted parameter for the query vector to avoid inlining large literals.
-        params["q"] = _to_pgvector_literal(query_embedding)
-
+    if not doc_id_filter:
         sql = text(f"""
-        SELECT c.chunk_id, c.doc_id, c.text, c.metadata,
+        SELECT {cols},
                (e.embedding <=> CAST(:q AS vector)) AS distance
         FROM embeddings e
         JOIN chunks c ON c.chunk_id = e.chunk_id
-        {where_clause}
         ORDER BY e.embedding <=> CAST(:q AS vector)
         LIMIT :k;
         """)
+        return sql, params
 
-        out: List[Tuple[Chunk, float]] = []
-        with self.engine.connect() as conn:
-            rows = conn.execute(sql, params).mappings().all()
-            for r in rows:
-                chunk = Chunk(
-                    chunk_id=r["chunk_id"],
-                    doc_id=r["doc_id"],
-                    text=r["text"],
-                    metadata=r["metadata"] or {},
-                )
-                out.append((chunk, float(r["distance"])))
-        return out
+    # Filter on embeddings.doc_id inside the scan (not after a join) so an index
+    # scan keeps going until it has k matching rows; relaxed_order iterative scans
+    # may return them slightly out of order, hence the outer sort.
+    params["doc_id"] = doc_id_filter
+    sql = text(f"""
+    WITH nearest AS MATERIALIZED (
+      SELECT e.chunk_id, (e.embedding <=> CAST(:q AS vector)) AS distance
+      FROM embeddings e
+      WHERE e.doc_id = :doc_id
+      ORDER BY e.embedding <=> CAST(:q AS vector)
+      LIMIT :k
+    )
+    SELECT {cols}, n.distance
+    FROM nearest n
+    JOIN chunks c ON c.chunk_id = n.chunk_id
+    ORDER BY n.distance, c.chunk_id;
+    """)
+    return sql, params
+
+
+def _search_settings_query(
+    ef_search: Optional[int],
+    probes: Optional[int],
+    exact: bool = False,
+    iterative_scan: Optional[str] = None,
+) -> Optional[Tuple[TextClause, Dict[str, Any]]]:
+    # set_config(..., true) == SET LOCAL, but takes bind parameters. None = nothing to set.
+    gucs: Dict[str, str] = {}
+    if exact:
+        gucs["enable_indexscan"] = "off"
+    else:
+        if ef_search is not None:
+            gucs["hnsw.ef_search"] = str(int(ef_search))
+        if probes is not None:
+            gucs["ivfflat.probes"] = str(int(probes))
+        if iterative_scan is not None:
+            gucs["hnsw.iterative_scan"] = iterative_scan
+            gucs["ivfflat.iterative_scan"] = "relaxed_order"  # the only mode IVFFlat has
+    if not gucs:
+        return None
+
+    calls = ", ".join(f"set_config('{name}', :v{i}, true)" for i, name in enumerate(gucs))
+    return text(f"SELECT {calls};"), {f"v{i}": v for i, v in enumerate(gucs.values())}
+
+
+def _doc_chunk_count_query(doc_id: str) -> Tuple[TextClause, Dict[str, Any]]:
+    return text("SELECT COUNT(*) FROM embeddings WHERE doc_id = :doc_id;"), {"doc_id": doc_id}
+
+
+def _filter_strategy(
+    n_doc_chunks: Optional[int],
+    exact: bool,
+    exact_max: int,
+    iterative_scan: Optional[str],
+) -> Optional[str]:
+    # None (no doc filter) | "exact" | "iterative"
+    if exact:
+        return "exact"
+    if n_doc_chunks is None:
+        return None
+    if n_doc_chunks <= exact_max or iterative_scan is None:
+        return "exact"
+    return "iterative"
+
+
+def _iterative_scan_mode(mode: Optional[str]) -> Optional[str]:
+    if mode in (None, "", "off"):
+        return None
+    if mode not in ("relaxed_order", "strict_order"):
+        raise ValueError(f"unknown iterative_scan mode: {mode}")
+    return mode
+
+
+def _ann_index_name(method: str, target: str = "full") -> str:
+    if method not in ANN_INDEX_NAMES:
+        raise ValueError(f"unknown ANN index method: {method}")
+    names = {"full": ANN_INDEX_NAMES, "reduced": REDUCED_ANN_INDEX_NAMES, "binary": BINARY_ANN_INDEX_NAMES}
+    if target not in names:
+        raise ValueError(f"unknown ANN index target: {target}")
+    return names[target][method]
+
+
+def _search_mode(mode: str, reduced_dims: Optional[int]) -> str:
+    if mode not in ("full", "reduced", "binary"):
+        raise ValueError(f"unknown semantic search mode: {mode}")
+    if mode == "reduced" and reduced_dims is None:
+        raise ValueError("search_mode='reduced' needs reduced_dims")
+    return mode
+
+
+def _first_stage(store: Any, mode: str, top_k: int) -> Tuple[Optional[str], Optional[int]]:
+    # (first-stage ORDER BY expression, candidate pool) for a two-stage search mode;
+    # (None, None) = single-stage full-precision search.
+    mode = _search_mode(mode, store.reduced_dims)
+    if mode == "reduced":
+        column = _reduced_column_sql("e.embedding_reduced", store.reduced_dims)
+        return f"{column} <=> {_reduced_value_sql('CAST(:q AS vector)', store.reduced_dims)}", top_k * store.rescore_factor
+    if mode == "binary":
+        bits = _binary_value_sql("e.embedding", store.embedding_dims)
+        return f"{bits} <~> {_binary_value_sql('CAST(:q AS vector)', store.embedding_dims)}", store.binary_candidates
+    return None, None
+
+
+def _binary_value_sql(vector_sql: str, dims: int) -> str:
+    # 1 bit per dimension (sign); typed so the expression matches the bit_hamming_ops index.
+    return f"binary_quantize({vector_sql})::bit({int(dims)})"
+
+
+def _reduced_value_sql(vector_sql: str, dims: Optional[int]) -> str:
+    # Reduced copy of a vector expression: first `dims` dimensions, renormalized, as halfvec.
+    if dims is None:
+        return "NULL"
+    n = int(dims)
+    return f"l2_normalize(subvector({vector_sql}, 1, {n}))::halfvec({n})"
+
+
+def _reduced_column_sql(column_sql: str, dims: int) -> str:
+    # Typed cast of the (untyped) halfvec column; the ANN index is built on this expression.
+    return f"{column_sql}::halfvec({int(dims)})"
+
+
+def _default_ivfflat_lists(n_rows: int) -> int:
+    return max(1, n_rows // 1000 if n_rows <= 1_000_000 else int(math.sqrt(n_rows)))
+
+
+def _keyword_search_query(
+    terms: Sequence[str],
+    top_k: int,
+    doc_id_filter: Optional[str],
+    with_text: bool = True,
+) -> Optional[Tuple[TextClause, Dict[str, Any]]]:
+    # None when there is nothing to match (no usable terms or top_k <= 0).
+    lexemes = _tsquery_lexemes(terms)
+    if not lexemes or top_k <= 0:
+        return None
+
+    where_clause = ""
+    params: Dict[str, Any] = {"q": " | ".join(lexemes), "k": top_k}
+    if doc_id_filter:
+        where_clause = "AND c.doc_id = :doc_id"
+        params["doc_id"] = doc_id_filter
+
+    sql = text(f"""
+    SELECT {_chunk_columns(with_text)},
+           ts_rank_cd(c.tsv, q, 1) AS score
+    FROM chunks c, to_tsquery('simple', :q) q
+    WHERE c.tsv @@ q
+    {where_clause}
+    ORDER BY score DESC, c.chunk_id
+    LIMIT :k;
+    """)
+    return sql, params
+
+
+def _chunks_by_ids_query(chunk_ids: Sequence[str]) -> Tuple[TextClause, Dict[str, Any]]:
+    sql = text("""
+    SELECT chunk_id, doc_id, text, metadata
+    FROM chunks
+    WHERE chunk_id = ANY(:ids);
+    """)
+    return sql, {"ids": list(chunk_ids)}
+
+
+def _chunk_columns(with_text: bool) -> str:
+    # Id-only searches skip text/metadata: only the fused survivors are hydrated.
+    return "c.chunk_id, c.doc_id, c.text, c.metadata" if with_text else "c.chunk_id, c.doc_id"
+
+
+def _row_to_ref(r: Mapping[str, Any]) -> ChunkRef:
+    return ChunkRef(chunk_id=r["chunk_id"], doc_id=r["doc_id"])
+
+
+def _row_to_chunk(r: Mapping[str, Any]) -> Chunk:
+    return Chunk(
+        chunk_id=r["chunk_id"],
+        doc_id=r["doc_id"],
+        text=r["text"],
+        metadata=r["metadata"] or {},
+    )
+
+
+def _tsquery_lexemes(terms: Iterable[str]) -> List[str]:
+    # Keep only runs of (Unicode) letters and digits, so user text can never inject
+    # tsquery operators or quotes; accented words stay whole, as the 'simple' parser keeps them.
+    seen: Dict[str, None] = {}
+    for t in terms:
+        for part in re.findall(r"[^\W_]+", t.lower()):
+            seen.setdefault(part, None)
+    return list(seen)
 
 
 def _to_pgvector_literal(vec: List[float]) -> str:
@@ -130,6 +975,34 @@ def _to_pgvector_literal(vec: List[float]) -> str:
     return "[" + ",".join(f"{x:.8f}" for x in vec) + "]"
 
 
+def _from_pgvector_literal(s: str) -> List[float]:
+    return [float(x) for x in s.strip("[]").split(",")] if s.strip("[]") else []
+
+
+def _vector_param(vec: Sequence[float], binary: bool) -> Any:
+    # float32 array for the registered binary dumper, else the text literal.
+    if binary:
+        return np.asarray(vec, dtype=np.float32)
+    return _to_pgvector_literal(vec)
+
+
+def _vector_to_array(value: Any) -> np.ndarray:
+    if isinstance(value, str):
+        return np.asarray(_from_pgvector_literal(value), dtype=np.float32)
+    if hasattr(value, "to_numpy"):
+        return value.to_numpy().astype(np.float32, copy=False)
+    return np.asarray(value, dtype=np.float32)
+
+
+def _vector_to_list(value: Any) -> List[float]:
+    # vector column as returned with (pgvector.Vector / ndarray) or without (text) the adapter
+    if isinstance(value, str):
+        return _from_pgvector_literal(value)
+    if hasattr(value, "to_list"):
+        return value.to_list()
+    return [float(x) for x in value]
+
+
 def _to_json(d: Dict[str, Any]) -> str:
     # avoid bringing json libs into core; keep simple
     import json
@@ -0,0 +1,160 @@
+from __future__ import annotations
+
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+
+from app.core.cache import LRUCache
+from app.core.types import Chunk
+try:
+    from pgvector.psycopg import register_vector_async
+except ImportError:
+    register_vector_async = None
+
+from app.indexing.pgvector_store import (
+    _changes_since_query,
+    _chunks_by_ids_query,
+    _corpus_version_query,
+    _doc_chunk_count_query,
+    _filter_strategy,
+    _iterative_scan_mode,
+    _keyword_search_query,
+    _row_to_chunk,
+    _row_to_ref,
+    _first_stage,
+    _search_mode,
+    _search_settings_query,
+    _semantic_search_query,
+)
+
+
+class AsyncPGVectorStore:
+    """
+    Read side of PGVectorStore on an async SQLAlchemy engine (psycopg3 async driver),
+    for the async /ask path. Same SQL as the sync store; ingestion stays sync.
+    pool_size + max_overflow bounds concurrent queries; further requests wait for a
+    connection without holding a thread. Query vectors use the binary pgvector
+    transport, ef_search / probes defaults, doc_id-filtered search strategy and
+    reduced / binary search modes as in PGVectorStore.
+    """
+
+    def __init__(
+        self,
+        dsn: str,
+        pool_size: int = 10,
+        max_overflow: int = 20,
+        binary_vectors: bool = True,
+        ef_search: Optional[int] = None,
+        probes: Optional[int] = None,
+        filter_exact_max: int = 5000,
+        iterative_scan: Optional[str] = "relaxed_order",
+        count_ttl_s: float = 60.0,
+        reduced_dims: Optional[int] = None,
+        search_mode: str = "full",
+        rescore_factor: int = 4,
+        embedding_dims: int = 1536,
+        binary_candidates: int = 400,
+    ):
+        self.engine: AsyncEngine = create_async_engine(
+            dsn, pool_pre_ping=True, pool_size=pool_size, max_overflow=max_overflow,
+        )
+        self.ef_search = ef_search
+        self.probes = probes
+        self.filter_exact_max = filter_exact_max
+        self.iterative_scan = _iterative_scan_mode(iterative_scan)
+        self.reduced_dims = reduced_dims
+        self.search_mode = _search_mode(search_mode, reduced_dims)
+        self.rescore_factor = rescore_factor
+        self.embedding_dims = embedding_dims
+        self.binary_candidates = binary_candidates
+        self._doc_counts: LRUCache[str, int] = LRUCache(max_entries=10_000, ttl_s=count_ttl_s)
+        self.binary_vectors = binary_vectors and register_vector_async is not None
+        if self.binary_vectors:
+            event.listen(
+                self.engine.sync_engine,
+                "connect",
+                lambda dbapi_conn, _record: dbapi_conn.run_async(register_vector_async),
+            )
+
+    async def corpus_version(self, doc_id_filter: Optional[str] = None) -> int:
+        sql, params = _corpus_version_query(doc_id_filter)
+        async with self.engine.connect() as conn:
+            return int((await conn.execute(sql, params)).scalar() or 0)
+
+    async def changes_since(
+        self,
+        after_seq: int,
+        upto_seq: int,
+        doc_id_filter: Optional[str] = None,
+        limit: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        async with self.engine.connect() as conn:
+            query = _changes_since_query(after_seq, upto_seq, doc_id_filter, limit)
+            return [dict(r) for r in (await conn.execute(*query)).mappings().all()]
+
+    async def semantic_search(
+        self,
+        query_embedding: List[float],
+        top_k: int = 20,
+        doc_id_filter: Optional[str] = None,
+        ef_search: Optional[int] = None,
+        probes: Optional[int] = None,
+        exact: bool = False,
+        mode: Optional[str] = None,
+        with_text: bool = True,
+    ) -> List[Tuple[Chunk, float]]:
+        first_stage, pool = _first_stage(self, mode or ("full" if exact else self.search_mode), top_k)
+        sql, params = _semantic_search_query(
+            query_embedding, top_k, doc_id_filter, self.binary_vectors, first_stage=first_stage, pool=pool,
+            with_text=with_text,
+        )
+        n_doc = await self.doc_chunk_count(doc_id_filter) if doc_id_filter and not exact else None
+        strategy = _filter_strategy(n_doc, exact, self.filter_exact_max, self.iterative_scan)
+        ef_search = self.ef_search if ef_search is None else ef_search
+        probes = self.probes if probes is None else probes
+
+        async with self.engine.connect() as conn:
+            iterative = self.iterative_scan if strategy == "iterative" else None
+            knobs = _search_settings_query(ef_search, probes, strategy == "exact", iterative)
+            if knobs is not None:
+                await conn.execute(*knobs)
+            rows = (await conn.execute(sql, params)).mappings().all()
+            if strategy == "iterative" and len(rows) < min(top_k, n_doc):
+                await conn.execute(*_search_settings_query(None, None, True))
+                rows = (await conn.execute(sql, params)).mappings().all()
+        to_hit = _row_to_chunk if with_text else _row_to_ref
+        return [(to_hit(r), float(r["distance"])) for r in rows]
+
+    async def doc_chunk_count(self, doc_id: str) -> int:
+        n = self._doc_counts.get(doc_id)
+        if n is None:
+            async with self.engine.connect() as conn:
+                n = int((await conn.execute(*_doc_chunk_count_query(doc_id))).scalar() or 0)
+            self._doc_counts.put(doc_id, n)
+        return n
+
+    async def keyword_search(
+        self,
+        terms: Sequence[str],
+        top_k: int = 20,
+        doc_id_filter: Optional[str] = None,
+        with_text: bool = True,
+    ) -> List[Tuple[Chunk, float]]:
+        query = _keyword_search_query(terms, top_k, doc_id_filter, with_text=with_text)
+        if query is None:
+            return []
+        async with self.engine.connect() as conn:
+            rows = (await conn.execute(*query)).mappings().all()
+        to_hit = _row_to_chunk if with_text else _row_to_ref
+        return [(to_hit(r), float(r["score"])) for r in rows]
+
+    async def get_chunks_by_ids(self, chunk_ids: Sequence[str]) -> Dict[str, Chunk]:
+        if not chunk_ids:
+            return {}
+        async with self.engine.connect() as conn:
+            rows = (await conn.execute(*_chunks_by_ids_query(chunk_ids))).mappings().all()
+        return {r["chunk_id"]: _row_to_chunk(r) for r in rows}
+
+    async def dispose(self) -> None:
+        await self.engine.dispose()
@@ -0,0 +1,332 @@
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+try:  # HNSW graph for large replicas; without it every search is brute force
+    import hnswlib
+except ImportError:
+    hnswlib = None
+
+from app.core.types import ChunkRef
+from app.indexing.pgvector_store import PGVectorStore
+
+logger = logging.getLogger(__name__)
+
+
+class VectorReplica:
+    """
+    In-process read replica of embeddings.embedding for semantic search without a
+    Postgres round trip. Postgres stays the source of truth:
+
+    - load() copies every (chunk_id, doc_id, embedding) into one contiguous,
+      L2-normalized float32 matrix (cosine = dot product).
+    - sync() follows the corpus change log like BM25IndexCache: up to
+      `max_incremental_changes` logged chunk changes are applied in place
+      (rows overwritten, appended or tombstoned); more, or a full-rebuild row,
+      reloads. The version is checked at most every `version_check_interval` s.
+    - Below `hnsw_min_rows` rows at load time (or without hnswlib) search is an
+      exact matrix-vector product + argpartition; above it, an HNSW graph
+      (hnswlib) is built on load and kept up to date with the same changes.
+    - doc_id-filtered searches over at most `exact_filter_max` rows are exact,
+      as in PGVectorStore.
+
+    start() loads and syncs on a daemon thread; `ready` is False until the first
+    load finishes. Searches and changes share one lock, so a search never sees a
+    half-applied change.
+    """
+
+    def __init__(
+        self,
+        store: PGVectorStore,
+        version_check_interval: float = 1.0,
+        max_incremental_changes: int = 5000,
+        hnsw_min_rows: int = 200_000,
+        hnsw_m: int = 16,
+        hnsw_ef_construction: int = 200,
+        hnsw_ef_search: int = 64,
+        exact_filter_max: int = 5000,
+        load_batch_size: int = 5000,
+    ):
+        self.store = store
+        self.version_check_interval = version_check_interval
+        self.max_incremental_changes = max_incremental_changes
+        self.hnsw_min_rows = hnsw_min_rows
+        self.hnsw_m = hnsw_m
+        self.hnsw_ef_construction = hnsw_ef_construction
+        self.hnsw_ef_search = hnsw_ef_search
+        self.exact_filter_max = exact_filter_max
+        self.load_batch_size = load_batch_size
+
+        self._lock = threading.RLock()
+        self._vecs = np.zeros((0, 0), dtype=np.float32)  # capacity x dim; rows >= _n unused
+        self._live = np.zeros(0, dtype=bool)
+        self._n = 0
+        self._ids: List[str] = []
+        self._docs: List[str] = []
+        self._pos: Dict[str, int] = {}
+        self._doc_rows: Dict[str, Set[int]] = {}
+        self._hnsw: Any = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+        self.version: Optional[int] = None
+        self._checked_at = 0.0
+        self.loads = 0
+        self.refreshes = 0
+        self.searches = 0
+        self.last_load_seconds = 0.0
+
+    @property
+    def ready(self) -> bool:
+        return self.version is not None
+
+    @property
+    def n_live(self) -> int:
+        return len(self._pos)
+
+    # --- lifecycle ---
+
+    def load(self) -> None:
+        """Full copy from Postgres (the version is read first, so later changes are picked up by sync())."""
+        t0 = time.perf_counter()
+        version = self.store.corpus_version()
+        ids: List[str] = []
+        docs: List[str] = []
+        blocks: List[np.ndarray] = []
+        for batch in self.store.iter_embeddings(batch_size=self.load_batch_size):
+            ids.extend(cid for cid, _, _ in batch)
+            docs.extend(did for _, did, _ in batch)
+            blocks.append(np.vstack([emb for _, _, emb in batch]).astype(np.float32, copy=False))
+
+        vecs = _normalized(np.vstack(blocks)) if blocks else np.zeros((0, 0), dtype=np.float32)
+        doc_rows: Dict[str, Set[int]] = {}
+        for i, did in enumerate(docs):
+            doc_rows.setdefault(did, set()).add(i)
+        hnsw = self._build_hnsw(vecs) if len(ids) >= self.hnsw_min_rows and hnswlib is not None else None
+
+        with self._lock:
+            self._vecs = vecs
+            self._live = np.ones(len(ids), dtype=bool)
+            self._n = len(ids)
+            self._ids = ids
+            self._docs = docs
+            self._pos = {cid: i for i, cid in enumerate(ids)}
+            self._doc_rows = doc_rows
+            self._hnsw = hnsw
+            self.version = version
+            self._checked_at = time.monotonic()
+            self.loads += 1
+            self.last_load_seconds = time.perf_counter() - t0
+
+    def sync(self) -> bool:
+        """Brings the replica up to the current corpus version; True if anything changed."""
+        if not self.ready:
+            self.load()
+            return True
+        now = time.monotonic()
+        if now - self._checked_at < self.version_check_interval:
+            return False
+        version = self.store.corpus_version()
+        self._checked_at = now
+        if version == self.version:
+            return False
+        if not self._refresh(version):
+            self.load()
+        return True
+
+    def start(self) -> None:
+        """Loads and keeps syncing on a daemon thread."""
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._sync_loop, name="vector-replica", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    # --- search ---
+
+    def search(
+        self,
+        query_embedding: Sequence[float],
+        top_k: int,
+        doc_id_filter: Optional[str] = None,
+    ) -> List[Tuple[str, float]]:
+        """(chunk_id, cosine distance) sorted ascending, like PGVectorStore.semantic_search."""
+        if top_k <= 0:
+            return []
+        q = _normalized(np.asarray(query_embedding, dtype=np.float32)[None, :])[0]
+
+        with self._lock:
+            self.searches += 1
+            if self._n == 0:
+                return []
+            if doc_id_filter:
+                rows = self._doc_rows.get(doc_id_filter)
+                if not rows:
+                    return []
+                if self._hnsw is None or len(rows) <= self.exact_filter_max:
+                    return self._exact(q, top_k, np.fromiter(rows, dtype=np.int64, count=len(rows)))
+                return self._approx(q, top_k, doc_id_filter, len(rows))
+            if self._hnsw is None:
+                return self._exact(q, top_k, None)
+            return self._approx(q, top_k, None, len(self._pos))
+
+    def refs(self, hits: Sequence[Tuple[str, float]]) -> List[Tuple[ChunkRef, float]]:
+        """search() hits as (ChunkRef, distance), doc_id from the replica (no Postgres read)."""
+        with self._lock:
+            return [
+                (ChunkRef(cid, self._docs[self._pos[cid]] if cid in self._pos else None), dist)
+                for cid, dist in hits
+            ]
+
+    def approx_nbytes(self) -> int:
+        return int(self._vecs.nbytes + self._live.nbytes + 120 * len(self._ids))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "ready": self.ready,
+                "version": self.version,
+                "rows": self._n,
+                "live": len(self._pos),
+                "dim": int(self._vecs.shape[1]) if self._vecs.ndim == 2 else 0,
+                "backend": "hnsw" if self._hnsw is not None else "numpy",
+                "bytes": self.approx_nbytes(),
+                "loads": self.loads,
+                "refreshes": self.refreshes,
+                "searches": self.searches,
+                "last_load_seconds": self.last_load_seconds,
+            }
+
+    # --- internals ---
+
+    def _exact(self, q: np.ndarray, top_k: int, rows: Optional[np.ndarray]) -> List[Tuple[str, float]]:
+        if rows is None:
+            scores = self._vecs[: self._n] @ q
+            scores[~self._live[: self._n]] = -np.inf
+            rows = np.arange(self._n)
+        else:
+            scores = self._vecs[rows] @ q
+        k = min(top_k, int(np.isfinite(scores).sum()))
+        if k <= 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k] if k < len(scores) else np.arange(len(scores))
+        top = top[np.lexsort((rows[top], -scores[top]))]  # score desc, then row for stable ties
+        return [(self._ids[rows[i]], float(1.0 - scores[i])) for i in top]
+
+    def _approx(self, q: np.ndarray, top_k: int, doc_id: Optional[str], n_candidates: int) -> List[Tuple[str, float]]:
+        k = min(top_k, n_candidates)
+        self._hnsw.set_ef(max(self.hnsw_ef_search, k))
+        flt = (lambda label: self._docs[label] == doc_id) if doc_id else None
+        try:
+            labels, dists = self._hnsw.knn_query(q, k=k, filter=flt)
+        except RuntimeError:
+            # hnswlib could not find k results (too small ef / heavy filtering): brute force.
+            rows = np.fromiter(self._doc_rows[doc_id], dtype=np.int64) if doc_id else None
+            return self._exact(q, top_k, rows)
+        return [(self._ids[int(l)], float(d)) for l, d in zip(labels[0], dists[0])]
+
+    def _refresh(self, version: int) -> bool:
+        """Applies logged changes up to `version`; False means reload instead."""
+        if self.max_incremental_changes <= 0:
+            return False
+        changes = self.store.changes_since(self.version, version, limit=self.max_incremental_changes + 1)
+        if len(changes) > self.max_incremental_changes or any(c["chunk_id"] is None for c in changes):
+            return False
+
+        last_op: Dict[str, str] = {}
+        for c in changes:
+            last_op.pop(c["chunk_id"], None)
+            last_op[c["chunk_id"]] = c["op"]
+        fetched = self.store.get_embeddings_by_ids([cid for cid, op in last_op.items() if op == "upsert"])
+
+        with self._lock:
+            self._remove(cid for cid in last_op if cid not in fetched)
+            self._upsert(fetched.items())
+            self.version = version
+            self.refreshes += 1
+        return True
+
+    def _upsert(self, items: Iterable[Tuple[str, Tuple[str, np.ndarray]]]) -> None:
+        items = list(items)
+        if not items:
+            return
+        vecs = _normalized(np.vstack([emb for _, (_, emb) in items]).astype(np.float32, copy=False))
+        if self._vecs.shape[1] == 0:
+            self._vecs = np.zeros((0, vecs.shape[1]), dtype=np.float32)
+
+        rows = []
+        for cid, (doc_id, _) in items:
+            row = self._pos.get(cid)
+            if row is None:
+                row = self._append(cid)
+            else:
+                self._doc_rows[self._docs[row]].discard(row)
+            self._docs[row] = doc_id
+            self._doc_rows.setdefault(doc_id, set()).add(row)
+            rows.append(row)
+
+        rows_arr = np.asarray(rows, dtype=np.int64)
+        self._vecs[rows_arr] = vecs
+        self._live[rows_arr] = True
+        if self._hnsw is not None:
+            if self._hnsw.get_max_elements() < len(self._live):
+                self._hnsw.resize_index(len(self._live))
+            self._hnsw.add_items(vecs, rows_arr)  # existing labels are updated in place
+
+    def _append(self, cid: str) -> int:
+        if self._n == len(self._live):
+            capacity = max(1024, 2 * len(self._live))
+            grown = np.zeros((capacity, self._vecs.shape[1]), dtype=np.float32)
+            grown[: self._n] = self._vecs[: self._n]
+            live = np.zeros(capacity, dtype=bool)
+            live[: self._n] = self._live[: self._n]
+            self._vecs, self._live = grown, live
+        row = self._n
+        self._n += 1
+        self._ids.append(cid)
+        self._docs.append("")
+        self._pos[cid] = row
+        return row
+
+    def _remove(self, chunk_ids: Iterable[str]) -> None:
+        for cid in chunk_ids:
+            row = self._pos.pop(cid, None)
+            if row is None:
+                continue
+            self._live[row] = False
+            self._doc_rows[self._docs[row]].discard(row)
+            if self._hnsw is not None:
+                self._hnsw.mark_deleted(row)
+
+    def _build_hnsw(self, vecs: np.ndarray) -> Any:
+        index = hnswlib.Index(space="ip", dim=vecs.shape[1])  # rows are normalized: ip == cosine
+        index.init_index(max_elements=len(vecs), M=self.hnsw_m, ef_construction=self.hnsw_ef_construction)
+        index.add_items(vecs, np.arange(len(vecs)))
+        index.set_ef(self.hnsw_ef_search)
+        return index
+
+    def _sync_loop(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.sync()
+            except Exception:
+                # Postgres unavailable: keep serving the last copy, retry next tick
+                logger.exception("vector replica sync failed")
+            self._stop.wait(max(0.05, self.version_check_interval))
+
+
+def _normalized(m: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(m, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (m / norms).astype(np.float32, copy=False)
@@ -0,0 +1,60 @@
+from __future__ import annotations
+
+import hashlib
+from dataclasses import dataclass
+from typing import Callable, Dict, List
+
+from app.indexing.pgvector_store import PGVectorStore
+
+
+@dataclass
+class EmbeddingCacheStats:
+    texts: int = 0            # chunks to embed
+    unique: int = 0           # distinct texts among them
+    cached: int = 0           # distinct texts found in embedding_cache
+    embedded: int = 0         # distinct texts sent to the embeddings API
+    api_calls: int = 0        # embed_batch calls
+
+
+def text_sha256(s: str) -> str:
+    return hashlib.sha256(s.encode("utf-8")).hexdigest()
+
+
+def embed_with_cache(
+    store: PGVectorStore,
+    model: str,
+    texts: List[str],
+    embed_batch: Callable[[List[str]], List[List[float]]],
+    batch_size: int = 64,
+    lookup_batch_size: int = 1000,
+) -> "tuple[List[List[float]], EmbeddingCacheStats]":
+    """
+    Returns one embedding per text (same order). Texts are deduplicated and looked
+    up in the embedding_cache table by (model, sha256(text)); only misses go to
+    embed_batch, and their embeddings are written back for the next ingest.
+    """
+    stats = EmbeddingCacheStats(texts=len(texts))
+    hashes = [text_sha256(t) for t in texts]
+
+    unique: Dict[str, str] = {}
+    for h, t in zip(hashes, texts):
+        unique.setdefault(h, t)
+    stats.unique = len(unique)
+
+    found: Dict[str, List[float]] = {}
+    keys = list(unique)
+    for i in range(0, len(keys), lookup_batch_size):
+        found.update(store.get_cached_embeddings(model, keys[i:i + lookup_batch_size]))
+    stats.cached = len(found)
+
+    missing = [h for h in keys if h not in found]
+    for i in range(0, len(missing), batch_size):
+        batch = missing[i:i + batch_size]
+        embs = embed_batch([unique[h] for h in batch])
+        stats.api_calls += 1
+        fresh = dict(zip(batch, embs))
+        store.put_cached_embeddings(model, fresh)
+        found.update(fresh)
+    stats.embedded = len(missing)
+
+    return [found[h] for h in hashes], stats
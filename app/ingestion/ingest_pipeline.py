@@ -2,14 +2,15 @@ from __future__ import annotations
 
 import hashlib
 from pathlib import Path
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Tuple
 
 from openai import OpenAI
 
 from app.core.types import Chunk
-from app.indexing.pgvector_store import PGVectorStore
+from app.indexing.pgvector_store import PGVectorStore, UpsertReport
 from app.ingestion.loaders import load_docx
 from app.ingestion.chunker import TokenChunker
+from app.ingestion.embedding_cache import EmbeddingCacheStats, embed_with_cache
 
 
 def _sha1(s: str) -> str:
@@ -34,11 +35,15 @@ class Ingestor:
         openai_client: OpenAI,
         embedding_model: str,
         chunker: TokenChunker,
+        upsert_mode: str = "bulk",
     ):
         self.store = store
         self.client = openai_client
         self.embedding_model = embedding_model
         self.chunker = chunker
+        self.upsert_mode = upsert_mode
+        self.last_embedding_stats = EmbeddingCacheStats()
+        self.last_upsert_report: Optional[UpsertReport] = None
 
     def embed_batch(self, texts: List[str]) -> List[List[float]]:
         resp = self.client.embeddings.create(model=self.embedding_model, input=texts)
@@ -72,11 +77,12 @@ class Ingestor:
                 all_chunk_indices.append(idx)
                 all_texts.append(ct.text)
 
-        # embeddings in batches (safe for rate limits)
-        batch_size = 64
-        all_embeddings: List[List[float]] = []
-        for i in range(0, len(all_texts), batch_size):
-            all_embeddings.extend(self.embed_batch(all_texts[i:i+batch_size]))
+        # embeddings in batches (safe for rate limits); cached text skips the API
+        all_embeddings, self.last_embedding_stats = embed_with_cache(
+            self.store, self.embedding_model, all_texts, self.embed_batch, batch_size=64,
+        )
 
-        self.store.upsert_chunks_with_embeddings(all_chunks, all_chunk_indices, all_embeddings)
+        self.last_upsert_report = self.store.upsert_chunks_with_embeddings(
+            all_chunks, all_chunk_indices, all_embeddings, mode=self.upsert_mode,
+        )
         return did
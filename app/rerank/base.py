@@ -0,0 +1,23 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import List, Protocol
+
+from app.core.types import Chunk
+
+
+@dataclass
+class RerankResult:
+    chunk: Chunk
+    score: float
+    original_rank: int          # 1-based position in the input list
+
+
+class Reranker(Protocol):
+    # Returns at most top_k results, best first (what rerank_fused expects).
+    def rerank(self, query: str, chunks: List[Chunk], top_k: int = 5) -> List[RerankResult]: ...
+
+
+class AsyncReranker(Protocol):
+    # Async counterpart used by arerank_fused on the /ask path.
+    async def rerank(self, query: str, chunks: List[Chunk], top_k: int = 5) -> List[RerankResult]: ...
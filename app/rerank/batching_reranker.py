@@ -0,0 +1,149 @@
+from __future__ import annotations
+
+import asyncio
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from app.core.types import Chunk
+from app.rerank.base import RerankResult
+
+
+@dataclass
+class _Job:
+    chunks: List[Chunk]
+    top_k: int
+    future: "asyncio.Future[List[RerankResult]]"
+
+
+@dataclass
+class _Batch:
+    query: str
+    jobs: List[_Job] = field(default_factory=list)
+    docs: Dict[Tuple[str, str], Chunk] = field(default_factory=dict)  # (chunk_id, text) -> chunk
+
+
+class BatchingReranker:
+    """
+    Async reranker wrapper that coalesces concurrent rerank calls.
+
+    Jobs arriving within `window_ms` of the first one are collected per query
+    (while no other batch is open or in flight, the batch is dispatched right
+    away instead of waiting for the window):
+    jobs for the same query share one provider call over the union of their
+    chunks (the rerank APIs score one query per call), split into calls of at
+    most `max_docs_per_call` documents. Different queries are dispatched as
+    separate calls, at most `max_concurrency` at a time across all batches.
+    Each caller gets the results for its own chunks, as from the wrapped reranker.
+    """
+
+    def __init__(
+        self,
+        reranker: Any,
+        window_ms: float = 5.0,
+        max_docs_per_call: int = 1000,
+        max_concurrency: int = 8,
+    ):
+        self.reranker = reranker
+        self.model = getattr(reranker, "model", None)
+        self.window_s = window_ms / 1000.0
+        self.max_docs_per_call = max_docs_per_call
+        self.max_concurrency = max_concurrency
+        self._open: Dict[str, _Batch] = {}
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._tasks: Set["asyncio.Task[None]"] = set()  # strong refs to running dispatches
+
+        self.jobs = 0
+        self.coalesced_jobs = 0
+        self.calls = 0
+        self.docs_sent = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def rerank(self, query: str, chunks: List[Chunk], top_k: int = 5) -> List[RerankResult]:
+        if not chunks:
+            return []
+        loop = asyncio.get_running_loop()
+        self.jobs += 1
+
+        batch = self._open.get(query)
+        new_docs = {_doc_key(c) for c in chunks} - (batch.docs.keys() if batch else set())
+        if batch is None or len(batch.docs) + len(new_docs) > self.max_docs_per_call:
+            idle = not self._open and not self._tasks
+            batch = _Batch(query)
+            self._open[query] = batch
+            if idle:
+                # Nothing else waiting or in flight: only jobs started in this loop
+                # iteration can join, so an idle service never pays the window.
+                loop.call_soon(self._flush, batch)
+            else:
+                loop.call_later(self.window_s, self._flush, batch)
+        else:
+            self.coalesced_jobs += 1
+
+        job = _Job(chunks=chunks, top_k=top_k, future=loop.create_future())
+        batch.jobs.append(job)
+        for c in chunks:
+            batch.docs.setdefault(_doc_key(c), c)
+        return await job.future
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "jobs": self.jobs,
+            "coalesced_jobs": self.coalesced_jobs,
+            "calls": self.calls,
+            "docs_sent": self.docs_sent,
+            "in_flight": self.in_flight,
+            "max_in_flight": self.max_in_flight,
+        }
+
+    # --- internals ---
+
+    def _flush(self, batch: _Batch) -> None:
+        if self._open.get(batch.query) is batch:
+            del self._open[batch.query]
+        task = asyncio.ensure_future(self._dispatch(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _dispatch(self, batch: _Batch) -> None:
+        docs = list(batch.docs.items())
+        groups = [docs[i:i + self.max_docs_per_call] for i in range(0, len(docs), self.max_docs_per_call)]
+        try:
+            scored = await asyncio.gather(*(self._call(batch.query, [c for _, c in g]) for g in groups))
+        except Exception as e:
+            for job in batch.jobs:
+                if not job.future.done():
+                    job.future.set_exception(e)
+            return
+
+        scores: Dict[Tuple[str, str], float] = {}
+        for group, results in zip(groups, scored):
+            for r in results:
+                scores[group[r.original_rank - 1][0]] = r.score
+        for job in batch.jobs:
+            if not job.future.done():  # the caller may have given up (deadline)
+                job.future.set_result(_results(job, scores))
+
+    async def _call(self, query: str, chunks: List[Chunk]) -> List[RerankResult]:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        async with self._semaphore:
+            self.calls += 1
+            self.docs_sent += len(chunks)
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            try:
+                return await self.reranker.rerank(query, chunks, top_k=len(chunks))
+            finally:
+                self.in_flight -= 1
+
+
+def _doc_key(c: Chunk) -> Tuple[str, str]:
+    return c.chunk_id, c.text
+
+
+def _results(job: _Job, scores: Dict[Tuple[str, str], float]) -> List[RerankResult]:
+    # Score desc, input position for ties; original_rank is the 1-based position in the caller's list.
+    keys = [_doc_key(c) for c in job.chunks]
+    ranked = sorted((i for i, k in enumerate(keys) if k in scores), key=lambda i: (-scores[keys[i]], i))
+    return [RerankResult(chunk=job.chunks[i], score=scores[keys[i]], original_rank=i + 1) for i in ranked[: job.top_k]]
@@ -0,0 +1,182 @@
+from __future__ import annotations
+
+import hashlib
+import threading
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from app.core.cache import LRUCache, SQLiteCache
+from app.core.types import Chunk
+from app.rerank.base import RerankResult
+from app.retrieval.caching_embedder import normalize_query
+
+
+class _RerankCacheBase:
+    """
+    Relevance scores cached per (model, normalized query, chunk_id, chunk text hash):
+    - in-memory LRU (max_entries, optional ttl_s)
+    - optional SQLite file (disk_path) shared across restarts/workers, with its own
+      TTL and entry limit
+
+    Cross-encoder scores depend only on the (query, document) pair, so a repeated
+    candidate set is served entirely from cache and a partially overlapping one
+    only sends the missing documents to the provider (asking for all of their
+    scores). A rewritten chunk has a new text hash and is scored again. The async
+    wrapper reads and writes the SQLite file off the event loop.
+    """
+
+    def __init__(
+        self,
+        reranker: Any,
+        model: Optional[str] = None,
+        max_entries: int = 50_000,
+        ttl_s: Optional[float] = None,
+        disk_path: Optional[str] = None,
+        disk_ttl_s: Optional[float] = None,
+        disk_max_entries: Optional[int] = 1_000_000,
+    ):
+        self.reranker = reranker
+        self.model = model or getattr(reranker, "model", None) or type(reranker).__name__
+        self._memory: LRUCache[str, float] = LRUCache(max_entries=max_entries, ttl_s=ttl_s)
+        self._disk = (
+            SQLiteCache(disk_path, "rerank_scores", ttl_s=disk_ttl_s, max_entries=disk_max_entries) if disk_path else None
+        )
+        self._lock = threading.Lock()
+        self.lookups = 0
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.api_calls = 0
+        self.docs_scored = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            hits = self.memory_hits + self.disk_hits
+            out: Dict[str, Any] = {
+                "lookups": self.lookups,
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "api_calls": self.api_calls,
+                "docs_scored": self.docs_scored,
+                "hit_ratio": (hits / self.lookups) if self.lookups else 0.0,
+            }
+        out["memory"] = self._memory.stats()
+        if self._disk is not None:
+            out["disk_entries"] = self._disk.count()
+        return out
+
+    def clear(self) -> None:
+        self._memory.clear()
+        if self._disk is not None:
+            self._disk.clear()
+
+    def _keys(self, query: str, chunks: Sequence[Chunk]) -> List[str]:
+        q = normalize_query(query)
+        return [
+            hashlib.sha256(
+                f"{self.model}\0{q}\0{c.chunk_id}\0{hashlib.sha256(c.text.encode('utf-8')).hexdigest()}".encode("utf-8")
+            ).hexdigest()
+            for c in chunks
+        ]
+
+    def _cached(self, keys: List[str]) -> Dict[str, float]:
+        found, missing = self._from_memory(keys)
+        on_disk = self._disk.get_many(missing) if missing and self._disk is not None else {}
+        return self._count_hits(keys, found, on_disk)
+
+    async def _acached(self, keys: List[str]) -> Dict[str, float]:
+        found, missing = self._from_memory(keys)
+        on_disk = await self._disk.aget_many(missing) if missing and self._disk is not None else {}
+        return self._count_hits(keys, found, on_disk)
+
+    def _from_memory(self, keys: List[str]) -> Tuple[Dict[str, float], List[str]]:
+        found: Dict[str, float] = {}
+        missing: List[str] = []
+        for k in keys:
+            score = self._memory.get(k)
+            if score is None:
+                missing.append(k)
+            else:
+                found[k] = score
+        return found, missing
+
+    def _count_hits(self, keys: List[str], found: Dict[str, float], on_disk: Dict[str, Any]) -> Dict[str, float]:
+        memory_hits = len(found)
+        for k, score in on_disk.items():
+            self._memory.put(k, float(score))
+            found[k] = float(score)
+        with self._lock:
+            self.lookups += len(keys)
+            self.memory_hits += memory_hits
+            self.disk_hits += len(found) - memory_hits
+        return found
+
+    def _missing(self, chunks: List[Chunk], keys: List[str], found: Dict[str, float]) -> List[int]:
+        # Positions to score; duplicate chunks in one call are scored once.
+        seen = set()
+        out = []
+        for i, k in enumerate(keys):
+            if k not in found and k not in seen:
+                seen.add(k)
+                out.append(i)
+        return out
+
+    def _store(self, keys: List[str], missing: List[int], results: List[RerankResult]) -> Dict[str, float]:
+        scored = self._remember(keys, missing, results)
+        if self._disk is not None:
+            self._disk.put_many(self.model, scored)
+        return scored
+
+    async def _astore(self, keys: List[str], missing: List[int], results: List[RerankResult]) -> Dict[str, float]:
+        scored = self._remember(keys, missing, results)
+        if self._disk is not None:
+            await self._disk.aput_many(self.model, scored)
+        return scored
+
+    def _remember(self, keys: List[str], missing: List[int], results: List[RerankResult]) -> Dict[str, float]:
+        scored: Dict[str, float] = {}
+        for r in results:
+            scored[keys[missing[r.original_rank - 1]]] = r.score
+        with self._lock:
+            self.api_calls += 1
+            self.docs_scored += len(missing)
+        for k, score in scored.items():
+            self._memory.put(k, score)
+        return scored
+
+    def _results(self, chunks: List[Chunk], keys: List[str], scores: Dict[str, float], top_k: int) -> List[RerankResult]:
+        # Score desc, original position for ties; original_rank as the provider reports it (1-based input position).
+        ranked = sorted(
+            (i for i, k in enumerate(keys) if k in scores),
+            key=lambda i: (-scores[keys[i]], i),
+        )
+        return [RerankResult(chunk=chunks[i], score=scores[keys[i]], original_rank=i + 1) for i in ranked[:top_k]]
+
+
+class CachingReranker(_RerankCacheBase):
+    """Drop-in wrapper for a reranker used by rerank_fused (e.g. CohereReranker)."""
+
+    def rerank(self, query: str, chunks: List[Chunk], top_k: int = 5) -> List[RerankResult]:
+        if not chunks:
+            return []
+        keys = self._keys(query, chunks)
+        scores = self._cached(keys)
+        missing = self._missing(chunks, keys, scores)
+        if missing:
+            to_score = [chunks[i] for i in missing]
+            scores.update(self._store(keys, missing, self.reranker.rerank(query, to_score, top_k=len(to_score))))
+        return self._results(chunks, keys, scores, top_k)
+
+
+class AsyncCachingReranker(_RerankCacheBase):
+    """Same as CachingReranker for an async reranker (arerank_fused)."""
+
+    async def rerank(self, query: str, chunks: List[Chunk], top_k: int = 5) -> List[RerankResult]:
+        if not chunks:
+            return []
+        keys = self._keys(query, chunks)
+        scores = await self._acached(keys)
+        missing = self._missing(chunks, keys, scores)
+        if missing:
+            to_score = [chunks[i] for i in missing]
+            results = await self.reranker.rerank(query, to_score, top_k=len(to_score))
+            scores.update(await self._astore(keys, missing, results))
+        return self._results(chunks, keys, scores, top_k)
@@ -0,0 +1,31 @@
+from __future__ import annotations
+
+from typing import Any
+
+from app.rerank.local_reranker import AsyncLocalReranker, LocalReranker
+
+
+def create_reranker(settings: Any, asynchronous: bool = True) -> Any:
+    """
+    Reranker selected by settings.rerank_provider:
+    - "cohere" (default when unset): Cohere rerank API
+    - "local": in-process LocalReranker (RERANK_LOCAL_MODEL: "lexical" or a
+      cross-encoder model name), warmed up here so startup pays the model load
+    Returns the async variant for arerank_fused unless asynchronous=False.
+    """
+    provider = (settings.rerank_provider or "cohere").lower()
+    if provider == "local":
+        local = LocalReranker(
+            model=settings.rerank_local_model,
+            batch_size=settings.rerank_local_batch_size,
+            max_workers=settings.rerank_local_workers,
+        )
+        local.warm_up()
+        return AsyncLocalReranker(local) if asynchronous else local
+    if provider == "cohere":
+        # Imported lazily so local-only deployments do not need the cohere SDK.
+        from app.rerank.cohere_reranker import AsyncCohereReranker, CohereReranker
+
+        cls = AsyncCohereReranker if asynchronous else CohereReranker
+        return cls(api_key=settings.cohere_api_key or "", model=settings.cohere_rerank_model or "rerank-english-v3.0")
+    raise ValueError(f"Unknown RERANK_PROVIDER: {settings.rerank_provider!r} (expected 'cohere' or 'local')")
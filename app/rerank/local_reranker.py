@@ -0,0 +1,142 @@
+from __future__ import annotations
+
+import asyncio
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Mapping, Optional, Sequence
+
+import numpy as np
+
+from app.core.types import Chunk
+from app.indexing.bm25_index import simple_tokenize
+from app.rerank.base import RerankResult
+
+try:  # cross-encoder backend; the lexical scorer needs nothing beyond numpy
+    from sentence_transformers import CrossEncoder
+except ImportError:
+    CrossEncoder = None
+
+# scorer(query, texts) -> one relevance score per text (higher = more relevant)
+Scorer = Callable[[str, Sequence[str]], np.ndarray]
+
+LEXICAL = "lexical"
+
+# Query terms that carry no relevance signal on their own (weight 0 in LexicalScorer).
+_STOPWORDS = frozenset(
+    "a an and are as at be by can do does for from how i in is it of on or that the this to "
+    "under was what when where which who why will with".split()
+)
+
+
+class LexicalScorer:
+    """
+    Deterministic, dependency-free stand-in for a cross-encoder: BM25 term
+    saturation and length normalization, vectorized per batch. Term weights
+    (`idf`, default 1.0; stopwords 0) and `avgdl` are fixed, so a (query, text)
+    pair always gets the same score whatever else is scored with it; batches,
+    cached scores and coalesced candidate sets are therefore comparable. Used
+    for tests and as a zero-download local option.
+    """
+
+    def __init__(
+        self,
+        k1: float = 1.2,
+        b: float = 0.75,
+        avgdl: float = 250.0,
+        idf: Optional[Mapping[str, float]] = None,
+    ):
+        self.k1 = k1
+        self.b = b
+        self.avgdl = avgdl
+        self.idf = dict(idf or {})
+
+    def __call__(self, query: str, texts: Sequence[str]) -> np.ndarray:
+        terms = sorted(set(simple_tokenize(query)) - _STOPWORDS)
+        if not texts or not terms:
+            return np.zeros(len(texts), dtype=np.float32)
+        docs = [Counter(simple_tokenize(t)) for t in texts]
+        tf = np.array([[d.get(t, 0) for t in terms] for d in docs], dtype=np.float32)   # docs x terms
+        dl = np.array([sum(d.values()) for d in docs], dtype=np.float32)
+        weights = np.array([self.idf.get(t, 1.0) for t in terms], dtype=np.float32)
+        norm = self.k1 * (1.0 - self.b + self.b * dl / self.avgdl)
+        return ((tf * (self.k1 + 1.0)) / (tf + norm[:, None]) * weights).sum(axis=1).astype(np.float32)
+
+
+class CrossEncoderScorer:
+    """sentence-transformers CrossEncoder (e.g. cross-encoder/ms-marco-MiniLM-L-6-v2) on CPU."""
+
+    def __init__(self, model_name: str, batch_size: int = 32):
+        if CrossEncoder is None:
+            raise ImportError("sentence-transformers is required for a cross-encoder reranker")
+        self.model = CrossEncoder(model_name, device="cpu")
+        self.batch_size = batch_size
+
+    def __call__(self, query: str, texts: Sequence[str]) -> np.ndarray:
+        pairs = [(query, t) for t in texts]
+        return np.asarray(self.model.predict(pairs, batch_size=self.batch_size), dtype=np.float32)
+
+
+class LocalReranker:
+    """
+    In-process reranker: (query, chunk) pairs are scored in batches of
+    `batch_size` on a thread pool of `max_workers` (model inference releases the
+    GIL). `model` is "lexical" (LexicalScorer) or a cross-encoder model name;
+    `scorer` overrides both. warm_up() loads the model and runs one batch, so
+    the first request does not pay for it.
+
+    Scorers must score each (query, text) pair independently of the rest of
+    the batch: batches are scored separately, and the cache and batcher
+    wrappers mix scores from different calls.
+    """
+
+    def __init__(
+        self,
+        model: str = LEXICAL,
+        batch_size: int = 32,
+        max_workers: int = 2,
+        scorer: Optional[Scorer] = None,
+    ):
+        self.model = model
+        self.batch_size = batch_size
+        self.scorer: Scorer = scorer or (LexicalScorer() if model == LEXICAL else CrossEncoderScorer(model, batch_size))
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="rerank")
+
+    def warm_up(self) -> None:
+        self.scores("warm up", ["warm up"])
+
+    def scores(self, query: str, texts: Sequence[str]) -> np.ndarray:
+        if not texts:
+            return np.zeros(0, dtype=np.float32)
+        batches = [texts[i:i + self.batch_size] for i in range(0, len(texts), self.batch_size)]
+        if len(batches) == 1:
+            return self.scorer(query, batches[0])
+        return np.concatenate(list(self._pool.map(lambda b: self.scorer(query, b), batches)))
+
+    def rerank(self, query: str, chunks: List[Chunk], top_k: int = 5) -> List[RerankResult]:
+        if not chunks or top_k <= 0:
+            return []
+        scores = self.scores(query, [c.text for c in chunks])
+        k = min(top_k, len(chunks))
+        order = np.lexsort((np.arange(len(chunks)), -scores))[:k]  # score desc, input order for ties
+        return [RerankResult(chunk=chunks[i], score=float(scores[i]), original_rank=int(i) + 1) for i in order]
+
+    def close(self) -> None:
+        self._pool.shutdown(wait=False)
+
+
+class AsyncLocalReranker:
+    """
+    LocalReranker for arerank_fused: each call runs on the loop's default executor
+    (its batches then fan out to the reranker's own pool, never blocking the loop).
+    """
+
+    def __init__(self, reranker: LocalReranker):
+        self.reranker = reranker
+        self.model = reranker.model
+
+    def warm_up(self) -> None:
+        self.reranker.warm_up()
+
+    async def rerank(self, query: str, chunks: List[Chunk], top_k: int = 5) -> List[RerankResult]:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.reranker.rerank, query, chunks, top_k)
@@ -1,18 +1,28 @@
 from __future__ import annotations
 
-from typing import List
+from typing import List, Optional
 
 from app.core.types import RetrievedItem
 from app.indexing.bm25_index import BM25Index
 
 
 class BM25Retriever:
-    def __init__(self, index: BM25Index):
+    def __init__(self, index: BM25Index, with_text: bool = True):
         self.index = index
+        self.with_text = with_text  # False: ChunkRef items, hydrated after fusion
 
-    def retrieve(self, query: str, top_k: int) -> List[RetrievedItem]:
-        hits = self.index.search(query, top_k=top_k)
-        items: List[RetrievedItem] = []
-        for rank, (chunk, score) in enumerate(hits, start=1):
-            items.append(RetrievedItem(chunk=chunk, source="bm25", rank=rank, score=score))
-        return items
+    def retrieve(self, query: str, top_k: int, doc_id_filter: Optional[str] = None) -> List[RetrievedItem]:
+        # doc_id_filter is accepted for protocol parity; the index is built per scope.
+        hits = self.index.search(query, top_k=top_k, with_text=self.with_text)
+        return _to_items(hits)
+
+    def retrieve_batch(self, queries: List[str], top_k: int) -> List[List[RetrievedItem]]:
+        # For eval/tuning: scores all queries in one pass over the index.
+        return [_to_items(hits) for hits in self.index.search_batch(queries, top_k=top_k)]
+
+
+def _to_items(hits) -> List[RetrievedItem]:
+    items: List[RetrievedItem] = []
+    for rank, (chunk, score) in enumerate(hits, start=1):
+        items.append(RetrievedItem(chunk=chunk, source="bm25", rank=rank, score=score))
+    return items
@@ -0,0 +1,155 @@
+from __future__ import annotations
+
+import hashlib
+import re
+import threading
+import unicodedata
+from array import array
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from app.core.cache import LRUCache, SQLiteCache
+
+_WS_RE = re.compile(r"\s+")
+
+
+def normalize_query(text: str) -> str:
+    # Cache key text: NFC, trimmed, whitespace collapsed (case is kept; it can change the embedding).
+    return _WS_RE.sub(" ", unicodedata.normalize("NFC", text)).strip()
+
+
+class _EmbeddingCacheBase:
+    """
+    Two cache tiers keyed by (embedding model, normalized text):
+    - in-memory LRU (max_entries, optional ttl_s)
+    - optional SQLite file (disk_path) shared across restarts/workers, with its own
+      TTL and entry limit (oldest rows are dropped first); vectors stored as float32,
+      the precision pgvector keeps anyway; the async wrapper touches it only from
+      the loop's default executor
+    """
+
+    def __init__(
+        self,
+        model: str,
+        max_entries: int = 10_000,
+        ttl_s: Optional[float] = None,
+        disk_path: Optional[str] = None,
+        disk_ttl_s: Optional[float] = None,
+        disk_max_entries: Optional[int] = 200_000,
+    ):
+        self.model = model
+        self._memory: LRUCache[str, List[float]] = LRUCache(max_entries=max_entries, ttl_s=ttl_s)
+        self._disk = (
+            SQLiteCache(disk_path, "query_embeddings", ttl_s=disk_ttl_s, max_entries=disk_max_entries)
+            if disk_path
+            else None
+        )
+        self._lock = threading.Lock()
+        self.lookups = 0
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.api_calls = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            hits = self.memory_hits + self.disk_hits
+            out: Dict[str, Any] = {
+                "lookups": self.lookups,
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "api_calls": self.api_calls,
+                "hit_ratio": (hits / self.lookups) if self.lookups else 0.0,
+            }
+        out["memory"] = self._memory.stats()
+        if self._disk is not None:
+            out["disk_entries"] = self._disk.count()
+        return out
+
+    def clear(self) -> None:
+        self._memory.clear()
+        if self._disk is not None:
+            self._disk.clear()
+
+    def _key(self, text: str) -> str:
+        return hashlib.sha256(f"{self.model}\0{normalize_query(text)}".encode("utf-8")).hexdigest()
+
+    def _cached(self, key: str) -> Optional[List[float]]:
+        vec = self._from_memory(key)
+        if vec is None and self._disk is not None:
+            vec = self._from_disk(key, self._disk.get(key))
+        return vec
+
+    async def _acached(self, key: str) -> Optional[List[float]]:
+        vec = self._from_memory(key)
+        if vec is None and self._disk is not None:
+            vec = self._from_disk(key, (await self._disk.aget_many([key])).get(key))
+        return vec
+
+    def _from_memory(self, key: str) -> Optional[List[float]]:
+        with self._lock:
+            self.lookups += 1
+        vec = self._memory.get(key)
+        if vec is not None:
+            with self._lock:
+                self.memory_hits += 1
+        return vec
+
+    def _from_disk(self, key: str, blob: Optional[bytes]) -> Optional[List[float]]:
+        if blob is None:
+            return None
+        vec = array("f")
+        vec.frombytes(blob)
+        out = vec.tolist()
+        self._memory.put(key, out)
+        with self._lock:
+            self.disk_hits += 1
+        return out
+
+    def _store(self, key: str, vec: List[float]) -> None:
+        self._remember(key, vec)
+        if self._disk is not None:
+            self._disk.put(key, self.model, array("f", vec).tobytes())
+
+    async def _astore(self, key: str, vec: List[float]) -> None:
+        self._remember(key, vec)
+        if self._disk is not None:
+            await self._disk.aput_many(self.model, {key: array("f", vec).tobytes()})
+
+    def _remember(self, key: str, vec: List[float]) -> None:
+        with self._lock:
+            self.api_calls += 1
+        self._memory.put(key, vec)
+
+
+class CachingEmbedder(_EmbeddingCacheBase):
+    """
+    Drop-in embed_fn wrapper: CachingEmbedder(embed, model=...)(text) -> List[float].
+    Only misses reach embed_fn.
+    """
+
+    def __init__(self, embed_fn: Callable[[str], List[float]], model: str, **kwargs: Any):
+        super().__init__(model, **kwargs)
+        self.embed_fn = embed_fn
+
+    def __call__(self, text: str) -> List[float]:
+        key = self._key(text)
+        vec = self._cached(key)
+        if vec is None:
+            vec = list(self.embed_fn(text))
+            self._store(key, vec)
+        return vec
+
+
+class AsyncCachingEmbedder(_EmbeddingCacheBase):
+    """Same as CachingEmbedder for an async embed_fn (AsyncPGVectorSemanticRetriever)."""
+
+    def __init__(self, embed_fn: Callable[[str], Awaitable[List[float]]], model: str, **kwargs: Any):
+        super().__init__(model, **kwargs)
+        self.embed_fn = embed_fn
+
+    async def __call__(self, text: str) -> List[float]:
+        key = self._key(text)
+        vec = await self._acached(key)
+        if vec is None:
+            vec = list(await self.embed_fn(text))
+            await self._astore(key, vec)
+        return vec
@@ -1,8 +1,17 @@
 from __future__ import annotations
-from typing import List, Optional, Protocol
+import asyncio
+import functools
+import inspect
+import time
+from concurrent.futures import Executor, Future, TimeoutError as FutureTimeout
+from typing import Any, Callable, Dict, List, Optional, Protocol, Tuple
 
 from app.core.types import RetrievedItem, FusedItem
 from app.retrieval.fusion import weighted_rrf_fuse, RRFWeights
+from app.retrieval.hydration import ahydrate_fused, hydrate_fused
+
+# (hits, elapsed ms) of one retrieval leg
+_TimedLeg = Tuple[List[RetrievedItem], float]
 
 
 class SemanticRetriever(Protocol):
@@ -10,21 +19,45 @@ class SemanticRetriever(Protocol):
 
 
 class BM25Retriever(Protocol):
-    def retrieve(self, query: str, top_k: int) -> List[RetrievedItem]: ...
+    # Keyword leg: in-process BM25 (index already scoped) or Postgres full-text.
+    def retrieve(self, query: str, top_k: int, doc_id_filter: Optional[str] = None) -> List[RetrievedItem]: ...
 
 
 class HybridRetriever:
+    """
+    Semantic + keyword retrieval fused with weighted RRF.
+
+    With `concurrent` and an `executor`, both legs run concurrently and each may
+    have a timeout (seconds, measured from submission). A leg that misses its
+    timeout is treated as empty, so the answer is built from the leg that
+    finished; if both miss, TimeoutError is raised. Without timeouts the fused
+    output is identical to the sequential path (concurrent=False or no executor).
+
+    With a `chunk_store`, legs may return ChunkRef items (with_text=False) and
+    only the fused top `fused_top_n` are hydrated, in one batched read.
+    """
+
     def __init__(
         self,
         semantic: SemanticRetriever,
         bm25: BM25Retriever,
         weights: RRFWeights,
         fused_top_n: int = 20,
+        concurrent: bool = True,
+        executor: Optional[Executor] = None,
+        semantic_timeout_s: Optional[float] = None,
+        bm25_timeout_s: Optional[float] = None,
+        chunk_store: Any = None,
     ):
         self.semantic = semantic
         self.bm25 = bm25
         self.weights = weights
         self.fused_top_n = fused_top_n
+        self.concurrent = concurrent
+        self.executor = executor
+        self.semantic_timeout_s = semantic_timeout_s
+        self.bm25_timeout_s = bm25_timeout_s
+        self.chunk_store = chunk_store
 
     def retrieve(
         self,
@@ -32,7 +65,185 @@ class HybridRetriever:
         semantic_top_k: int,
         bm25_top_k: int,
         doc_id_filter: Optional[str] = None,
+        report: Optional[Dict[str, Any]] = None,
     ) -> List[FusedItem]:
-        sem = self.semantic.retrieve(query, semantic_top_k, doc_id_filter=doc_id_filter)
-        kw = self.bm25.retrieve(query, bm25_top_k)
-        return weighted_rrf_fuse(sem, kw, self.weights, top_n=self.fused_top_n)
+        """If `report` is given it is filled with per-leg timings (ms) and timeout flags."""
+        report = report if report is not None else {}
+
+        def run_semantic() -> List[RetrievedItem]:
+            return self.semantic.retrieve(query, semantic_top_k, doc_id_filter=doc_id_filter)
+
+        def run_bm25() -> List[RetrievedItem]:
+            return self.bm25.retrieve(query, bm25_top_k, doc_id_filter=doc_id_filter)
+
+        if not self.concurrent or self.executor is None:
+            report["mode"] = "sequential"
+            sem = _timed_into(_timed(run_semantic), report, "semantic_ms")
+            kw = _timed_into(_timed(run_bm25), report, "bm25_ms")
+            return self._hydrate(weighted_rrf_fuse(sem, kw, self.weights, top_n=self.fused_top_n), report)
+
+        report["mode"] = "concurrent"
+        t0 = time.perf_counter()
+        sem_f = self.executor.submit(_timed, run_semantic)
+        kw_f = self.executor.submit(_timed, run_bm25)
+
+        # Legs return their timing; only finished legs are merged into report,
+        # so a leg still running after a timeout never touches it.
+        try:
+            sem = _timed_into(_result_within(sem_f, self.semantic_timeout_s, t0), report, "semantic_ms")
+            kw = _timed_into(_result_within(kw_f, self.bm25_timeout_s, t0), report, "bm25_ms")
+        finally:
+            kw_f.cancel()  # semantic leg failed: drop BM25 if it has not started
+        report["semantic_timed_out"] = sem is None
+        report["bm25_timed_out"] = kw is None
+        report["total_ms"] = (time.perf_counter() - t0) * 1000.0
+        if sem is None and kw is None:
+            raise TimeoutError("both semantic and BM25 retrieval timed out")
+
+        return self._hydrate(weighted_rrf_fuse(sem or [], kw or [], self.weights, top_n=self.fused_top_n), report)
+
+    def _hydrate(self, fused: List[FusedItem], report: Dict[str, Any]) -> List[FusedItem]:
+        if self.chunk_store is None:
+            return fused
+        t0 = time.perf_counter()
+        try:
+            return hydrate_fused(fused, self.chunk_store)
+        finally:
+            report["hydrate_ms"] = (time.perf_counter() - t0) * 1000.0
+
+
+class AsyncHybridRetriever:
+    """
+    Async HybridRetriever for the async /ask path. Legs whose retrieve() is a
+    coroutine are awaited; sync legs (the in-process BM25Retriever) run on
+    `executor` (default: the loop's) so they never block the event loop.
+    Timeouts, fallback, hydration and the report behave as in HybridRetriever
+    (`chunk_store` is an AsyncPGVectorStore here).
+    """
+
+    def __init__(
+        self,
+        semantic,
+        bm25,
+        weights: RRFWeights,
+        fused_top_n: int = 20,
+        concurrent: bool = True,
+        executor: Optional[Executor] = None,
+        semantic_timeout_s: Optional[float] = None,
+        bm25_timeout_s: Optional[float] = None,
+        chunk_store: Any = None,
+    ):
+        self.semantic = semantic
+        self.bm25 = bm25
+        self.weights = weights
+        self.fused_top_n = fused_top_n
+        self.concurrent = concurrent
+        self.executor = executor
+        self.semantic_timeout_s = semantic_timeout_s
+        self.bm25_timeout_s = bm25_timeout_s
+        self.chunk_store = chunk_store
+
+    async def retrieve(
+        self,
+        query: str,
+        semantic_top_k: int,
+        bm25_top_k: int,
+        doc_id_filter: Optional[str] = None,
+        report: Optional[Dict[str, Any]] = None,
+    ) -> List[FusedItem]:
+        report = report if report is not None else {}
+
+        if not self.concurrent:
+            # Each coroutine is created only when awaited, so a failing semantic
+            # leg leaves no BM25 coroutine behind.
+            report["mode"] = "sequential"
+            sem_leg = await self._leg(self.semantic, query, semantic_top_k, doc_id_filter)
+            sem = _timed_into(sem_leg, report, "semantic_ms")
+            kw = _timed_into(await self._leg(self.bm25, query, bm25_top_k, doc_id_filter), report, "bm25_ms")
+            return await self._hydrate(weighted_rrf_fuse(sem, kw, self.weights, top_n=self.fused_top_n), report)
+
+        report["mode"] = "concurrent"
+        t0 = time.perf_counter()
+        sem_t = asyncio.ensure_future(self._leg(self.semantic, query, semantic_top_k, doc_id_filter))
+        kw_t = asyncio.ensure_future(self._leg(self.bm25, query, bm25_top_k, doc_id_filter))
+
+        try:
+            sem = _timed_into(await _aresult_within(sem_t, self.semantic_timeout_s, t0), report, "semantic_ms")
+            kw = _timed_into(await _aresult_within(kw_t, self.bm25_timeout_s, t0), report, "bm25_ms")
+        finally:
+            _settle(sem_t, kw_t)
+        report["semantic_timed_out"] = sem is None
+        report["bm25_timed_out"] = kw is None
+        report["total_ms"] = (time.perf_counter() - t0) * 1000.0
+        if sem is None and kw is None:
+            raise TimeoutError("both semantic and BM25 retrieval timed out")
+
+        return await self._hydrate(weighted_rrf_fuse(sem or [], kw or [], self.weights, top_n=self.fused_top_n), report)
+
+    async def _hydrate(self, fused: List[FusedItem], report: Dict[str, Any]) -> List[FusedItem]:
+        if self.chunk_store is None:
+            return fused
+        t0 = time.perf_counter()
+        try:
+            return await ahydrate_fused(fused, self.chunk_store)
+        finally:
+            report["hydrate_ms"] = (time.perf_counter() - t0) * 1000.0
+
+    async def _leg(
+        self,
+        retriever,
+        query: str,
+        top_k: int,
+        doc_id_filter: Optional[str],
+    ) -> _TimedLeg:
+        t0 = time.perf_counter()
+        if inspect.iscoroutinefunction(retriever.retrieve):
+            items = await retriever.retrieve(query, top_k, doc_id_filter=doc_id_filter)
+        else:
+            call = functools.partial(retriever.retrieve, query, top_k, doc_id_filter=doc_id_filter)
+            items = await asyncio.get_running_loop().run_in_executor(self.executor, call)
+        return items, (time.perf_counter() - t0) * 1000.0
+
+
+def _settle(*tasks: "asyncio.Future") -> None:
+    # When one leg raised, the other is cancelled if still running, or its
+    # outcome is retrieved, so it is neither left behind nor logged as unhandled.
+    for task in tasks:
+        if not task.done():
+            task.cancel()
+        elif not task.cancelled():
+            task.exception()
+
+
+def _timed(fn: Callable[[], List[RetrievedItem]]) -> _TimedLeg:
+    t0 = time.perf_counter()
+    items = fn()
+    return items, (time.perf_counter() - t0) * 1000.0
+
+
+def _timed_into(leg: Optional[_TimedLeg], report: Dict[str, Any], key: str) -> Optional[List[RetrievedItem]]:
+    # Records a finished leg's timing; None (timed out) passes through.
+    if leg is None:
+        return None
+    items, ms = leg
+    report[key] = ms
+    return items
+
+
+def _result_within(fut: Future, timeout_s: Optional[float], started: float) -> Optional[_TimedLeg]:
+    # None = missed the deadline; errors from the leg propagate as in the sequential path.
+    remaining = None if timeout_s is None else max(0.0, timeout_s - (time.perf_counter() - started))
+    try:
+        return fut.result(timeout=remaining)
+    except FutureTimeout:
+        fut.cancel()  # only helps if it never started; a running leg finishes in the background
+        return None
+
+
+async def _aresult_within(task: "asyncio.Future", timeout_s: Optional[float], started: float) -> Optional[_TimedLeg]:
+    remaining = None if timeout_s is None else max(0.0, timeout_s - (time.perf_counter() - started))
+    done, _ = await asyncio.wait({task}, timeout=remaining)
+    if not done:
+        task.cancel()
+        return None
+    return task.result()
@@ -0,0 +1,43 @@
+from __future__ import annotations
+
+from dataclasses import replace
+from typing import Dict, List, Sequence
+
+from app.core.types import Chunk, ChunkRef, FusedItem
+
+
+def hydrate_fused(fused: Sequence[FusedItem], store) -> List[FusedItem]:
+    """
+    Late hydration: legs retrieve ChunkRef records (id + score), fusion keeps the
+    top candidates, and only those get text/metadata here, in one batched
+    get_chunks_by_ids call. Items that already carry a Chunk are kept as is;
+    chunks deleted since retrieval are dropped. Order is preserved.
+    """
+    ids = _ref_ids(fused)
+    if not ids:
+        return list(fused)
+    return _with_chunks(fused, store.get_chunks_by_ids(ids))
+
+
+async def ahydrate_fused(fused: Sequence[FusedItem], store) -> List[FusedItem]:
+    """hydrate_fused for an AsyncPGVectorStore."""
+    ids = _ref_ids(fused)
+    if not ids:
+        return list(fused)
+    return _with_chunks(fused, await store.get_chunks_by_ids(ids))
+
+
+def _ref_ids(fused: Sequence[FusedItem]) -> List[str]:
+    return [f.chunk.chunk_id for f in fused if isinstance(f.chunk, ChunkRef)]
+
+
+def _with_chunks(fused: Sequence[FusedItem], by_id: Dict[str, Chunk]) -> List[FusedItem]:
+    out: List[FusedItem] = []
+    for f in fused:
+        if isinstance(f.chunk, ChunkRef):
+            chunk = by_id.get(f.chunk.chunk_id)
+            if chunk is None:
+                continue
+            f = replace(f, chunk=chunk)
+        out.append(f)
+    return out
@@ -0,0 +1,46 @@
+from __future__ import annotations
+
+from typing import List, Optional
+
+from app.core.types import RetrievedItem
+from app.indexing.pgvector_store import PGVectorStore
+from app.indexing.pgvector_store_async import AsyncPGVectorStore
+
+
+class PGKeywordRetriever:
+    """
+    Keyword retrieval executed inside Postgres (tsvector + GIN, ranked with ts_rank_cd).
+    Drop-in for BM25Retriever: nothing is loaded into the worker, and doc_id_filter
+    is applied in SQL. The query goes over as whitespace-separated words; the
+    store reduces them to Unicode letter/digit runs, so accented words stay whole.
+    """
+
+    def __init__(self, store: PGVectorStore, with_text: bool = True):
+        self.store = store
+        self.with_text = with_text  # False: ChunkRef items, hydrated after fusion
+
+    def retrieve(self, query: str, top_k: int, doc_id_filter: Optional[str] = None) -> List[RetrievedItem]:
+        hits = self.store.keyword_search(
+            query.split(), top_k=top_k, doc_id_filter=doc_id_filter, with_text=self.with_text,
+        )
+        return _to_items(hits)
+
+
+class AsyncPGKeywordRetriever:
+    def __init__(self, store: AsyncPGVectorStore, with_text: bool = True):
+        self.store = store
+        self.with_text = with_text
+
+    async def retrieve(self, query: str, top_k: int, doc_id_filter: Optional[str] = None) -> List[RetrievedItem]:
+        hits = await self.store.keyword_search(
+            query.split(), top_k=top_k, doc_id_filter=doc_id_filter, with_text=self.with_text,
+        )
+        return _to_items(hits)
+
+
+def _to_items(hits) -> List[RetrievedItem]:
+    # Same shape as BM25Retriever so fusion treats both backends alike.
+    items: List[RetrievedItem] = []
+    for rank, (chunk, score) in enumerate(hits, start=1):
+        items.append(RetrievedItem(chunk=chunk, source="bm25", rank=rank, score=score))
+    return items
@@ -1,6 +1,10 @@
 from __future__ import annotations
-from typing import List
+import asyncio
+import time
+from concurrent.futures import Executor, TimeoutError as FutureTimeout
+from typing import Any, Dict, List, Optional
 
+from app.core.circuit_breaker import CircuitBreaker
 from app.core.types import Chunk
 from app.core.types import FusedItem
 
@@ -11,10 +15,114 @@ def rerank_fused(
     reranker,
     rerank_top_n: int = 20,
     final_top_k: int = 5,
+    timeout_s: Optional[float] = None,
+    breaker: Optional[CircuitBreaker] = None,
+    executor: Optional[Executor] = None,
+    report: Optional[Dict[str, Any]] = None,
 ) -> List[Chunk]:
+    """
+    Reranks the top `rerank_top_n` fused candidates and keeps `final_top_k`.
+
+    Degrades to fused order (top `final_top_k` by fused_score) instead of failing
+    when the reranker raises, when it misses `timeout_s` (needs an `executor` to
+    run the call on; without one the timeout is not enforced), or while `breaker`
+    is open. `report` gets {"reranked", "fallback", "rerank_ms"}; timeouts and
+    errors count as breaker failures. Without candidates the reranker is not
+    called at all.
+    """
+    report = report if report is not None else {}
+    chunks = _candidates(fused, rerank_top_n)
+    if not chunks:
+        # e.g. an empty doc_id scope: no provider call, no breaker outcome
+        report.update(reranked=False, fallback=None)
+        return []
+    if not _admit(breaker, report):
+        return _fused_order(fused, final_top_k)
+
+    t0 = time.perf_counter()
+    try:
+        if executor is not None and timeout_s is not None:
+            fut = executor.submit(reranker.rerank, query, chunks, top_k=final_top_k)
+            try:
+                reranked = fut.result(timeout=timeout_s)
+            except FutureTimeout:
+                fut.cancel()  # a running call finishes in the background; its result is ignored
+                return _fallback(fused, final_top_k, breaker, report, "timeout")
+        else:
+            reranked = reranker.rerank(query, chunks, top_k=final_top_k)
+    except Exception as e:
+        return _fallback(fused, final_top_k, breaker, report, f"error: {type(e).__name__}")
+    finally:
+        report["rerank_ms"] = (time.perf_counter() - t0) * 1000.0
+    return _reranked(reranked, breaker, report)
+
+
+async def arerank_fused(
+    query: str,
+    fused: List[FusedItem],
+    reranker,
+    rerank_top_n: int = 20,
+    final_top_k: int = 5,
+    timeout_s: Optional[float] = None,
+    breaker: Optional[CircuitBreaker] = None,
+    report: Optional[Dict[str, Any]] = None,
+) -> List[Chunk]:
+    # Same as rerank_fused, with an async reranker (e.g. AsyncCohereReranker); the
+    # deadline cancels the call.
+    report = report if report is not None else {}
+    chunks = _candidates(fused, rerank_top_n)
+    if not chunks:
+        # e.g. an empty doc_id scope: no provider call, no breaker outcome
+        report.update(reranked=False, fallback=None)
+        return []
+    if not _admit(breaker, report):
+        return _fused_order(fused, final_top_k)
+
+    t0 = time.perf_counter()
+    try:
+        reranked = await asyncio.wait_for(reranker.rerank(query, chunks, top_k=final_top_k), timeout=timeout_s)
+    except asyncio.TimeoutError:
+        return _fallback(fused, final_top_k, breaker, report, "timeout")
+    except Exception as e:
+        return _fallback(fused, final_top_k, breaker, report, f"error: {type(e).__name__}")
+    finally:
+        report["rerank_ms"] = (time.perf_counter() - t0) * 1000.0
+    return _reranked(reranked, breaker, report)
+
+
+def _candidates(fused: List[FusedItem], rerank_top_n: int) -> List[Chunk]:
     # Take top N fused items for cross-encoder rerank
     candidates = fused[: min(rerank_top_n, len(fused))]
-    chunks = [c.chunk for c in candidates]
+    return [c.chunk for c in candidates]
+
+
+def _fused_order(fused: List[FusedItem], final_top_k: int) -> List[Chunk]:
+    ranked = sorted(fused, key=lambda f: f.fused_score, reverse=True)
+    return [f.chunk for f in ranked[:final_top_k]]
+
+
+def _admit(breaker: Optional[CircuitBreaker], report: Dict[str, Any]) -> bool:
+    if breaker is None or breaker.allow():
+        return True
+    report.update(reranked=False, fallback="circuit_open")
+    return False
+
+
+def _fallback(
+    fused: List[FusedItem],
+    final_top_k: int,
+    breaker: Optional[CircuitBreaker],
+    report: Dict[str, Any],
+    reason: str,
+) -> List[Chunk]:
+    if breaker is not None:
+        breaker.record_failure()
+    report.update(reranked=False, fallback=reason)
+    return _fused_order(fused, final_top_k)
+
 
-    reranked = reranker.rerank(query, chunks, top_k=final_top_k)
+def _reranked(reranked, breaker: Optional[CircuitBreaker], report: Dict[str, Any]) -> List[Chunk]:
+    if breaker is not None:
+        breaker.record_success()
+    report.update(reranked=True, fallback=None)
     return [r.chunk for r in reranked]
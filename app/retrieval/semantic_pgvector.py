@@ -4,23 +4,74 @@ from typing import List, Optional
 
 from app.core.types import RetrievedItem
 from app.indexing.pgvector_store import PGVectorStore
+from app.indexing.pgvector_store_async import AsyncPGVectorStore
 
 
 class PGVectorSemanticRetriever:
-    def __init__(self, store: PGVectorStore, embed_fn):
+    def __init__(
+        self,
+        store: PGVectorStore,
+        embed_fn,
+        ef_search: Optional[int] = None,
+        probes: Optional[int] = None,
+        mode: Optional[str] = None,
+        with_text: bool = True,
+    ):
         """
         embed_fn(query: str) -> List[float]
         Keep as dependency injection so we can swap OpenAI embeddings later.
+        ef_search / probes / mode ("full" | "reduced" | "binary") override the
+        store's defaults (None = store default).
+        with_text=False returns ChunkRef items (see app.retrieval.hydration).
         """
         self.store = store
         self.embed_fn = embed_fn
+        self.ef_search = ef_search
+        self.probes = probes
+        self.mode = mode
+        self.with_text = with_text
 
     def retrieve(self, query: str, top_k: int, doc_id_filter: Optional[str] = None) -> List[RetrievedItem]:
         q_emb = self.embed_fn(query)
-        results = self.store.semantic_search(q_emb, top_k=top_k, doc_id_filter=doc_id_filter)
+        results = self.store.semantic_search(
+            q_emb, top_k=top_k, doc_id_filter=doc_id_filter,
+            ef_search=self.ef_search, probes=self.probes, mode=self.mode, with_text=self.with_text,
+        )
+        return _to_items(results)
 
-        # distance: smaller is better. rank is 1-based.
-        items: List[RetrievedItem] = []
-        for i, (chunk, dist) in enumerate(results, start=1):
-            items.append(RetrievedItem(chunk=chunk, source="semantic", rank=i, score=-dist))
-        return items
+
+class AsyncPGVectorSemanticRetriever:
+    def __init__(
+        self,
+        store: AsyncPGVectorStore,
+        embed_fn,
+        ef_search: Optional[int] = None,
+        probes: Optional[int] = None,
+        mode: Optional[str] = None,
+        with_text: bool = True,
+    ):
+        """
+        embed_fn(query: str) -> Awaitable[List[float]]
+        """
+        self.store = store
+        self.embed_fn = embed_fn
+        self.ef_search = ef_search
+        self.probes = probes
+        self.mode = mode
+        self.with_text = with_text
+
+    async def retrieve(self, query: str, top_k: int, doc_id_filter: Optional[str] = None) -> List[RetrievedItem]:
+        q_emb = await self.embed_fn(query)
+        results = await self.store.semantic_search(
+            q_emb, top_k=top_k, doc_id_filter=doc_id_filter,
+            ef_search=self.ef_search, probes=self.probes, mode=self.mode, with_text=self.with_text,
+        )
+        return _to_items(results)
+
+
+def _to_items(results) -> List[RetrievedItem]:
+    # distance: smaller is better. rank is 1-based.
+    items: List[RetrievedItem] = []
+    for i, (chunk, dist) in enumerate(results, start=1):
+        items.append(RetrievedItem(chunk=chunk, source="semantic", rank=i, score=-dist))
+    return items
@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+import asyncio
+from typing import Any, List, Optional
+
+from app.core.types import RetrievedItem
+from app.indexing.vector_replica import VectorReplica
+from app.retrieval.semantic_pgvector import _to_items
+
+
+class ReplicaSemanticRetriever:
+    def __init__(self, replica: VectorReplica, embed_fn, store: Any, fallback: Any = None, with_text: bool = True):
+        """
+        embed_fn(query: str) -> List[float]
+        Nearest neighbours come from the in-process replica; only the winning
+        chunk rows are read from `store` (get_chunks_by_ids). Until the replica
+        has loaded, queries go to `fallback` (e.g. PGVectorSemanticRetriever).
+        with_text=False skips that read and returns ChunkRef items.
+        """
+        self.replica = replica
+        self.embed_fn = embed_fn
+        self.store = store
+        self.fallback = fallback
+        self.with_text = with_text
+
+    def retrieve(self, query: str, top_k: int, doc_id_filter: Optional[str] = None) -> List[RetrievedItem]:
+        if not self.replica.ready and self.fallback is not None:
+            return self.fallback.retrieve(query, top_k, doc_id_filter=doc_id_filter)
+        hits = self.replica.search(self.embed_fn(query), top_k, doc_id_filter=doc_id_filter)
+        if not self.with_text:
+            return _to_items(self.replica.refs(hits))
+        chunks = self.store.get_chunks_by_ids([cid for cid, _ in hits])
+        return _to_items(_hydrated(hits, chunks))
+
+
+class AsyncReplicaSemanticRetriever:
+    def __init__(self, replica: VectorReplica, embed_fn, store: Any, fallback: Any = None, with_text: bool = True):
+        """
+        embed_fn(query: str) -> Awaitable[List[float]]
+        store: AsyncPGVectorStore. The replica search itself is CPU-bound and
+        runs on the default executor so large matrices do not block the loop.
+        """
+        self.replica = replica
+        self.embed_fn = embed_fn
+        self.store = store
+        self.fallback = fallback
+        self.with_text = with_text
+
+    async def retrieve(self, query: str, top_k: int, doc_id_filter: Optional[str] = None) -> List[RetrievedItem]:
+        if not self.replica.ready and self.fallback is not None:
+            return await self.fallback.retrieve(query, top_k, doc_id_filter=doc_id_filter)
+        q_emb = await self.embed_fn(query)
+        loop = asyncio.get_running_loop()
+        hits = await loop.run_in_executor(None, lambda: self.replica.search(q_emb, top_k, doc_id_filter=doc_id_filter))
+        if not self.with_text:
+            return _to_items(self.replica.refs(hits))
+        chunks = await self.store.get_chunks_by_ids([cid for cid, _ in hits])
+        return _to_items(_hydrated(hits, chunks))
+
+
+def _hydrated(hits, chunks):
+    # A chunk deleted after the replica's last sync has no row: drop it.
+    return [(chunks[cid], dist) for cid, dist in hits if cid in chunks]
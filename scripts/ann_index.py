@@ -0,0 +1,59 @@
+import os
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from dotenv import load_dotenv
+
+from app.indexing.pgvector_store import PGVectorStore
+
+load_dotenv()
+
+# Manages the ANN index on embeddings.embedding.
+# Usage: python scripts/ann_index.py status
+#        python scripts/ann_index.py create|rebuild|drop hnsw|ivfflat [full|reduced|binary]
+#        python scripts/ann_index.py backfill-reduced
+# "reduced" indexes the halfvec copy and needs EMBEDDING_REDUCED_DIMS;
+# "binary" indexes binary_quantize(embedding) as bit(EMBEDDING_DIMS).
+# Build parameters: HNSW_M (16), HNSW_EF_CONSTRUCTION (64), IVFFLAT_LISTS (rows/1000),
+# MAINTENANCE_WORK_MEM (e.g. 2GB).
+
+reduced_dims = os.environ.get("EMBEDDING_REDUCED_DIMS")
+store = PGVectorStore(
+    os.environ["PG_DSN"],
+    reduced_dims=int(reduced_dims) if reduced_dims else None,
+    embedding_dims=int(os.environ.get("EMBEDDING_DIMS", "1536")),
+)
+
+action = sys.argv[1] if len(sys.argv) > 1 else "status"
+method = sys.argv[2] if len(sys.argv) > 2 else "hnsw"
+target = sys.argv[3] if len(sys.argv) > 3 else "full"
+params = dict(
+    m=int(os.environ.get("HNSW_M", "16")),
+    ef_construction=int(os.environ.get("HNSW_EF_CONSTRUCTION", "64")),
+    lists=int(os.environ["IVFFLAT_LISTS"]) if os.environ.get("IVFFLAT_LISTS") else None,
+    maintenance_work_mem=os.environ.get("MAINTENANCE_WORK_MEM"),
+)
+
+if action == "create":
+    info = store.create_ann_index(method, target, **params)
+elif action == "rebuild":
+    info = store.rebuild_ann_index(method, target, **params)
+elif action == "drop":
+    store.drop_ann_index(method, target)
+    info = None
+    print(f"✅ Dropped {method} index ({target})")
+elif action == "backfill-reduced":
+    print(f"✅ Backfilled {store.backfill_reduced_embeddings()} reduced embeddings")
+elif action != "status":
+    print(f"Unknown action: {action}")
+    raise SystemExit(1)
+
+if action in ("create", "rebuild"):
+    built = f"built in {info.build_seconds:.1f}s" if info.build_seconds is not None else "already present"
+    print(f"✅ {info.name}: {built}")
+
+for i in store.ann_indexes():
+    state = "valid" if i.valid else "INVALID (rebuild or drop it)"
+    print(f"✅ {i.name} [{i.method}] {i.size_bytes / 1024 / 1024:.1f} MiB, {state}")
+    print(f"   {i.definition}")
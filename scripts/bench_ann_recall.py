@@ -0,0 +1,64 @@
+import os
+import sys
+import time
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from dotenv import load_dotenv
+from sqlalchemy import text
+
+from app.indexing.pgvector_store import PGVectorStore, _vector_to_list
+
+load_dotenv()
+
+# Recall@k vs latency of the ANN index against exact search, for picking
+# HNSW_EF_SEARCH / IVFFLAT_PROBES. Queries are stored embeddings sampled from the
+# corpus (each one's own chunk included, as for any real near-duplicate query).
+# Usage: python scripts/bench_ann_recall.py [hnsw|ivfflat]
+# Env: BENCH_QUERIES (100), BENCH_TOP_K (20), BENCH_DOC_ID (optional filter),
+#      BENCH_VALUES (default: ef_search 10..400 for hnsw, probes 1..100 for ivfflat)
+
+method = sys.argv[1] if len(sys.argv) > 1 else "hnsw"
+n_queries = int(os.environ.get("BENCH_QUERIES", "100"))
+top_k = int(os.environ.get("BENCH_TOP_K", "20"))
+doc_id = os.environ.get("BENCH_DOC_ID") or None
+default_values = "10,20,40,80,160,400" if method == "hnsw" else "1,2,5,10,20,50,100"
+values = [int(v) for v in os.environ.get("BENCH_VALUES", default_values).split(",")]
+
+store = PGVectorStore(os.environ["PG_DSN"])
+indexes = [i for i in store.ann_indexes() if i.method == method and i.valid]
+if not indexes:
+    print(f"No valid {method} index; run: python scripts/ann_index.py create {method}")
+    raise SystemExit(1)
+
+with store.engine.connect() as conn:
+    rows = conn.execute(
+        text("SELECT embedding FROM embeddings ORDER BY random() LIMIT :n"), {"n": n_queries}
+    ).scalars().all()
+queries = [_vector_to_list(r) for r in rows]
+
+
+def run(**knobs):
+    hits, times = [], []
+    for q in queries:
+        t0 = time.perf_counter()
+        res = store.semantic_search(q, top_k=top_k, doc_id_filter=doc_id, **knobs)
+        times.append((time.perf_counter() - t0) * 1000.0)
+        hits.append({c.chunk_id for c, _ in res})
+    times.sort()
+    return hits, times
+
+
+def pct(times, p):
+    return times[min(len(times) - 1, int(len(times) * p))]
+
+
+exact, exact_times = run(exact=True)
+print(f"✅ {len(queries)} queries, top_k={top_k}, index {indexes[0].name} ({indexes[0].size_bytes / 1024 / 1024:.1f} MiB)")
+print(f"✅ exact: p50 {pct(exact_times, 0.5):.2f} ms, p95 {pct(exact_times, 0.95):.2f} ms")
+
+knob = "ef_search" if method == "hnsw" else "probes"
+for v in values:
+    approx, times = run(**{knob: v})
+    recall = sum(len(a & e) / max(1, len(e)) for a, e in zip(approx, exact)) / len(queries)
+    print(f"✅ {knob}={v}: recall@{top_k} {recall:.3f}, p50 {pct(times, 0.5):.2f} ms, p95 {pct(times, 0.95):.2f} ms")
@@ -0,0 +1,55 @@
+import os
+import sys
+import time
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from dotenv import load_dotenv
+from sqlalchemy import text
+
+from app.indexing.pgvector_store import PGVectorStore, _vector_to_list
+
+load_dotenv()
+
+# Binary-quantized two-stage search (Hamming candidates -> exact cosine rescore) vs the
+# exact `<=>` query: QPS and recall@k for a range of candidate pool sizes.
+# Create the Hamming index first: python scripts/ann_index.py create hnsw binary
+# Env: BENCH_QUERIES (100), BENCH_TOP_K (10), BENCH_CANDIDATES (100,200,400,800),
+#      EMBEDDING_DIMS (1536), BENCH_DOC_ID (optional)
+
+n_queries = int(os.environ.get("BENCH_QUERIES", "100"))
+top_k = int(os.environ.get("BENCH_TOP_K", "10"))
+pools = [int(v) for v in os.environ.get("BENCH_CANDIDATES", "100,200,400,800").split(",")]
+doc_id = os.environ.get("BENCH_DOC_ID") or None
+
+store = PGVectorStore(os.environ["PG_DSN"], embedding_dims=int(os.environ.get("EMBEDDING_DIMS", "1536")))
+
+with store.engine.connect() as conn:
+    rows = conn.execute(
+        text("SELECT embedding FROM embeddings ORDER BY random() LIMIT :n"), {"n": n_queries}
+    ).scalars().all()
+queries = [_vector_to_list(r) for r in rows]
+for i in store.ann_indexes():
+    print(f"✅ index {i.name} [{i.method}] {i.size_bytes / 1024 / 1024:.1f} MiB")
+
+
+def run(**kw):
+    hits = []
+    t0 = time.perf_counter()
+    for q in queries:
+        hits.append({c.chunk_id for c, _ in store.semantic_search(q, top_k=top_k, doc_id_filter=doc_id, **kw)})
+    return hits, len(queries) / (time.perf_counter() - t0)
+
+
+def recall(hits, truth):
+    return sum(len(h & t) / max(1, len(t)) for h, t in zip(hits, truth)) / len(queries)
+
+
+truth, qps = run(mode="full", exact=True)
+print(f"✅ exact <=>: {qps:.1f} QPS")
+hits, qps = run(mode="full")
+print(f"✅ full (default plan): recall@{top_k} {recall(hits, truth):.3f}, {qps:.1f} QPS")
+for pool in pools:
+    store.binary_candidates = pool
+    hits, qps = run(mode="binary")
+    print(f"✅ binary, {pool} candidates: recall@{top_k} {recall(hits, truth):.3f}, {qps:.1f} QPS")
@@ -0,0 +1,81 @@
+import os
+import sys
+import time
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from dotenv import load_dotenv
+from sqlalchemy import text
+
+from app.indexing.pgvector_store import PGVectorStore, _vector_to_list
+
+load_dotenv()
+
+# Reduced (halfvec / truncated) search + full-vector rescoring vs full-precision search:
+# storage, recall@k against exact full search, and latency.
+# Needs EMBEDDING_REDUCED_DIMS and a backfilled embedding_reduced column
+# (python scripts/ann_index.py backfill-reduced).
+# Env: BENCH_QUERIES (100), BENCH_TOP_K (10), RESCORE_FACTOR (4), BENCH_DOC_ID (optional),
+#      BENCH_MIN_RECALL (0.95; exit code 1 below it)
+
+reduced_dims = os.environ.get("EMBEDDING_REDUCED_DIMS")
+if not reduced_dims:
+    print("Set EMBEDDING_REDUCED_DIMS first")
+    raise SystemExit(1)
+
+n_queries = int(os.environ.get("BENCH_QUERIES", "100"))
+top_k = int(os.environ.get("BENCH_TOP_K", "10"))
+doc_id = os.environ.get("BENCH_DOC_ID") or None
+min_recall = float(os.environ.get("BENCH_MIN_RECALL", "0.95"))
+
+store = PGVectorStore(
+    os.environ["PG_DSN"],
+    reduced_dims=int(reduced_dims),
+    rescore_factor=int(os.environ.get("RESCORE_FACTOR", "4")),
+)
+
+with store.engine.connect() as conn:
+    sizes = conn.execute(text("""
+    SELECT COUNT(*) AS n,
+           AVG(pg_column_size(embedding)) AS full_bytes,
+           AVG(pg_column_size(embedding_reduced)) AS reduced_bytes,
+           COUNT(embedding_reduced) AS n_reduced
+    FROM embeddings;
+    """)).mappings().one()
+    rows = conn.execute(
+        text("SELECT embedding FROM embeddings ORDER BY random() LIMIT :n"), {"n": n_queries}
+    ).scalars().all()
+queries = [_vector_to_list(r) for r in rows]
+
+print(f"✅ {sizes['n']} embeddings, {sizes['n_reduced']} with a reduced copy ({reduced_dims} dims)")
+print(f"✅ bytes/vector: full {float(sizes['full_bytes'] or 0):.0f}, reduced {float(sizes['reduced_bytes'] or 0):.0f}")
+for i in store.ann_indexes():
+    print(f"✅ index {i.name} [{i.method}] {i.size_bytes / 1024 / 1024:.1f} MiB")
+
+
+def run(**kw):
+    hits, times = [], []
+    for q in queries:
+        t0 = time.perf_counter()
+        res = store.semantic_search(q, top_k=top_k, doc_id_filter=doc_id, **kw)
+        times.append((time.perf_counter() - t0) * 1000.0)
+        hits.append([c.chunk_id for c, _ in res])
+    times.sort()
+    return hits, times
+
+
+def report(label, hits, times, truth):
+    recall = sum(len(set(h) & set(t)) / max(1, len(t)) for h, t in zip(hits, truth)) / len(queries)
+    p50, p95 = times[len(times) // 2], times[min(len(times) - 1, int(len(times) * 0.95))]
+    print(f"✅ {label}: recall@{top_k} {recall:.3f}, p50 {p50:.2f} ms, p95 {p95:.2f} ms")
+    return recall
+
+
+truth, exact_times = run(mode="full", exact=True)
+report("full exact", truth, exact_times, truth)
+report("full", *run(mode="full"), truth)
+recall = report("reduced + rescore", *run(mode="reduced"), truth)
+
+if recall < min_recall:
+    print(f"❌ reduced recall {recall:.3f} below BENCH_MIN_RECALL={min_recall}")
+    raise SystemExit(1)
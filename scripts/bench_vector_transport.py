@@ -0,0 +1,61 @@
+import os
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+# Add the workspace root to Python path so app module can be imported
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from dotenv import load_dotenv
+from pgvector import Vector
+
+from app.indexing.pgvector_store import PGVectorStore, _from_pgvector_literal, _to_pgvector_literal, _vector_param
+
+load_dotenv()
+
+# Text literal vs pgvector binary format for query vectors.
+# Client-side encode/decode cost always; with PG_DSN set, also end-to-end semantic_search latency.
+DIM = int(os.environ.get("BENCH_DIM", "1536"))
+N = int(os.environ.get("BENCH_QUERIES", "200"))
+TOP_K = int(os.environ.get("BENCH_TOP_K", "20"))
+
+rnd = random.Random(0)
+vectors = [[rnd.uniform(-1.0, 1.0) for _ in range(DIM)] for _ in range(N)]
+
+
+def per_call_us(fn, items) -> float:
+    t0 = time.perf_counter()
+    for x in items:
+        fn(x)
+    return (time.perf_counter() - t0) / len(items) * 1e6
+
+
+literals = [_to_pgvector_literal(v) for v in vectors]
+binaries = [Vector(_vector_param(v, True)).to_binary() for v in vectors]
+
+print(f"✅ dim={DIM}, {N} vectors")
+print(f"✅ payload/vector: text {len(literals[0].encode())} B, binary {len(binaries[0])} B")
+print(f"✅ encode: text {per_call_us(_to_pgvector_literal, vectors):.0f} us, "
+      f"binary {per_call_us(lambda v: Vector(_vector_param(v, True)).to_binary(), vectors):.0f} us")
+print(f"✅ decode: text {per_call_us(_from_pgvector_literal, literals):.0f} us, "
+      f"binary {per_call_us(lambda b: Vector.from_binary(b).to_list(), binaries):.0f} us")
+
+dsn = os.environ.get("PG_DSN")
+if not dsn:
+    print("✅ PG_DSN not set; skipping semantic_search timings")
+    sys.exit(0)
+
+for label, binary in (("text", False), ("binary", True)):
+    store = PGVectorStore(dsn, binary_vectors=binary)
+    store.semantic_search(vectors[0], top_k=TOP_K)  # warm the pool and type registration
+    times = []
+    for v in vectors:
+        t0 = time.perf_counter()
+        store.semantic_search(v, top_k=TOP_K)
+        times.append((time.perf_counter() - t0) * 1000.0)
+    times.sort()
+    print(f"✅ semantic_search[{label}]: mean {statistics.mean(times):.2f} ms, "
+          f"p50 {times[len(times) // 2]:.2f} ms, p95 {times[int(len(times) * 0.95)]:.2f} ms")
+    store.engine.dispose()
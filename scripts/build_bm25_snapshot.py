@@ -0,0 +1,32 @@
+import os
+import sys
+import time
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from dotenv import load_dotenv
+
+from app.indexing.pgvector_store import PGVectorStore
+from app.indexing.bm25_cache import BM25IndexCache
+
+load_dotenv()
+
+# Pre-builds BM25 snapshots so API workers open them via mmap instead of scanning `chunks`.
+# Usage: python scripts/build_bm25_snapshot.py [doc_id ...]   (no args = whole corpus)
+
+snapshot_dir = os.environ.get("BM25_SNAPSHOT_DIR")
+if not snapshot_dir:
+    print("Set BM25_SNAPSHOT_DIR first")
+    raise SystemExit(1)
+
+store = PGVectorStore(os.environ["PG_DSN"])
+cache = BM25IndexCache(store, snapshot_dir=snapshot_dir)
+
+scopes = sys.argv[1:] or [None]
+for scope in scopes:
+    t0 = time.perf_counter()
+    index = cache.get(scope)
+    n_docs = index.engine.n_docs if index.engine is not None else 0
+    print(f"✅ {scope or 'all'}: {n_docs} chunks in {time.perf_counter() - t0:.2f}s")
+
+print("✅ Snapshots in:", snapshot_dir)
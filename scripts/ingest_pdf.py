@@ -20,7 +20,9 @@ if len(sys.argv) < 2:
 
 path = sys.argv[1]
 
-store = PGVectorStore(os.environ["PG_DSN"])
+# Keep the reduced embedding copy (SEMANTIC_SEARCH_MODE=reduced) in sync with new chunks
+reduced_dims = os.environ.get("EMBEDDING_REDUCED_DIMS")
+store = PGVectorStore(os.environ["PG_DSN"], reduced_dims=int(reduced_dims) if reduced_dims else None)
 client = OpenAI(api_key=os.environ["OPENAI_API_KEY"])
 
 chunker = TokenChunker(
@@ -34,8 +36,14 @@ ingestor = PDFIngestor(
     openai_client=client,
     embedding_model=os.environ.get("EMBEDDING_MODEL", "text-embedding-3-small"),
     chunker=chunker,
+    upsert_mode=os.environ.get("UPSERT_MODE", "bulk"),
 )
 
 doc_id = ingestor.ingest_pdf(path)
 print("✅ Ingested:", path)
 print("✅ doc_id:", doc_id)
+st = ingestor.last_embedding_stats
+print(f"✅ Embeddings: {st.cached} cached, {st.embedded} embedded ({st.api_calls} API calls) for {st.texts} chunks")
+up = ingestor.last_upsert_report
+if up is not None:
+    print(f"✅ Upsert ({up.mode}): {up.rows} rows in {up.seconds:.2f}s ({up.rows_per_s:.0f} rows/s)")
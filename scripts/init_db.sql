@@ -18,12 +18,61 @@ CREATE TABLE IF NOT EXISTS chunks (
 -- OpenAI text-embedding-3-large = 3072 dims
 CREATE TABLE IF NOT EXISTS embeddings (
   chunk_id TEXT PRIMARY KEY REFERENCES chunks(chunk_id) ON DELETE CASCADE,
-  embedding vector(1536) NOT NULL
+  doc_id TEXT,
+  embedding vector(1536) NOT NULL,
+  embedding_reduced halfvec
 );
 
 CREATE INDEX IF NOT EXISTS idx_chunks_doc_id ON chunks(doc_id);
 
--- Vector index: best once you have enough rows (hundreds+)
+-- doc_id copied from chunks so doc-scoped vector searches filter inside the
+-- index scan (no join first); backfilled for rows written before the column existed.
+ALTER TABLE embeddings ADD COLUMN IF NOT EXISTS doc_id TEXT;
+UPDATE embeddings e SET doc_id = c.doc_id
+  FROM chunks c
+  WHERE c.chunk_id = e.chunk_id AND e.doc_id IS DISTINCT FROM c.doc_id;
+CREATE INDEX IF NOT EXISTS idx_embeddings_doc_id ON embeddings(doc_id);
+
+-- Optional reduced copy (EMBEDDING_REDUCED_DIMS): first N dims, renormalized, halfvec.
+-- Untyped so N can change; ANN indexes cast it (scripts/ann_index.py create hnsw reduced).
+ALTER TABLE embeddings ADD COLUMN IF NOT EXISTS embedding_reduced halfvec;
+
+-- Keyword search inside Postgres (KEYWORD_BACKEND=postgres). 'simple' = lowercase,
+-- no stemming/stopwords, close to the in-process BM25 tokenizer.
+ALTER TABLE chunks ADD COLUMN IF NOT EXISTS tsv tsvector
+  GENERATED ALWAYS AS (to_tsvector('simple', text)) STORED;
+CREATE INDEX IF NOT EXISTS idx_chunks_tsv ON chunks USING GIN (tsv);
+
+-- Content-addressed embedding cache for ingestion: (model, sha256 of chunk text).
+-- Untyped vector so models with different dimensions can share the table.
+CREATE TABLE IF NOT EXISTS embedding_cache (
+  model TEXT NOT NULL,
+  text_sha256 TEXT NOT NULL,
+  embedding vector NOT NULL,
+  created_at TIMESTAMPTZ DEFAULT now(),
+  PRIMARY KEY (model, text_sha256)
+);
+
+-- Corpus change log: MAX(seq) (global or per doc_id) is the corpus version
+-- that in-process caches (e.g. BM25 indexes) are keyed on. Rows carry the
+-- changed chunk_id so caches can apply small changes incrementally; a NULL
+-- chunk_id means "rebuild".
+CREATE TABLE IF NOT EXISTS corpus_changes (
+  seq BIGSERIAL PRIMARY KEY,
+  doc_id TEXT NOT NULL,
+  chunk_id TEXT,
+  op TEXT NOT NULL DEFAULT 'upsert',
+  changed_at TIMESTAMPTZ DEFAULT now()
+);
+
+ALTER TABLE corpus_changes ADD COLUMN IF NOT EXISTS chunk_id TEXT;
+ALTER TABLE corpus_changes ADD COLUMN IF NOT EXISTS op TEXT NOT NULL DEFAULT 'upsert';
+
+CREATE INDEX IF NOT EXISTS idx_corpus_changes_doc_seq ON corpus_changes(doc_id, seq);
+
+-- Vector index: best once you have enough rows (hundreds+). IVFFlat centroids are
+-- fixed at build time; rebuild after loading data, or switch to HNSW:
+--   python scripts/ann_index.py rebuild ivfflat | create hnsw
 CREATE INDEX IF NOT EXISTS idx_embeddings_ivfflat
   ON embeddings USING ivfflat (embedding vector_cosine_ops)
   WITH (lists = 100);
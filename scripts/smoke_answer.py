@@ -16,7 +16,9 @@ from app.retrieval.fusion import RRFWeights
 from app.rerank.cohere_reranker import CohereReranker
 from app.retrieval.rerank_pipeline import rerank_fused
 from app.generation.openai_client import OpenAILLM
+from app.generation.completion_cache import CompletionCache
 from app.generation.answerer import Answerer
+from app.retrieval.caching_embedder import CachingEmbedder
 
 load_dotenv()
 
@@ -24,10 +26,15 @@ load_dotenv()
 client = OpenAI(api_key=os.environ["OPENAI_API_KEY"])
 store = PGVectorStore(os.environ["PG_DSN"])
 
-def embed(text: str) -> list[float]:
-    r = client.embeddings.create(model=os.environ.get("EMBEDDING_MODEL","text-embedding-3-small"), input=text)
+EMBEDDING_MODEL = os.environ.get("EMBEDDING_MODEL", "text-embedding-3-small")
+
+def embed_uncached(text: str) -> list[float]:
+    r = client.embeddings.create(model=EMBEDDING_MODEL, input=text)
     return r.data[0].embedding
 
+# Re-runs reuse embeddings from EMBED_CACHE_PATH (SQLite) when set
+embed = CachingEmbedder(embed_uncached, model=EMBEDDING_MODEL, disk_path=os.environ.get("EMBED_CACHE_PATH"))
+
 # Retrieve
 semantic = PGVectorSemanticRetriever(store, embed_fn=embed)
 DOC_ID = "doc_d95f9a5dd762"
@@ -51,7 +58,11 @@ reranker = CohereReranker(
 context_chunks = rerank_fused(query, fused, reranker, rerank_top_n=20, final_top_k=settings.final_top_k)
 
 # Generate
-llm = OpenAILLM(api_key=os.environ["OPENAI_API_KEY"], model=os.environ.get("LLM_MODEL","gpt-4o-mini"))
+llm = OpenAILLM(
+    api_key=os.environ["OPENAI_API_KEY"],
+    model=os.environ.get("LLM_MODEL","gpt-4o-mini"),
+    cache=CompletionCache(disk_path=os.environ.get("LLM_CACHE_PATH")),
+)
 answerer = Answerer(llm)
 
 ans = answerer.answer(query, context_chunks)
@@ -15,16 +15,22 @@ from app.retrieval.hybrid import HybridRetriever
 from app.retrieval.fusion import RRFWeights
 from app.rerank.cohere_reranker import CohereReranker
 from app.retrieval.rerank_pipeline import rerank_fused
+from app.retrieval.caching_embedder import CachingEmbedder
 
 load_dotenv()
 
 client = OpenAI(api_key=os.environ["OPENAI_API_KEY"])
 store = PGVectorStore(os.environ["PG_DSN"])
 
-def embed(text: str) -> list[float]:
-    r = client.embeddings.create(model=os.environ.get("EMBEDDING_MODEL","text-embedding-3-small"), input=text)
+EMBEDDING_MODEL = os.environ.get("EMBEDDING_MODEL", "text-embedding-3-small")
+
+def embed_uncached(text: str) -> list[float]:
+    r = client.embeddings.create(model=EMBEDDING_MODEL, input=text)
     return r.data[0].embedding
 
+# Re-runs reuse embeddings from EMBED_CACHE_PATH (SQLite) when set
+embed = CachingEmbedder(embed_uncached, model=EMBEDDING_MODEL, disk_path=os.environ.get("EMBED_CACHE_PATH"))
+
 semantic = PGVectorSemanticRetriever(store, embed_fn=embed)
 bm25 = BM25Retriever(BM25Index.build_from_pg(store, doc_id_filter="doc_d95f9a5dd762"))
 
@@ -10,16 +10,24 @@ from openai import OpenAI
 
 from app.indexing.pgvector_store import PGVectorStore
 from app.core.types import Chunk
+from app.retrieval.caching_embedder import CachingEmbedder
 
 load_dotenv()
 
 client = OpenAI(api_key=os.environ["OPENAI_API_KEY"])
-store = PGVectorStore(os.environ["PG_DSN"])
+# Keep the reduced embedding copy (SEMANTIC_SEARCH_MODE=reduced) in sync with new chunks
+reduced_dims = os.environ.get("EMBEDDING_REDUCED_DIMS")
+store = PGVectorStore(os.environ["PG_DSN"], reduced_dims=int(reduced_dims) if reduced_dims else None)
 
-def embed(text: str) -> list[float]:
-    r = client.embeddings.create(model=os.environ.get("EMBEDDING_MODEL","text-embedding-3-small"), input=text)
+EMBEDDING_MODEL = os.environ.get("EMBEDDING_MODEL", "text-embedding-3-small")
+
+def embed_uncached(text: str) -> list[float]:
+    r = client.embeddings.create(model=EMBEDDING_MODEL, input=text)
     return r.data[0].embedding
 
+# Re-runs reuse embeddings from EMBED_CACHE_PATH (SQLite) when set
+embed = CachingEmbedder(embed_uncached, model=EMBEDDING_MODEL, disk_path=os.environ.get("EMBED_CACHE_PATH"))
+
 # 1) insert a sample doc+chunks
 doc_id = "doc_test_1"
 store.upsert_document(doc_id, title="Test Doc", source="smoke")
@@ -0,0 +1,89 @@
+import asyncio
+
+import numpy as np
+
+from app.generation.answer_cache import SemanticAnswerCache
+
+
+class _FakeAsyncStore:
+    def __init__(self):
+        self.versions = {None: 1, "d1": 1, "d2": 1}
+
+    async def corpus_version(self, doc_id_filter=None):
+        return self.versions[doc_id_filter]
+
+
+def _vec(*xs):
+    return list(np.asarray(xs, dtype=np.float32))
+
+
+def test_near_duplicate_hits_within_scope_only():
+    cache = SemanticAnswerCache(_FakeAsyncStore(), threshold=0.95, version_check_interval=0.0)
+
+    async def run():
+        value, _, version = await cache.get("q", _vec(1, 0, 0), "d1")
+        assert value is None
+        cache.put("q", _vec(1, 0, 0), "d1", version, "answer-1")
+
+        near, sim, _ = await cache.get("q", _vec(1, 0.1, 0), "d1")
+        other_scope, _, _ = await cache.get("q", _vec(1, 0, 0), "d2")
+        unrelated, _, _ = await cache.get("q", _vec(0, 1, 0), "d1")
+        return near, sim, other_scope, unrelated
+
+    near, sim, other_scope, unrelated = asyncio.run(run())
+    assert near == "answer-1" and sim > 0.95
+    assert other_scope is None
+    assert unrelated is None
+    assert cache.stats()["hits"] == 1
+
+
+def test_reingest_invalidates_scope_and_stale_puts_are_dropped():
+    store = _FakeAsyncStore()
+    cache = SemanticAnswerCache(store, threshold=0.95, version_check_interval=0.0)
+
+    async def run():
+        _, _, v1 = await cache.get("q", _vec(1, 0), "d1")
+        cache.put("q", _vec(1, 0), "d1", v1, "old")
+        _, _, g1 = await cache.get("q", _vec(1, 0), None)
+        cache.put("q", _vec(1, 0), None, g1, "old-all")
+
+        store.versions["d1"] = store.versions[None] = 2  # d1 re-ingested
+        after_d1, _, v2 = await cache.get("q", _vec(1, 0), "d1")
+        after_all, _, _ = await cache.get("q", _vec(1, 0), None)
+
+        cache.put("q", _vec(1, 0), "d1", v1, "computed before the re-ingest")
+        stale, _, _ = await cache.get("q", _vec(1, 0), "d1")
+        cache.put("q", _vec(1, 0), "d1", v2, "new")
+        fresh, _, _ = await cache.get("q", _vec(1, 0), "d1")
+        return after_d1, after_all, stale, fresh
+
+    after_d1, after_all, stale, fresh = asyncio.run(run())
+    assert after_d1 is None and after_all is None
+    assert stale is None
+    assert fresh == "new"
+    assert cache.stats()["invalidations"] == 2
+
+
+def test_lru_bound_across_scopes():
+    cache = SemanticAnswerCache(_FakeAsyncStore(), threshold=0.95, max_entries=2, version_check_interval=0.0)
+
+    async def run():
+        for i, scope in enumerate(["d1", "d2", "d1"]):
+            cache.put("q", _vec(*np.eye(3)[i]), scope, 1, f"a{i}")
+        return [(await cache.get("q", _vec(*np.eye(3)[i]), scope))[0] for i, scope in enumerate(["d1", "d2", "d1"])]
+
+    assert asyncio.run(run()) == [None, "a1", "a2"]
+    assert cache.stats()["evictions"] == 1
+
+
+def test_exact_terms_must_match_for_a_hit():
+    cache = SemanticAnswerCache(_FakeAsyncStore(), threshold=0.95, version_check_interval=0.0)
+
+    async def run():
+        cache.put("What does Article 12 say?", _vec(1, 0), "d1", 1, "art-12")
+        other_article, _, _ = await cache.get("What does Article 21 say?", _vec(1, 0.01), "d1")
+        reworded, _, _ = await cache.get("what does Article 12 say", _vec(1, 0.01), "d1")
+        return other_article, reworded
+
+    assert asyncio.run(run()) == (None, "art-12")
+    assert cache.stats()["term_mismatches"] == 1
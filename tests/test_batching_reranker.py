@@ -0,0 +1,63 @@
+import asyncio
+
+from app.core.types import Chunk
+from app.rerank.batching_reranker import BatchingReranker
+from app.rerank.base import RerankResult
+
+
+class _Reranker:
+    model = "fake-rerank"
+
+    def __init__(self):
+        self.calls = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def rerank(self, query, chunks, top_k=5):
+        self.calls.append((query, [c.chunk_id for c in chunks]))
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(0.01)
+        self.in_flight -= 1
+        scored = [
+            RerankResult(chunk=c, score=float(c.text.count(query)), original_rank=i + 1)
+            for i, c in enumerate(chunks)
+        ]
+        return sorted(scored, key=lambda r: (-r.score, r.original_rank))[:top_k]
+
+
+def _chunks(*ids):
+    return [Chunk(chunk_id=cid, doc_id="d1", text=f"{cid} " + "law " * (ord(cid[0]) - 96)) for cid in ids]
+
+
+def test_same_query_jobs_share_a_call_and_get_their_own_results():
+    async def run():
+        inner = _Reranker()
+        batcher = BatchingReranker(inner, window_ms=5, max_docs_per_call=4, max_concurrency=1)
+        jobs = [
+            batcher.rerank("law", _chunks("a", "b", "c"), top_k=2),
+            batcher.rerank("law", _chunks("c", "d"), top_k=1),
+            batcher.rerank("law", _chunks("e"), top_k=1),  # would exceed 4 docs: next batch
+            batcher.rerank("other", _chunks("a"), top_k=1),
+        ]
+        return inner, batcher, await asyncio.gather(*jobs)
+
+    inner, batcher, (r1, r2, r3, r4) = asyncio.run(run())
+    assert [(r.chunk.chunk_id, r.original_rank) for r in r1] == [("c", 3), ("b", 2)]
+    assert [(r.chunk.chunk_id, r.original_rank) for r in r2] == [("d", 2)]
+    assert [r.chunk.chunk_id for r in r3] == ["e"] and [r.chunk.chunk_id for r in r4] == ["a"]
+
+    assert sorted(inner.calls) == [("law", ["a", "b", "c", "d"]), ("law", ["e"]), ("other", ["a"])]
+    assert inner.max_in_flight == 1
+    assert batcher.stats()["coalesced_jobs"] == 1 and batcher.stats()["calls"] == 3
+
+
+def test_idle_batcher_dispatches_without_waiting_for_the_window():
+    async def run():
+        batcher = BatchingReranker(_Reranker(), window_ms=5000)
+        loop = asyncio.get_running_loop()
+        t0 = loop.time()
+        await batcher.rerank("law", _chunks("a", "b"), top_k=1)
+        return loop.time() - t0
+
+    assert asyncio.run(run()) < 1.0
@@ -0,0 +1,95 @@
+from app.core.types import Chunk
+from app.indexing.bm25_cache import BM25IndexCache
+from app.indexing.bm25_index import BM25Index
+
+
+class _Store:
+    # Chunks plus a corpus_changes-like log: (seq, doc_id, chunk_id, op).
+    def __init__(self, chunks):
+        self.by_id = {c.chunk_id: c for c in chunks}
+        self.log = []
+        self.builds = []
+
+    def write(self, chunk):
+        self.by_id[chunk.chunk_id] = chunk
+        self.log.append((len(self.log) + 1, chunk.doc_id, chunk.chunk_id, "upsert"))
+
+    def delete(self, chunk_id):
+        doc_id = self.by_id.pop(chunk_id).doc_id
+        self.log.append((len(self.log) + 1, doc_id, chunk_id, "delete"))
+
+    def touch_doc(self, doc_id):
+        self.log.append((len(self.log) + 1, doc_id, None, "upsert"))
+
+    def corpus_version(self, doc_id_filter=None):
+        return max((s for s, d, _, _ in self.log if doc_id_filter in (None, d)), default=0)
+
+    def changes_since(self, after_seq, upto_seq, doc_id_filter=None, limit=None):
+        rows = [
+            {"seq": s, "doc_id": d, "chunk_id": cid, "op": op}
+            for s, d, cid, op in self.log
+            if after_seq < s <= upto_seq and doc_id_filter in (None, d)
+        ]
+        return rows[:limit]
+
+    def get_chunks_by_ids(self, chunk_ids):
+        return {cid: self.by_id[cid] for cid in chunk_ids if cid in self.by_id}
+
+
+def _cache(monkeypatch, store, **kwargs):
+    def build(cls, s, doc_id_filter=None, keep_text=True):
+        s.builds.append(doc_id_filter)
+        return cls.from_chunks([c for c in s.by_id.values() if doc_id_filter in (None, c.doc_id)])
+
+    monkeypatch.setattr(BM25Index, "build_from_pg", classmethod(build))
+    return BM25IndexCache(store, version_check_interval=0.0, **kwargs)
+
+
+def _store():
+    return _Store([
+        Chunk(chunk_id="a1", doc_id="a", text="governing law england"),
+        Chunk(chunk_id="a2", doc_id="a", text="payment terms"),
+        Chunk(chunk_id="b1", doc_id="b", text="notices in writing"),
+    ])
+
+
+def _top(index, query):
+    return [c.chunk_id for c, _ in index.search(query, top_k=3)]
+
+
+def test_unchanged_version_is_a_hit_and_scopes_are_separate(monkeypatch):
+    store = _store()
+    cache = _cache(monkeypatch, store)
+    assert cache.get("a") is cache.get("a")
+    cache.get()
+    store.write(Chunk(chunk_id="b2", doc_id="b", text="zebra"))
+    cache.get("a")  # another doc changed: scope "a" stays current
+    assert store.builds == ["a", None]
+    assert cache.stats()["hits"] == 2 and cache.stats()["refreshes"] == 0
+
+
+def test_small_change_sets_refresh_in_place(monkeypatch):
+    store = _store()
+    cache = _cache(monkeypatch, store)
+    index = cache.get()
+    store.write(Chunk(chunk_id="a3", doc_id="a", text="zebra crossing"))
+    store.delete("a2")
+    assert cache.get() is index
+    assert _top(index, "zebra")[0] == "a3" and "a2" not in _top(index, "payment")
+    assert store.builds == [None] and cache.stats()["refreshes"] == 1
+
+
+def test_doc_level_or_large_change_sets_rebuild(monkeypatch):
+    store = _store()
+    cache = _cache(monkeypatch, store, max_incremental_changes=2)
+    first = cache.get()
+
+    store.touch_doc("a")  # NULL chunk_id: no incremental path
+    second = cache.get()
+    assert second is not first
+
+    for i in range(3):  # more than max_incremental_changes
+        store.write(Chunk(chunk_id=f"n{i}", doc_id="b", text=f"zebra {i}"))
+    third = cache.get()
+    assert third is not second and _top(third, "2")[0] == "n2"
+    assert store.builds == [None, None, None] and cache.stats()["refreshes"] == 0
@@ -0,0 +1,226 @@
+import random
+from contextlib import nullcontext
+from types import SimpleNamespace
+
+import pytest
+from rank_bm25 import BM25Okapi
+
+from app.core.types import Chunk
+from app.indexing.bm25_cache import BM25IndexCache
+from app.indexing.bm25_engine import BM25Engine
+from app.indexing.bm25_index import BM25Index, simple_tokenize
+from app.indexing.bm25_snapshot import BM25Snapshot, snapshot_path
+
+VOCAB = [f"w{i}" for i in range(60)]
+
+
+def _corpus(n_docs: int, seed: int = 7):
+    rnd = random.Random(seed)
+    # Skewed term distribution so some terms land in more than half the docs (negative idf).
+    weights = [1.0 / (i + 1) for i in range(len(VOCAB))]
+    return [rnd.choices(VOCAB, weights=weights, k=rnd.randint(0, 40)) for _ in range(n_docs)]
+
+
+def _reference_top_k(bm25: BM25Okapi, q_tokens, top_k):
+    scores = bm25.get_scores(q_tokens)
+    ranked = sorted(range(len(scores)), key=lambda i: scores[i], reverse=True)[:top_k]
+    return [(i, float(scores[i])) for i in ranked]
+
+
+def _queries(seed: int = 11):
+    rnd = random.Random(seed)
+    qs = [[], ["missing"], ["w0"], ["w0", "w0", "w1"], ["w59", "missing"]]
+    qs += [rnd.sample(VOCAB, k=rnd.randint(1, 6)) for _ in range(40)]
+    return qs
+
+
+@pytest.mark.parametrize("n_docs", [1, 3, 50, 400])
+@pytest.mark.parametrize("top_k", [1, 5, 30])
+def test_search_matches_bm25okapi(n_docs, top_k):
+    tokenized = _corpus(n_docs)
+    tokenized[0] = tokenized[0] or ["w0"]  # BM25Okapi divides by avgdl
+    ref = BM25Okapi(tokenized)
+    engine = BM25Engine.from_tokenized(tokenized)
+
+    for q in _queries():
+        # Same summation order as BM25Okapi, so scores are bit-identical.
+        assert engine.search(q, top_k) == _reference_top_k(ref, q, top_k), q
+
+
+@pytest.mark.parametrize("n_docs", [1, 50, 400])
+@pytest.mark.parametrize("top_k", [1, 5, 30])
+def test_search_batch_matches_search(n_docs, top_k):
+    tokenized = _corpus(n_docs)
+    engine = BM25Engine.from_tokenized(tokenized)
+    queries = _queries()
+
+    # Tiny blocks exercise the multi-block path as well.
+    batch = engine.search_batch(queries, top_k, max_block_cells=7 * n_docs)
+    assert len(batch) == len(queries)
+    for q, got in zip(queries, batch):
+        want = engine.search(q, top_k)
+        assert [d for d, _ in got] == [d for d, _ in want], q
+        assert [s for _, s in got] == pytest.approx([s for _, s in want]), q
+
+
+def test_index_search_returns_chunks():
+    chunks = [
+        Chunk(chunk_id="c1", doc_id="d1", text="The contract shall be governed by the laws of England."),
+        Chunk(chunk_id="c2", doc_id="d1", text="Termination requires thirty days written notice."),
+        Chunk(chunk_id="c3", doc_id="d1", text="Notice must be given in writing to the other party."),
+    ]
+    index = BM25Index.from_chunks(chunks)
+    hits = index.search("termination notice", top_k=2)
+
+    ref = BM25Okapi([simple_tokenize(c.text) for c in chunks])
+    want = _reference_top_k(ref, ["termination", "notice"], 2)
+    assert [c.chunk_id for c, _ in hits] == [chunks[i].chunk_id for i, _ in want]
+    assert hits[0][0].chunk_id == "c2"
+
+
+def test_empty_index():
+    index = BM25Index.from_chunks([])
+    assert index.search("anything", top_k=5) == []
+
+
+class _FakeStore:
+    def __init__(self, chunks):
+        self.by_id = {c.chunk_id: c for c in chunks}
+        self.fetches = 0
+
+    def get_chunks_by_ids(self, chunk_ids):
+        self.fetches += 1
+        return {cid: self.by_id[cid] for cid in chunk_ids if cid in self.by_id}
+
+
+def test_snapshot_roundtrip(tmp_path):
+    tokenized = _corpus(300)
+    chunks = [Chunk(chunk_id=f"c{i}", doc_id="d1", text=" ".join(toks)) for i, toks in enumerate(tokenized)]
+    index = BM25Index.from_chunks(chunks)
+
+    path = snapshot_path(str(tmp_path), "d1", 3)
+    index.save_snapshot(str(path), meta={"corpus_version": 3})
+    snap = BM25Snapshot(str(path))
+    assert snap.meta == {"corpus_version": 3}
+    assert snap.n_docs == 300
+    assert list(snap.chunk_ids[:3]) == ["c0", "c1", "c2"]
+
+    queries = _queries()
+    for q, batch_hits in zip(queries, snap.search_batch(queries, 10)):
+        want = index.engine.search(q, 10)
+        for got in (snap.search(q, 10), batch_hits):
+            assert [d for d, _ in got] == [d for d, _ in want], q
+            assert [s for _, s in got] == pytest.approx([s for _, s in want]), q
+
+    store = _FakeStore(chunks)
+    lazy = BM25Index.open_snapshot(str(path), store)
+    got = lazy.search("w3 w7", top_k=5)
+    assert [(c.chunk_id, s) for c, s in got] == [(c.chunk_id, s) for c, s in index.search("w3 w7", top_k=5)]
+    assert store.fetches == 1
+
+
+def _assert_same_hits(index, ref, top_k=10):
+    for q in _queries():
+        query = " ".join(q)
+        got, want = index.search(query, top_k), ref.search(query, top_k)
+        assert [c.chunk_id for c, _ in got] == [c.chunk_id for c, _ in want], q
+        assert [s for _, s in got] == pytest.approx([s for _, s in want]), q
+
+
+@pytest.mark.parametrize("lazy", [False, True])
+def test_incremental_updates_match_rebuild(tmp_path, lazy):
+    tokenized = _corpus(300)
+    chunks = [Chunk(chunk_id=f"c{i}", doc_id="d1", text=" ".join(toks)) for i, toks in enumerate(tokenized)]
+    index = BM25Index.from_chunks(chunks[:200])
+    if lazy:
+        path = str(tmp_path / "base.snap")
+        index.save_snapshot(path)
+        index = BM25Index.open_snapshot(path, _FakeStore(chunks))
+    index.background_merge = False
+
+    index.add_chunks(chunks[200:260])
+    index.add_chunks(chunks[260:])
+    index.remove_chunks(["c3", "c210", "missing"])
+    edited = Chunk(chunk_id="c5", doc_id="d1", text="w1 w2 w2 w50")
+    if lazy:
+        index.store.by_id["c5"] = edited
+    index.add_chunks([edited])
+
+    live = [c for c in chunks if c.chunk_id not in {"c3", "c5", "c210"}] + [edited]
+    ref = BM25Index.from_chunks(live)
+    _assert_same_hits(index, ref)
+    assert [c.chunk_id for c, _ in index.search_batch(["w3 w7"], 10)[0]] == [
+        c.chunk_id for c, _ in ref.search("w3 w7", 10)
+    ]
+
+    assert index.compact()
+    assert isinstance(index.engine, BM25Engine)
+    _assert_same_hits(index, ref)
+
+
+
+class _EmptyCorpusStore(_FakeStore):
+    # build_from_pg reads through store.engine; the chunks table is empty.
+    def __init__(self, chunks):
+        super().__init__(chunks)
+        rows = SimpleNamespace(mappings=lambda: SimpleNamespace(all=lambda: []))
+        conn = SimpleNamespace(execute=lambda sql, params: rows)
+        self.engine = SimpleNamespace(connect=lambda: nullcontext(conn))
+
+
+def test_text_less_index_stays_text_less_when_first_chunks_arrive():
+    chunks = [Chunk(chunk_id=f"c{i}", doc_id="d1", text=f"w{i} w{i + 1}") for i in range(5)]
+    store = _EmptyCorpusStore(chunks)
+    index = BM25Index.build_from_pg(store, keep_text=False)
+    assert index.engine is None and not index.keep_text and index.store is store
+
+    index.add_chunks(chunks)
+    assert index.chunks == [] and list(index.chunk_ids) == [c.chunk_id for c in chunks]
+    assert [c.chunk_id for c, _ in index.search("w2", top_k=2)] == ["c1", "c2"] and store.fetches == 1
+    assert [r.chunk_id for r, _ in index.search("w2", top_k=2, with_text=False)] == ["c1", "c2"]
+
+class _ChangeLogStore(_FakeStore):
+    def __init__(self, chunks):
+        super().__init__(chunks)
+        self.log = []  # (seq, chunk_id, op)
+
+    def write(self, chunk):
+        self.by_id[chunk.chunk_id] = chunk
+        self.log.append((len(self.log) + 1, chunk.chunk_id, "upsert"))
+
+    def corpus_version(self, doc_id_filter=None):
+        return len(self.log)
+
+    def changes_since(self, after_seq, upto_seq, doc_id_filter=None, limit=None):
+        rows = [{"seq": s, "doc_id": "d1", "chunk_id": cid, "op": op} for s, cid, op in self.log if after_seq < s <= upto_seq]
+        return rows[:limit]
+
+
+def test_cache_applies_changes_incrementally(monkeypatch):
+    chunks = [Chunk(chunk_id=f"c{i}", doc_id="d1", text=" ".join(toks)) for i, toks in enumerate(_corpus(50))]
+    store = _ChangeLogStore(chunks)
+    monkeypatch.setattr(BM25Index, "build_from_pg", classmethod(lambda cls, s, doc_id_filter=None, keep_text=True: cls.from_chunks(list(s.by_id.values()))))
+    cache = BM25IndexCache(store, version_check_interval=0.0)
+
+    first = cache.get()
+    store.write(Chunk(chunk_id="new", doc_id="d1", text="zebra w1"))
+    refreshed = cache.get()
+    assert refreshed is first
+    assert refreshed.search("zebra", top_k=1)[0][0].chunk_id == "new"
+    assert cache.stats()["builds"] == 1 and cache.stats()["refreshes"] == 1
+
+
+def test_cache_builds_when_snapshot_is_pruned_before_open(monkeypatch, tmp_path):
+    chunks = [Chunk(chunk_id=f"c{i}", doc_id="d1", text=" ".join(toks)) for i, toks in enumerate(_corpus(20))]
+    store = _ChangeLogStore(chunks)
+    monkeypatch.setattr(BM25Index, "build_from_pg", classmethod(lambda cls, s, doc_id_filter=None, keep_text=True: cls.from_chunks(list(s.by_id.values()))))
+    snapshot_path(str(tmp_path), None, 0).write_bytes(b"")  # present at exists(), gone at open()
+
+    def pruned(cls, path, store):
+        raise FileNotFoundError(path)
+
+    monkeypatch.setattr(BM25Index, "open_snapshot", classmethod(pruned))
+    cache = BM25IndexCache(store, version_check_interval=0.0, snapshot_dir=str(tmp_path))
+    index = cache.get()
+    assert isinstance(index.engine, BM25Engine) and index.engine.n_docs == 20
+    assert cache.stats()["snapshot_loads"] == 0
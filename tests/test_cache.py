@@ -0,0 +1,70 @@
+from app.core import cache as cache_module
+from app.core.cache import LRUCache, SQLiteCache
+
+
+def test_lru_order_and_entry_limit():
+    c = LRUCache(max_entries=2)
+    c.put("a", 1)
+    c.put("b", 2)
+    assert c.get("a") == 1  # a is now most recent
+    c.put("c", 3)
+    assert c.keys() == ["a", "c"] and c.get("b") is None
+    assert c.peek("a") == 1 and c.keys() == ["a", "c"]  # peek does not touch recency
+    assert c.stats()["evictions"] == 1 and c.stats()["hits"] == 1 and c.stats()["misses"] == 1
+
+
+def test_byte_limit_uses_sizeof_and_rejects_oversized_values():
+    c = LRUCache(max_bytes=10, sizeof=len)
+    assert c.put("a", "xxxx") and c.put("b", "yyyy")
+    c.put("a", "xxxxxx")  # replace re-accounts the size: 6 + 4
+    assert c.nbytes == 10 and len(c) == 2
+    c.put("c", "zz")  # evicts the least recent (b)
+    assert c.keys() == ["a", "c"] and c.nbytes == 8
+    assert not c.put("big", "x" * 11) and "big" not in c and c.nbytes == 8
+
+
+def test_ttl_expiry_is_a_miss(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache_module.time, "monotonic", lambda: now[0])
+    c = LRUCache(ttl_s=5.0)
+    c.put("a", 1)
+    now[0] += 4.9
+    assert c.get("a") == 1
+    now[0] += 0.2
+    assert c.peek("a") is None and c.get("a") is None
+    assert c.stats()["expired"] == 1 and len(c) == 0
+
+
+def test_sqlite_cache_ttl_prune_and_large_key_sets(tmp_path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache_module.time, "time", lambda: now[0])
+    monkeypatch.setattr(SQLiteCache, "_PRUNE_EVERY", 4)
+    c = SQLiteCache(str(tmp_path / "kv.sqlite"), "kv", ttl_s=10.0, max_entries=3)
+    c.put("a", "m", b"\x00\x01")
+    c.put_many("m", {"b": 0.5, "c": "text"})
+    assert c.get_many(["a", "b", "c", "zz"]) == {"a": b"\x00\x01", "b": 0.5, "c": "text"}
+
+    now[0] += 11
+    assert c.get("a") is None  # expired rows read as misses
+    c.put_many("m", {"d": 1.0, "e": 2.0})  # 5th put crosses the prune check
+    assert c.count() == 3 and c.get_many(["a", "b", "c", "d", "e"]) == {"d": 1.0, "e": 2.0}
+
+    big = {f"k{i}": float(i) for i in range(1200)}  # more keys than one SELECT binds
+    SQLiteCache(str(tmp_path / "big.sqlite"), "kv").put_many("m", big)
+    assert SQLiteCache(str(tmp_path / "big.sqlite"), "kv").get_many(list(big)) == big
+
+
+def test_sqlite_cache_replaces_a_table_in_an_older_layout(tmp_path):
+    import sqlite3
+
+    path = str(tmp_path / "old.sqlite")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE rerank_scores (key TEXT PRIMARY KEY, model TEXT, score REAL, created_at REAL)")
+    conn.execute("INSERT INTO rerank_scores VALUES ('a', 'm', 0.5, 0)")
+    conn.commit()
+    conn.close()
+
+    c = SQLiteCache(path, "rerank_scores")
+    assert c.count() == 0
+    c.put("a", "m", 0.7)
+    assert c.get("a") == 0.7
@@ -0,0 +1,114 @@
+import asyncio
+import threading
+
+import pytest
+
+from app.ingestion.embedding_cache import embed_with_cache
+from app.retrieval.caching_embedder import AsyncCachingEmbedder, CachingEmbedder
+
+
+class _CountingEmbed:
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, text):
+        self.calls.append(text)
+        return [float(len(text)), 0.5, -1.25]
+
+
+def test_memory_tier_keys_on_model_and_normalized_text():
+    fn = _CountingEmbed()
+    embed = CachingEmbedder(fn, model="m1")
+    assert embed("What law governs?") == embed("  What   law\ngoverns? ")
+    assert len(fn.calls) == 1
+    assert CachingEmbedder(fn, model="m2")("What law governs?") and len(fn.calls) == 2
+
+    stats = embed.stats()
+    assert stats["memory_hits"] == 1 and stats["api_calls"] == 1 and stats["hit_ratio"] == 0.5
+
+
+def test_disk_tier_survives_restart(tmp_path):
+    path = str(tmp_path / "emb.sqlite")
+    fn = _CountingEmbed()
+    first = CachingEmbedder(fn, model="m1", disk_path=path)("termination notice")
+
+    again = CachingEmbedder(fn, model="m1", disk_path=path)
+    assert again("termination notice") == pytest.approx(first)
+    assert len(fn.calls) == 1 and again.stats()["disk_hits"] == 1
+
+
+def test_ttl_expires_entries():
+    fn = _CountingEmbed()
+    embed = CachingEmbedder(fn, model="m1", ttl_s=0.0)
+    embed("q")
+    embed("q")
+    assert len(fn.calls) == 2
+
+
+def test_async_embedder():
+    fn = _CountingEmbed()
+
+    async def aembed(text):
+        return fn(text)
+
+    embed = AsyncCachingEmbedder(aembed, model="m1")
+
+    async def run():
+        return [await embed("q"), await embed("q ")]
+
+    a, b = asyncio.run(run())
+    assert a == b and len(fn.calls) == 1
+
+
+
+def test_async_disk_tier_stays_off_the_event_loop(tmp_path):
+    path = str(tmp_path / "emb.sqlite")
+    fn = _CountingEmbed()
+
+    async def aembed(text):
+        return fn(text)
+
+    threads = []
+
+    def traced(embed):
+        for name in ("get_many", "put_many"):
+            method = getattr(embed._disk, name)
+            setattr(embed._disk, name, lambda *a, _m=method: (threads.append(threading.get_ident()), _m(*a))[1])
+        return embed
+
+    async def run(embed):
+        return await embed("termination notice"), threading.get_ident()
+
+    first, loop_thread = asyncio.run(run(traced(AsyncCachingEmbedder(aembed, model="m1", disk_path=path))))
+    restarted = traced(AsyncCachingEmbedder(aembed, model="m1", disk_path=path))
+    again, _ = asyncio.run(run(restarted))
+
+    assert again == pytest.approx(first) and len(fn.calls) == 1 and restarted.stats()["disk_hits"] == 1
+    assert len(threads) == 3 and loop_thread not in threads  # miss + put, then the disk hit
+
+class _CacheTableStore:
+    def __init__(self):
+        self.rows = {}
+
+    def get_cached_embeddings(self, model, text_hashes):
+        return {h: self.rows[(model, h)] for h in text_hashes if (model, h) in self.rows}
+
+    def put_cached_embeddings(self, model, embeddings):
+        for h, emb in embeddings.items():
+            self.rows.setdefault((model, h), emb)
+
+
+def test_ingestion_cache_only_embeds_new_text():
+    store = _CacheTableStore()
+    batches = []
+
+    def embed_batch(texts):
+        batches.append(list(texts))
+        return [[float(len(t))] for t in texts]
+
+    texts = ["clause a", "clause b", "clause a"]
+    embs, stats = embed_with_cache(store, "m1", texts, embed_batch, batch_size=1)
+    assert embs == [[8.0], [8.0], [8.0]] and stats.embedded == 2 and stats.api_calls == 2
+
+    embs, stats = embed_with_cache(store, "m1", ["clause b", "clause c"], embed_batch)
+    assert batches[-1] == ["clause c"] and stats.cached == 1 and stats.embedded == 1
@@ -0,0 +1,84 @@
+import asyncio
+import threading
+
+from app.core.types import Chunk
+from app.rerank.caching_reranker import AsyncCachingReranker, CachingReranker
+from app.rerank.base import RerankResult
+
+
+class _CountingReranker:
+    model = "fake-rerank"
+
+    def __init__(self):
+        self.calls = []
+
+    def rerank(self, query, chunks, top_k=5):
+        # Score = word overlap with the query, like a (very) small cross-encoder.
+        self.calls.append([c.chunk_id for c in chunks])
+        q = set(query.lower().split())
+        scored = [
+            RerankResult(chunk=c, score=len(q & set(c.text.split())) / 10, original_rank=i + 1)
+            for i, c in enumerate(chunks)
+        ]
+        return sorted(scored, key=lambda r: -r.score)[:top_k]
+
+
+class _AsyncCountingReranker(_CountingReranker):
+    async def rerank(self, query, chunks, top_k=5):
+        return _CountingReranker.rerank(self, query, chunks, top_k)
+
+
+def _chunks(*specs):
+    return [Chunk(chunk_id=cid, doc_id="d1", text=text) for cid, text in specs]
+
+
+CHUNKS = _chunks(("a", "governing law of england"), ("b", "payment terms"), ("c", "law and courts"), ("d", "notices"))
+
+
+def test_repeat_is_served_from_cache_and_overlap_sends_only_new_docs():
+    inner = _CountingReranker()
+    reranker = CachingReranker(inner)
+    first = reranker.rerank("Which law governs?", CHUNKS, top_k=2)
+    assert [(r.chunk.chunk_id, r.original_rank) for r in first] == [
+        (r.chunk.chunk_id, r.original_rank) for r in inner.rerank("Which law governs?", CHUNKS, top_k=2)
+    ]
+    inner.calls.clear()
+
+    assert reranker.rerank("  Which law\ngoverns? ", CHUNKS, top_k=2) == first
+    assert inner.calls == []
+
+    more = CHUNKS[2:] + _chunks(("e", "law law law"))
+    got = reranker.rerank("Which law governs?", more, top_k=3)
+    assert inner.calls == [["e"]]
+    assert [r.chunk.chunk_id for r in got] == ["c", "e", "d"] and got[0].original_rank == 1
+
+    # A rewritten chunk is scored again.
+    reranker.rerank("Which law governs?", _chunks(("a", "payment of law fees")), top_k=1)
+    assert inner.calls[-1] == ["a"]
+    assert reranker.stats()["api_calls"] == 3
+
+
+def test_disk_tier_survives_restart(tmp_path):
+    path = str(tmp_path / "rerank.sqlite")
+    inner = _AsyncCountingReranker()
+    asyncio.run(AsyncCachingReranker(inner, disk_path=path).rerank("law", CHUNKS, top_k=4))
+
+    restarted = AsyncCachingReranker(inner, disk_path=path)
+    got = asyncio.run(restarted.rerank("law", CHUNKS, top_k=1))
+    assert len(inner.calls) == 1 and got[0].chunk.chunk_id in ("a", "c")
+    assert restarted.stats()["disk_hits"] == 4
+
+
+def test_async_disk_tier_is_read_and_written_off_the_event_loop(tmp_path):
+    reranker = AsyncCachingReranker(_AsyncCountingReranker(), disk_path=str(tmp_path / "rerank.sqlite"))
+    threads = []
+    for name in ("get_many", "put_many"):
+        method = getattr(reranker._disk, name)
+        setattr(reranker._disk, name, lambda *a, _m=method: (threads.append(threading.get_ident()), _m(*a))[1])
+
+    async def run():
+        await reranker.rerank("law", CHUNKS, top_k=2)
+        return threading.get_ident()
+
+    loop_thread = asyncio.run(run())
+    assert len(threads) == 2 and loop_thread not in threads
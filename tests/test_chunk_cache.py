@@ -0,0 +1,73 @@
+import asyncio
+
+from app.core.types import Chunk
+from app.indexing.chunk_cache import AsyncChunkCache, ChunkCache
+
+
+class _Store:
+    def __init__(self, n=10):
+        self.by_id = {f"c{i}": Chunk(chunk_id=f"c{i}", doc_id="d1", text=f"text {i}") for i in range(n)}
+        self.log = []
+        self.reads = []
+
+    def write(self, chunk_id, text=None, doc_level=False):
+        if text is None:
+            self.by_id.pop(chunk_id, None)
+        else:
+            self.by_id[chunk_id] = Chunk(chunk_id=chunk_id, doc_id="d1", text=text)
+        self.log.append({"seq": len(self.log) + 1, "doc_id": "d1", "chunk_id": None if doc_level else chunk_id, "op": "upsert"})
+
+    def corpus_version(self, doc_id_filter=None):
+        return len(self.log)
+
+    def changes_since(self, after_seq, upto_seq, doc_id_filter=None, limit=None):
+        return [c for c in self.log if after_seq < c["seq"] <= upto_seq][:limit]
+
+    def get_chunks_by_ids(self, ids):
+        self.reads.append(sorted(ids))
+        return {cid: self.by_id[cid] for cid in ids if cid in self.by_id}
+
+
+class _AsyncStore(_Store):
+    async def corpus_version(self, doc_id_filter=None):
+        return _Store.corpus_version(self)
+
+    async def changes_since(self, *args, **kwargs):
+        return _Store.changes_since(self, *args, **kwargs)
+
+    async def get_chunks_by_ids(self, ids):
+        return _Store.get_chunks_by_ids(self, ids)
+
+
+def test_serves_repeats_from_memory_and_follows_change_log():
+    store = _Store()
+    cache = ChunkCache(store, version_check_interval=0.0)
+    assert set(cache.get_chunks_by_ids(["c1", "c2", "c3"])) == {"c1", "c2", "c3"}
+    assert set(cache.get_chunks_by_ids(["c2", "c3", "c4"])) == {"c2", "c3", "c4"}
+    assert store.reads == [["c1", "c2", "c3"], ["c4"]]
+    assert cache.stats()["hits"] == 2 and cache.stats()["bytes"] > 0
+
+    store.write("c2", "rewritten")
+    store.write("c3")  # deleted
+    got = cache.get_chunks_by_ids(["c1", "c2", "c3"])
+    assert got["c2"].text == "rewritten" and "c3" not in got
+    assert store.reads[-1] == ["c2", "c3"] and cache.stats()["invalidated"] == 2
+
+    store.write("c1", "doc re-ingested", doc_level=True)
+    assert cache.get_chunks_by_ids(["c1"])["c1"].text == "doc re-ingested"
+    assert cache.stats()["clears"] == 1
+
+
+def test_async_cache_keeps_the_byte_budget_and_follows_change_log():
+    store = _AsyncStore(n=50)
+    cache = AsyncChunkCache(store, max_bytes=2000, version_check_interval=0.0)
+    got = asyncio.run(cache.get_chunks_by_ids([f"c{i}" for i in range(50)]))
+    assert len(got) == 50
+    assert cache.stats()["bytes"] <= 2000 and cache.stats()["evictions"] > 0
+
+    asyncio.run(cache.get_chunks_by_ids(["c49"]))
+    assert len(store.reads) == 1  # most recent entries survived eviction
+
+    store.write("c49", "rewritten")
+    assert asyncio.run(cache.get_chunks_by_ids(["c49"]))["c49"].text == "rewritten"
+    assert store.reads[-1] == ["c49"] and cache.stats()["invalidated"] == 1
@@ -0,0 +1,72 @@
+import asyncio
+import threading
+from types import SimpleNamespace
+
+from app.generation.completion_cache import CompletionCache
+from app.generation.openai_client import AsyncOpenAILLM, OpenAILLM
+
+
+class _FakeCompletions:
+    def __init__(self):
+        self.calls = 0
+
+    def create(self, model, messages, temperature):
+        self.calls += 1
+        text = f"{model}: {messages[-1]['content']} #{self.calls}"
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=text), finish_reason="stop")])
+
+
+class _AsyncFakeCompletions(_FakeCompletions):
+    async def create(self, model, messages, temperature):
+        return _FakeCompletions.create(self, model, messages, temperature)
+
+
+def _llm(cls, completions, cache):
+    llm = cls(api_key="test", model="gpt-test", cache=cache)
+    llm.client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    return llm
+
+
+def test_identical_prompts_hit_and_bypass_goes_to_the_api():
+    completions = _FakeCompletions()
+    cache = CompletionCache(max_entries=10)
+    llm = _llm(OpenAILLM, completions, cache)
+
+    first = llm.generate("sys", "question one")
+    assert llm.generate("sys", "question one").text == first.text
+    assert llm.generate("sys v2", "question one").text != first.text
+    assert llm.generate("sys", "question one", use_cache=False).text != first.text
+
+    assert completions.calls == 3
+    stats = cache.stats()
+    assert (stats["memory_hits"], stats["bypassed"], stats["api_calls"]) == (1, 1, 3)
+
+
+def test_disk_tier_survives_a_restart(tmp_path):
+    path = str(tmp_path / "llm.sqlite")
+    first = asyncio.run(_llm(AsyncOpenAILLM, _AsyncFakeCompletions(), CompletionCache(disk_path=path))
+                        .generate("sys", "question"))
+
+    completions = _AsyncFakeCompletions()
+    cache = CompletionCache(disk_path=path)
+    again = asyncio.run(_llm(AsyncOpenAILLM, completions, cache).generate("sys", "question"))
+
+    assert again.text == first.text
+    assert completions.calls == 0
+    assert cache.stats()["disk_hits"] == 1
+
+
+def test_async_client_reaches_the_disk_tier_off_the_event_loop(tmp_path):
+    cache = CompletionCache(disk_path=str(tmp_path / "llm.sqlite"))
+    threads = []
+    for name in ("get_many", "put_many"):
+        method = getattr(cache._disk, name)
+        setattr(cache._disk, name, lambda *a, _m=method: (threads.append(threading.get_ident()), _m(*a))[1])
+
+    async def run():
+        await _llm(AsyncOpenAILLM, _AsyncFakeCompletions(), cache).generate("sys", "question")
+        return threading.get_ident()
+
+    loop_thread = asyncio.run(run())
+    assert len(threads) == 2 and loop_thread not in threads  # the miss, then the put
+    assert cache.stats()["disk_entries"] == 1
@@ -0,0 +1,175 @@
+import asyncio
+import gc
+import time
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app.core.types import Chunk, ChunkRef, RetrievedItem
+from app.retrieval.fusion import RRFWeights
+from app.retrieval.hybrid import AsyncHybridRetriever, HybridRetriever
+
+
+class _Leg:
+    def __init__(self, source, ids, delay=0.0):
+        self.source = source
+        self.ids = ids
+        self.delay = delay
+
+    def retrieve(self, query, top_k, doc_id_filter=None):
+        time.sleep(self.delay)
+        return [
+            RetrievedItem(chunk=Chunk(chunk_id=cid, doc_id="d1", text=cid), source=self.source, rank=r)
+            for r, cid in enumerate(self.ids[:top_k], start=1)
+        ]
+
+
+def _hybrid(sem, kw, **kwargs):
+    return HybridRetriever(sem, kw, RRFWeights(k=60, w_semantic=1.0, w_bm25=1.2), fused_top_n=10, **kwargs)
+
+
+def test_concurrent_matches_sequential():
+    sem = _Leg("semantic", ["a", "b", "c", "d"], delay=0.1)
+    kw = _Leg("bm25", ["c", "e", "a"], delay=0.1)
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        report = {}
+        t0 = time.perf_counter()
+        got = _hybrid(sem, kw, executor=pool).retrieve("q", 10, 10, report=report)
+        elapsed = time.perf_counter() - t0
+    assert got == _hybrid(sem, kw).retrieve("q", 10, 10)
+    assert report["mode"] == "concurrent" and elapsed < 0.19
+
+
+def test_late_leg_falls_back_to_other():
+    sem = _Leg("semantic", ["a", "b"], delay=0.5)
+    kw = _Leg("bm25", ["c", "e"])
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        report = {}
+        got = _hybrid(sem, kw, executor=pool, semantic_timeout_s=0.05).retrieve("q", 10, 10, report=report)
+        assert [f.chunk.chunk_id for f in got] == ["c", "e"]
+        assert report["semantic_timed_out"] and not report["bm25_timed_out"]
+        returned = dict(report)
+        time.sleep(0.5)  # the late leg finishes in the background
+        assert report == returned and "semantic_ms" not in report and "bm25_ms" in report
+
+        with pytest.raises(TimeoutError):
+            _hybrid(sem, _Leg("bm25", ["c"], delay=0.5), executor=pool, semantic_timeout_s=0.01, bm25_timeout_s=0.01).retrieve("q", 10, 10)
+
+
+class _AsyncLeg(_Leg):
+    async def retrieve(self, query, top_k, doc_id_filter=None):
+        await asyncio.sleep(self.delay)
+        return _Leg.retrieve(self, query, top_k, doc_id_filter)
+
+
+def test_async_hybrid_matches_sync():
+    sem = _AsyncLeg("semantic", ["a", "b", "c", "d"])
+    kw = _Leg("bm25", ["c", "e", "a"])  # sync leg runs in the executor
+    hybrid = AsyncHybridRetriever(sem, kw, RRFWeights(k=60, w_semantic=1.0, w_bm25=1.2), fused_top_n=10)
+    got = asyncio.run(hybrid.retrieve("q", 10, 10))
+    assert got == _hybrid(_Leg("semantic", sem.ids), kw).retrieve("q", 10, 10)
+
+    slow = AsyncHybridRetriever(_AsyncLeg("semantic", ["a"], delay=0.5), kw, RRFWeights(), semantic_timeout_s=0.05)
+    report = {}
+    got = asyncio.run(slow.retrieve("q", 10, 10, report=report))
+    assert [f.chunk.chunk_id for f in got] == ["c", "e", "a"] and report["semantic_timed_out"]
+
+
+
+def test_sync_concurrent_knob_runs_legs_in_order_even_with_an_executor():
+    sem = _Leg("semantic", ["a", "b"], delay=0.05)
+    kw = _Leg("bm25", ["c", "a"], delay=0.05)
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        report = {}
+        got = _hybrid(sem, kw, concurrent=False, executor=pool).retrieve("q", 10, 10, report=report)
+    assert got == _hybrid(sem, kw).retrieve("q", 10, 10)
+    assert report["mode"] == "sequential" and "total_ms" not in report
+
+
+class _FailingLeg(_Leg):
+    async def retrieve(self, query, top_k, doc_id_filter=None):
+        await asyncio.sleep(self.delay)
+        raise RuntimeError(f"{self.source} down")
+
+
+class _TrackedLeg(_AsyncLeg):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.started = self.finished = 0
+
+    async def retrieve(self, query, top_k, doc_id_filter=None):
+        self.started += 1
+        items = await _AsyncLeg.retrieve(self, query, top_k, doc_id_filter)
+        self.finished += 1
+        return items
+
+
+def _run_collecting_loop_errors(coro_fn):
+    # Runs coro_fn() and returns (its error message, errors reported to the loop's handler or
+    # warned about once the frames are collected); lingers so background legs could finish.
+    errors = []
+
+    async def main():
+        asyncio.get_running_loop().set_exception_handler(lambda loop, ctx: errors.append(ctx["message"]))
+        try:
+            await coro_fn()
+        except Exception as e:
+            message = str(e)
+        await asyncio.sleep(0.2)
+        return message
+
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter("always")
+        raised = asyncio.run(main())
+        gc.collect()
+    return raised, errors + [str(w.message) for w in caught if issubclass(w.category, RuntimeWarning)]
+
+
+def test_async_failing_semantic_leg_leaves_no_bm25_work_behind():
+    weights = RRFWeights(k=60, w_semantic=1.0, w_bm25=1.2)
+
+    kw = _TrackedLeg("bm25", ["c"])
+    sequential = AsyncHybridRetriever(_FailingLeg("semantic", []), kw, weights, concurrent=False)
+    raised, errors = _run_collecting_loop_errors(lambda: sequential.retrieve("q", 10, 10))
+    assert raised == "semantic down" and kw.started == 0 and errors == []
+
+    kw = _TrackedLeg("bm25", ["c"], delay=0.1)
+    concurrent = AsyncHybridRetriever(_FailingLeg("semantic", []), kw, weights)
+    raised, errors = _run_collecting_loop_errors(lambda: concurrent.retrieve("q", 10, 10))
+    assert raised == "semantic down" and kw.started == 1 and kw.finished == 0 and errors == []
+
+    both = AsyncHybridRetriever(_FailingLeg("semantic", [], delay=0.05), _FailingLeg("bm25", []), weights)
+    raised, errors = _run_collecting_loop_errors(lambda: both.retrieve("q", 10, 10))
+    assert raised == "semantic down" and errors == []
+
+class _RefLeg(_Leg):
+    def retrieve(self, query, top_k, doc_id_filter=None):
+        return [
+            RetrievedItem(chunk=ChunkRef(cid, "d1"), source=self.source, rank=r)
+            for r, cid in enumerate(self.ids[:top_k], start=1)
+        ]
+
+
+class _ChunkStore:
+    def __init__(self, deleted=()):
+        self.deleted = set(deleted)
+        self.calls = []
+
+    def get_chunks_by_ids(self, ids):
+        self.calls.append(list(ids))
+        return {cid: Chunk(chunk_id=cid, doc_id="d1", text=cid) for cid in ids if cid not in self.deleted}
+
+
+def test_late_hydration_matches_eager():
+    eager = _hybrid(_Leg("semantic", ["a", "b", "c", "d"]), _Leg("bm25", ["c", "e", "a"])).retrieve("q", 10, 10)
+    store = _ChunkStore()
+    report = {}
+    late = _hybrid(_RefLeg("semantic", ["a", "b", "c", "d"]), _RefLeg("bm25", ["c", "e", "a"]), chunk_store=store)
+    assert late.retrieve("q", 10, 10, report=report) == eager
+    assert len(store.calls) == 1 and sorted(store.calls[0]) == ["a", "b", "c", "d", "e"]
+    assert "hydrate_ms" in report
+
+    # Chunks deleted between retrieval and hydration are dropped, order kept.
+    late.chunk_store = _ChunkStore(deleted={"c"})
+    assert [f.chunk.chunk_id for f in late.retrieve("q", 10, 10)] == [f.chunk.chunk_id for f in eager if f.chunk.chunk_id != "c"]
@@ -0,0 +1,67 @@
+import asyncio
+from types import SimpleNamespace
+
+import numpy as np
+
+from app.core.types import Chunk
+from app.rerank.factory import create_reranker
+from app.rerank.local_reranker import AsyncLocalReranker, LexicalScorer, LocalReranker
+
+
+def _chunks(*texts):
+    return [Chunk(chunk_id=f"c{i}", doc_id="d1", text=t) for i, t in enumerate(texts)]
+
+
+CHUNKS = _chunks(
+    "payment terms and invoices",
+    "this agreement is governed by the law of england",
+    "notices must be in writing",
+    "governing law and jurisdiction of the courts of england",
+)
+
+
+def test_lexical_rerank_orders_by_relevance_and_keeps_input_positions():
+    reranker = LocalReranker(batch_size=2)
+    try:
+        results = reranker.rerank("governing law england", CHUNKS, top_k=2)
+    finally:
+        reranker.close()
+
+    assert [r.chunk.chunk_id for r in results] == ["c3", "c1"]
+    assert [r.original_rank for r in results] == [4, 2]
+    assert results[0].score >= results[1].score > 0
+
+
+def test_score_of_a_pair_does_not_depend_on_batch_or_candidate_set():
+    doc = "termination clause requires notice"
+    query = "termination notice"
+    others = [c.text for c in CHUNKS]
+    alone = LexicalScorer()(query, [doc])[0]
+    assert alone > 0
+
+    for batch_size in (1, 2, 3, 32):
+        for candidates in ([doc], [doc, others[0]], others + [doc], [doc] * 3 + others):
+            reranker = LocalReranker(batch_size=batch_size, max_workers=2)
+            try:
+                scores = reranker.scores(query, candidates)
+            finally:
+                reranker.close()
+            assert np.allclose(scores[candidates.index(doc)], alone)
+
+
+def test_factory_selects_local_backend_and_async_wrapper_matches_sync():
+    settings = SimpleNamespace(
+        rerank_provider="local",
+        rerank_local_model="lexical",
+        rerank_local_batch_size=2,
+        rerank_local_workers=1,
+    )
+    reranker = create_reranker(settings)
+    assert isinstance(reranker, AsyncLocalReranker)
+
+    results = asyncio.run(reranker.rerank("governing law england", CHUNKS, top_k=3))
+    expected = reranker.reranker.rerank("governing law england", CHUNKS, top_k=3)
+    assert [(r.chunk.chunk_id, r.original_rank) for r in results] == [
+        (r.chunk.chunk_id, r.original_rank) for r in expected
+    ]
+    reranker.reranker.close()
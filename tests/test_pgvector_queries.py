@@ -0,0 +1,187 @@
+import re
+
+import pytest
+
+from app.indexing.pgvector_store import (
+    PGVectorStore,
+    _default_ivfflat_lists,
+    _filter_strategy,
+    _iterative_scan_mode,
+    _search_settings_query,
+)
+
+
+class _RecordingConn:
+    def __init__(self):
+        self.statements = []
+
+    def execute(self, sql, params=None):
+        self.statements.append((str(sql).strip(), params))
+
+
+def test_change_log_appends_take_the_advisory_lock_first():
+    conn = _RecordingConn()
+    store = PGVectorStore.__new__(PGVectorStore)  # no engine needed to log changes
+
+    store.bump_corpus_version(conn, "d1", chunk_ids=["c1", "c2"])
+    store.bump_corpus_version(conn, "d2")
+
+    sqls = [s for s, _ in conn.statements]
+    assert sqls[0].startswith("SELECT pg_advisory_xact_lock")
+    assert sqls[1].startswith("INSERT INTO corpus_changes")
+    assert conn.statements[1][1] == [
+        {"doc_id": "d1", "chunk_id": "c1", "op": "upsert"},
+        {"doc_id": "d1", "chunk_id": "c2", "op": "upsert"},
+    ]
+    assert sqls[2].startswith("SELECT pg_advisory_xact_lock")
+    assert conn.statements[3][1] == {"doc_id": "d2", "chunk_id": None, "op": "upsert"}
+
+
+def test_staging_sql_builders():
+    from app.indexing.pgvector_store import _merge_staged_queries, _stage_copy_sql, _stage_table_query
+
+    assert "ON COMMIT DROP" in str(_stage_table_query())
+    cols = "(ord, chunk_id, doc_id, chunk_index, text, metadata, embedding)"
+    assert _stage_copy_sql(binary=True) == f"COPY _stage_chunks {cols} FROM STDIN WITH (FORMAT BINARY)"
+    assert _stage_copy_sql(binary=False) == f"COPY _stage_chunks {cols} FROM STDIN"
+
+    chunks_sql, emb_sql = (str(q) for q in _merge_staged_queries(None))
+    assert "INSERT INTO chunks" in chunks_sql and "DISTINCT ON (chunk_id)" in chunks_sql
+    assert "ORDER BY chunk_id, ord DESC" in chunks_sql and "ORDER BY chunk_id, ord DESC" in emb_sql
+    assert "embedding, NULL" in emb_sql
+    reduced_sql = str(_merge_staged_queries(256)[1])
+    assert "l2_normalize(subvector(embedding, 1, 256))::halfvec(256)" in reduced_sql
+
+
+def test_bulk_fallback_only_for_copy_and_connection_errors():
+    import psycopg
+    from sqlalchemy import exc as sa_exc
+
+    from app.indexing.pgvector_store import _bulk_fallback_ok
+
+    assert _bulk_fallback_ok(psycopg.errors.FeatureNotSupported("COPY not supported"))
+    assert _bulk_fallback_ok(sa_exc.OperationalError("COPY", {}, psycopg.OperationalError("connection lost")))
+    assert _bulk_fallback_ok(AttributeError("'Cursor' object has no attribute 'copy'"))
+
+    assert not _bulk_fallback_ok(psycopg.errors.DataException("expected 1536 dimensions, not 3"))
+    assert not _bulk_fallback_ok(sa_exc.IntegrityError("INSERT", {}, psycopg.IntegrityError("violates foreign key")))
+    assert not _bulk_fallback_ok(sa_exc.ProgrammingError("INSERT", {}, psycopg.errors.DataException("bad vector")))
+    assert not _bulk_fallback_ok(ValueError("unexpected"))
+
+
+def test_tsquery_lexemes_strip_operators_and_keep_words():
+    from app.indexing.pgvector_store import _tsquery_lexemes
+
+    assert _tsquery_lexemes(["Governing", "law?", "law", "(England)"]) == ["governing", "law", "england"]
+    assert _tsquery_lexemes(["a&b|c", "!not", "x:*", "(y)", "<->", "z:AB"]) == ["a", "b", "c", "not", "x", "y", "z", "ab"]
+    assert _tsquery_lexemes(["'quoted'", '"double"', "o'neil", "back\\slash"]) == ["quoted", "double", "o", "neil", "back", "slash"]
+    assert _tsquery_lexemes(["state-of-the-art", "snake_case", "v2.1"]) == ["state", "of", "the", "art", "snake", "case", "v2", "1"]
+    assert _tsquery_lexemes(["Café", "Straße", "Договор", "契約"]) == ["café", "straße", "договор", "契約"]
+    assert _tsquery_lexemes([]) == [] and _tsquery_lexemes(["&|!():*", "'", " "]) == []
+
+
+def test_keyword_search_query():
+    from app.indexing.pgvector_store import _keyword_search_query
+
+    assert _keyword_search_query(["?!"], 10, None) is None  # nothing to match
+    assert _keyword_search_query(["law"], 0, None) is None
+
+    sql, params = _keyword_search_query(["the", "law's", "of", "England!"], 5, "d1")
+    assert params == {"q": "the | law | s | of | england", "k": 5, "doc_id": "d1"}  # 'simple' config: stopwords kept
+    assert "to_tsquery('simple', :q)" in str(sql) and "AND c.doc_id = :doc_id" in str(sql)
+
+    sql, params = _keyword_search_query(["law"], 5, None, with_text=False)
+    assert "doc_id" not in params and "c.text" not in str(sql)
+
+
+def test_keyword_retrievers_send_non_ascii_words_whole():
+    import asyncio
+
+    from app.indexing.pgvector_store import _tsquery_lexemes
+    from app.retrieval.pg_keyword_retriever import AsyncPGKeywordRetriever, PGKeywordRetriever
+
+    sent = []
+
+    class _Store:
+        def keyword_search(self, terms, top_k, doc_id_filter=None, with_text=True):
+            sent.append(list(terms))
+            return []
+
+    class _AsyncStore:
+        async def keyword_search(self, terms, top_k, doc_id_filter=None, with_text=True):
+            sent.append(list(terms))
+            return []
+
+    PGKeywordRetriever(_Store()).retrieve("café Müller naïve?", top_k=5)
+    asyncio.run(AsyncPGKeywordRetriever(_AsyncStore()).retrieve("Straße, Договор", top_k=5))
+
+    assert _tsquery_lexemes(sent[0]) == ["café", "müller", "naïve"]
+    assert _tsquery_lexemes(sent[1]) == ["straße", "договор"]
+
+
+@pytest.mark.parametrize(
+    "ef_search, probes, expected",
+    [
+        (None, None, None),
+        (80, None, {"hnsw.ef_search": "80"}),
+        (None, 10, {"ivfflat.probes": "10"}),
+        (200, 5, {"hnsw.ef_search": "200", "ivfflat.probes": "5"}),
+    ],
+)
+def test_search_settings_set_only_the_given_recall_knobs(ef_search, probes, expected):
+    assert _gucs(_search_settings_query(ef_search, probes)) == expected
+
+
+@pytest.mark.parametrize(
+    "n_rows, lists",
+    [(0, 1), (999, 1), (1000, 1), (50_000, 50), (1_000_000, 1000), (4_000_000, 2000), (100_000_000, 10_000)],
+)
+def test_default_ivfflat_lists(n_rows, lists):
+    assert _default_ivfflat_lists(n_rows) == lists
+
+
+@pytest.mark.parametrize(
+    "n_doc_chunks, exact, exact_max, iterative_scan, strategy",
+    [
+        (None, False, 500, "relaxed_order", None),  # no doc filter
+        (None, True, 500, "relaxed_order", "exact"),
+        (10, False, 500, "relaxed_order", "exact"),  # small doc: brute force over its rows
+        (500, False, 500, "relaxed_order", "exact"),
+        (501, False, 500, "relaxed_order", "iterative"),
+        (501, False, 500, None, "exact"),  # iterative scans disabled
+        (100_000, True, 500, "strict_order", "exact"),
+    ],
+)
+def test_filter_strategy(n_doc_chunks, exact, exact_max, iterative_scan, strategy):
+    assert _filter_strategy(n_doc_chunks, exact, exact_max, iterative_scan) == strategy
+
+
+@pytest.mark.parametrize(
+    "exact, iterative_scan, expected",
+    [
+        (True, None, {"enable_indexscan": "off"}),
+        (True, "relaxed_order", {"enable_indexscan": "off"}),  # exact ignores the ANN knobs
+        (False, "strict_order", {"hnsw.ef_search": "40", "hnsw.iterative_scan": "strict_order", "ivfflat.iterative_scan": "relaxed_order"}),
+    ],
+)
+def test_search_settings_for_exact_and_iterative_scans(exact, iterative_scan, expected):
+    assert _gucs(_search_settings_query(40, None, exact=exact, iterative_scan=iterative_scan)) == expected
+
+
+@pytest.mark.parametrize("mode, expected", [(None, None), ("", None), ("off", None), ("relaxed_order", "relaxed_order"), ("strict_order", "strict_order")])
+def test_iterative_scan_mode(mode, expected):
+    assert _iterative_scan_mode(mode) == expected
+
+
+def test_iterative_scan_mode_rejects_unknown_modes():
+    with pytest.raises(ValueError):
+        _iterative_scan_mode("fast")
+
+
+def _gucs(query):
+    # {guc name: value} set by a _search_settings_query result (None stays None).
+    if query is None:
+        return None
+    sql, params = query
+    names = re.findall(r"set_config\('([^']+)', :(v\d+), true\)", str(sql))
+    return {name: params[key] for name, key in names}
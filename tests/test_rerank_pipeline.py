@@ -0,0 +1,81 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from app.core.circuit_breaker import CircuitBreaker
+from app.core.types import Chunk, FusedItem
+from app.rerank.base import RerankResult
+from app.retrieval.rerank_pipeline import arerank_fused, rerank_fused
+
+FUSED = [FusedItem(chunk=Chunk(chunk_id=c, doc_id="d1", text=c), fused_score=s) for c, s in [("a", 0.3), ("b", 0.2), ("c", 0.1)]]
+
+
+class _Reranker:
+    def __init__(self, delay=0.0, fail=False):
+        self.delay = delay
+        self.fail = fail
+        self.calls = 0
+
+    def rerank(self, query, chunks, top_k=5):
+        self.calls += 1
+        time.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError("provider down")
+        return [RerankResult(chunk=c, score=1.0, original_rank=i + 1) for i, c in enumerate(reversed(chunks))][:top_k]
+
+
+class _AsyncReranker(_Reranker):
+    async def rerank(self, query, chunks, top_k=5):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        return _Reranker(fail=self.fail).rerank(query, chunks, top_k)
+
+
+def _ids(chunks):
+    return [c.chunk_id for c in chunks]
+
+
+def test_deadline_and_errors_fall_back_to_fused_order():
+    report = {}
+    assert _ids(rerank_fused("q", FUSED, _Reranker(), final_top_k=2, report=report)) == ["c", "b"]
+    assert report["reranked"] and report["fallback"] is None
+
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        report = {}
+        got = rerank_fused("q", FUSED, _Reranker(delay=0.3), final_top_k=2, timeout_s=0.02, executor=pool, report=report)
+        assert _ids(got) == ["a", "b"] and report["fallback"] == "timeout"
+
+    report = {}
+    assert _ids(asyncio.run(arerank_fused("q", FUSED, _AsyncReranker(delay=0.3), final_top_k=2, timeout_s=0.02, report=report))) == ["a", "b"]
+    assert report["fallback"] == "timeout"
+
+    report = {}
+    assert _ids(asyncio.run(arerank_fused("q", FUSED, _AsyncReranker(fail=True), final_top_k=1, report=report))) == ["a"]
+    assert report["fallback"] == "error: RuntimeError"
+
+
+def test_breaker_skips_reranking_while_open_then_probes():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout_s=0.05)
+    failing = _Reranker(fail=True)
+    for _ in range(3):
+        rerank_fused("q", FUSED, failing, final_top_k=2, breaker=breaker)
+    assert failing.calls == 2 and breaker.state == "open"
+
+    report = {}
+    assert _ids(rerank_fused("q", FUSED, _Reranker(), final_top_k=2, breaker=breaker, report=report)) == ["a", "b"]
+    assert report["fallback"] == "circuit_open"
+
+    time.sleep(0.06)
+    assert breaker.state == "half_open"
+    assert _ids(rerank_fused("q", FUSED, _Reranker(), final_top_k=2, breaker=breaker)) == ["c", "b"]
+    assert breaker.state == "closed" and breaker.stats()["opens"] == 1
+
+
+def test_empty_candidates_skip_the_reranker_and_the_breaker():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout_s=60)
+    failing, afailing = _Reranker(fail=True), _AsyncReranker(fail=True)
+    for _ in range(3):
+        assert rerank_fused("q", [], failing, breaker=breaker) == []
+        assert asyncio.run(arerank_fused("q", [], afailing, breaker=breaker)) == []
+    assert failing.calls == 0 and afailing.calls == 0
+    assert breaker.state == "closed" and breaker.stats()["consecutive_failures"] == 0
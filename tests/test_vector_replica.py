@@ -0,0 +1,99 @@
+import numpy as np
+import pytest
+
+from app.indexing.vector_replica import VectorReplica
+
+
+class _Store:
+    """embeddings table + corpus_changes log, in memory."""
+
+    def __init__(self, rows):
+        self.rows = dict(rows)  # chunk_id -> (doc_id, vector)
+        self.log = []
+
+    def write(self, chunk_id, doc_id=None, vec=None):
+        if vec is None:
+            self.rows.pop(chunk_id, None)
+            self.log.append({"seq": len(self.log) + 1, "doc_id": doc_id, "chunk_id": chunk_id, "op": "delete"})
+        else:
+            self.rows[chunk_id] = (doc_id, np.asarray(vec, dtype=np.float32))
+            self.log.append({"seq": len(self.log) + 1, "doc_id": doc_id, "chunk_id": chunk_id, "op": "upsert"})
+
+    def corpus_version(self):
+        return len(self.log)
+
+    def changes_since(self, after_seq, upto_seq, doc_id_filter=None, limit=None):
+        return [c for c in self.log if after_seq < c["seq"] <= upto_seq][:limit]
+
+    def iter_embeddings(self, batch_size=5000):
+        ids = sorted(self.rows)
+        for i in range(0, len(ids), batch_size):
+            yield [(cid, self.rows[cid][0], self.rows[cid][1]) for cid in ids[i:i + batch_size]]
+
+    def get_embeddings_by_ids(self, ids):
+        return {cid: self.rows[cid] for cid in ids if cid in self.rows}
+
+
+def _brute_force(store, q, top_k, doc_id=None):
+    q = q / np.linalg.norm(q)
+    scored = [
+        (cid, 1.0 - float(v @ q / np.linalg.norm(v)))
+        for cid, (did, v) in store.rows.items() if doc_id is None or did == doc_id
+    ]
+    return [cid for cid, _ in sorted(scored, key=lambda x: x[1])[:top_k]]
+
+
+def _corpus(n=300, dim=16, seed=0):
+    rng = np.random.default_rng(seed)
+    return _Store({f"c{i:04d}": (f"d{i % 3}", rng.normal(size=dim)) for i in range(n)}), rng
+
+
+def test_exact_search_matches_brute_force():
+    store, rng = _corpus()
+    replica = VectorReplica(store, load_batch_size=64)
+    replica.load()
+    for _ in range(5):
+        q = rng.normal(size=16)
+        assert [cid for cid, _ in replica.search(q, 10)] == _brute_force(store, q, 10)
+        hits = replica.search(q, 10, doc_id_filter="d1")
+        assert [cid for cid, _ in hits] == _brute_force(store, q, 10, "d1")
+    assert replica.search(q, 10, doc_id_filter="missing") == []
+
+
+def test_sync_applies_logged_changes_in_place():
+    store, rng = _corpus()
+    replica = VectorReplica(store, version_check_interval=0.0)
+    replica.load()
+
+    q = rng.normal(size=16)
+    store.write("c0001", "d1", q)  # exact match for q
+    store.write("new", "d2", -q)
+    store.write(_brute_force(store, -q, 2)[1], vec=None)
+    assert replica.sync()
+
+    assert replica.loads == 1 and replica.refreshes == 1
+    assert replica.n_live == len(store.rows)
+    for doc_id in (None, "d1", "d2"):
+        assert [cid for cid, _ in replica.search(q, 5, doc_id)] == _brute_force(store, q, 5, doc_id)
+        assert [cid for cid, _ in replica.search(-q, 5, doc_id)] == _brute_force(store, -q, 5, doc_id)
+    assert not replica.sync()
+
+
+def test_hnsw_backend_recall():
+    pytest.importorskip("hnswlib")
+    store, rng = _corpus(n=2000)
+    replica = VectorReplica(store, hnsw_min_rows=1000, exact_filter_max=100, version_check_interval=0.0)
+    replica.load()
+    assert replica.stats()["backend"] == "hnsw"
+
+    store.write("c0000", vec=None)
+    store.write("c0001", "d0", np.ones(16))
+    replica.sync()
+    queries = [rng.normal(size=16) for _ in range(20)] + [np.ones(16)]
+    recall = np.mean([
+        len({cid for cid, _ in replica.search(q, 10, doc_id)} & set(_brute_force(store, q, 10, doc_id))) / 10
+        for q in queries for doc_id in (None, "d0")
+    ])
+    assert recall > 0.9
+    assert replica.search(np.ones(16), 1, "d0")[0][0] == "c0001"
+    assert "c0000" not in {cid for q in queries for cid, _ in replica.search(q, 50)}